@@ -44,14 +44,29 @@ def create_app():
 
     # Importar modelos para garantir que sao criados
     from app.models import (
-        GameSession, SessionPlayer, SessionCombat, SavedCharacter,
+        GameSession, SessionPlayer, SessionCombat, CombatParticipant, SavedCharacter,
         CombatSession,
         EntityPosition, MapConfiguration,
-        CombatLog
+        CombatLog, CombatSnapshot
     )
 
     # Criar tabelas da base de dados
     with app.app_context():
         db.create_all()
 
+    # Publicar novas entradas do log de combate no bus de eventos (SSE)
+    from app.services import event_bus  # noqa: F401
+
+    # Estado de combate em memória (só se COMBAT_WRITE_BEHIND estiver ativo)
+    from app.services.combat_state_store import get_combat_state_store
+    with app.app_context():
+        get_combat_state_store().start(app)
+
+    @app.cli.command('compilar-aventuras')
+    def compile_quests_command():
+        """Compilar aventuras para a cache binária em instance/."""
+        from app.services.quest_loader import get_quest_loader
+        total = get_quest_loader().compile_quests()
+        print(f'{total} aventura(s) compilada(s) para a cache.')
+
     return app
@@ -2,16 +2,16 @@
 
 from app.models.quest import Quest, QuestStep
 from app.models.character import Character, Monster
-from app.models.combat import CombatSession, CONDICOES_5E
-from app.models.session import GameSession, SessionPlayer, SessionCombat, SavedCharacter
+from app.models.combat import CombatSession, CONDICOES_5E, CONDICOES_BITS
+from app.models.session import GameSession, SessionPlayer, SessionCombat, CombatParticipant, CombatResource, SavedCharacter
 from app.models.position import EntityPosition, MapConfiguration
-from app.models.combat_log import CombatLog
+from app.models.combat_log import CombatLog, CombatSnapshot
 
 __all__ = [
     'Quest', 'QuestStep',
     'Character', 'Monster',
-    'CombatSession', 'CONDICOES_5E',
-    'GameSession', 'SessionPlayer', 'SessionCombat', 'SavedCharacter',
+    'CombatSession', 'CONDICOES_5E', 'CONDICOES_BITS',
+    'GameSession', 'SessionPlayer', 'SessionCombat', 'CombatParticipant', 'CombatResource', 'SavedCharacter',
     'EntityPosition', 'MapConfiguration',
-    'CombatLog'
+    'CombatLog', 'CombatSnapshot'
 ]
@@ -34,6 +34,7 @@ class Monster:
     acoes_bonus: list = field(default_factory=list)
     reacoes: list = field(default_factory=list)
     acoes_lendarias: list = field(default_factory=list)
+    perfis_ataque: list = field(default_factory=list)  # Ações compiladas (ver services/monster_actions)
 
     # Defesas
     resistencias: list = field(default_factory=list)
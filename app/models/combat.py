@@ -1,5 +1,6 @@
 """Modelos para sessões de combate."""
 
+import unicodedata
 from app import db
 from datetime import datetime
 
@@ -120,3 +121,81 @@ CONDICOES_5E = {
         'icone': 'bi-bullseye'
     }
 }
+
+# Cada condição é um bit de uma máscara inteira, pela ordem do registo acima.
+# Condições novas só podem ser acrescentadas no fim (as máscaras já guardadas
+# dependem da posição de cada uma).
+CONDICOES_BITS = {chave: 1 << i for i, chave in enumerate(CONDICOES_5E)}
+
+
+def chave_condicao(nome):
+    """Chave da condição no CONDICOES_5E (aceita o nome com maiúsculas/acentos), ou None."""
+    if not nome:
+        return None
+    chave = unicodedata.normalize('NFKD', str(nome)).encode('ascii', 'ignore').decode()
+    chave = chave.strip().lower().replace(' ', '_')
+    return chave if chave in CONDICOES_BITS else None
+
+
+def bit_condicao(nome):
+    """Bit da condição na máscara; ValueError se não existir no CONDICOES_5E."""
+    chave = chave_condicao(nome)
+    if chave is None:
+        raise ValueError(f'Condicao desconhecida: {nome}')
+    return CONDICOES_BITS[chave]
+
+
+def mascara_condicoes(nomes):
+    """Máscara de uma lista de condições (ValueError se alguma for desconhecida)."""
+    mascara = 0
+    for nome in nomes or ():
+        mascara |= bit_condicao(nome)
+    return mascara
+
+
+def _mascara_filtro(nomes):
+    """Máscara para filtrar (as condições desconhecidas não correspondem a nenhuma linha)."""
+    mascara = 0
+    for nome in nomes or ():
+        mascara |= CONDICOES_BITS.get(chave_condicao(nome), 0)
+    return mascara
+
+
+def condicoes_da_mascara(mascara):
+    """Lista de condições (chaves do CONDICOES_5E) de uma máscara."""
+    return [chave for chave, bit in CONDICOES_BITS.items() if mascara & bit]
+
+
+class CondicoesMixin:
+    """
+    Condições guardadas numa máscara inteira (coluna/atributo condicoes_mask).
+
+    A lista de nomes (get_condicoes/set_condicoes) é só a vista usada pela API
+    e pelos templates; verificar, juntar ou retirar condições são operações
+    sobre inteiros, e com_condicao filtra diretamente em SQL.
+    """
+
+    def get_condicoes(self):
+        """Retorna a lista de condições."""
+        return condicoes_da_mascara(self.condicoes_mask or 0)
+
+    def set_condicoes(self, condicoes_list):
+        """Define a lista de condições (ValueError se alguma for desconhecida)."""
+        self.condicoes_mask = mascara_condicoes(condicoes_list)
+
+    def tem_condicao(self, condicao):
+        """Verifica se tem a condição."""
+        return bool((self.condicoes_mask or 0) & CONDICOES_BITS.get(chave_condicao(condicao), 0))
+
+    def add_condicao(self, condicao):
+        """Adiciona uma condição (ValueError se for desconhecida)."""
+        self.condicoes_mask = (self.condicoes_mask or 0) | bit_condicao(condicao)
+
+    def remove_condicao(self, condicao):
+        """Remove uma condição."""
+        self.condicoes_mask = (self.condicoes_mask or 0) & ~CONDICOES_BITS.get(chave_condicao(condicao), 0)
+
+    @classmethod
+    def com_condicao(cls, *condicoes):
+        """Filtro SQL: linhas com alguma das condições (ex: query.filter(SessionPlayer.com_condicao('atordoado')))."""
+        return cls.condicoes_mask.op('&')(_mascara_filtro(condicoes)) != 0
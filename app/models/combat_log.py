@@ -7,9 +7,28 @@ from datetime import datetime
 import json
 
 
+# Entradas mostradas no log (sem eventos de estado nem desfazer/refazer). É o
+# predicado dos índices parciais de paginação: as queries do log visível usam
+# exatamente este texto, senão o SQLite não pode escolher esses índices.
+VISIBLE_LOG_CONDITION = "action_type NOT IN ('state', 'undo', 'redo')"
+
+
 class CombatLog(db.Model):
     """Registo de uma ação de combate."""
     __tablename__ = 'combat_logs'
+    __table_args__ = (
+        db.Index('ix_combat_logs_combat_action', 'combat_id', 'action_type'),
+        # Paginação do log visível por ID (keyset), com e sem filtro de combate;
+        # os eventos de estado, um por alteração, ficam fora destes índices
+        db.Index('ix_combat_logs_visible_session_id', 'session_id', 'id',
+                 sqlite_where=db.text(VISIBLE_LOG_CONDITION)),
+        db.Index('ix_combat_logs_visible_session_combat_id', 'session_id', 'combat_id', 'id',
+                 sqlite_where=db.text(VISIBLE_LOG_CONDITION)),
+    )
+
+    # Eventos a partir dos quais o estado do combate é reconstruído
+    STATE_EVENT_TYPES = ('state',)
+    HISTORY_EVENT_TYPES = ('undo', 'redo')
 
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('game_sessions.id'), nullable=False)
@@ -26,7 +45,8 @@ class CombatLog(db.Model):
 
     # Tipo de ação
     action_type = db.Column(db.String(50), nullable=False)
-    # Tipos: 'attack', 'damage', 'heal', 'condition', 'spell', 'death', 'initiative', 'other'
+    # Tipos: 'attack', 'damage', 'save', 'heal', 'condition', 'spell', 'death', 'initiative', 'other',
+    # 'state' (evento de estado), 'undo' e 'redo' (target_id = ID do evento desfeito/refeito)
 
     # Detalhes da ação (JSON)
     details_json = db.Column(db.Text, nullable=True)
@@ -78,3 +98,30 @@ class CombatLog(db.Model):
             'target_nome': self.target_nome,
             'message': self.message
         }
+
+
+class CombatSnapshot(db.Model):
+    """Estado completo de um combate depois de um evento (para reconstruir sem reler tudo)."""
+    __tablename__ = 'combat_snapshots'
+
+    id = db.Column(db.Integer, primary_key=True)
+    combat_id = db.Column(db.Integer, nullable=False, index=True)
+    event_id = db.Column(db.Integer, nullable=False)  # ID do último CombatLog incluído
+    ronda = db.Column(db.Integer, default=1)
+    turno = db.Column(db.Integer, default=0)
+    participantes_json = db.Column(db.Text, nullable=False, default='[]')
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CombatSnapshot combate={self.combat_id} evento={self.event_id}>'
+
+    def get_participantes(self):
+        """Retorna a lista de participantes do snapshot."""
+        try:
+            return json.loads(self.participantes_json)
+        except (json.JSONDecodeError, TypeError):
+            return []
+
+    def set_participantes(self, participantes):
+        """Define a lista de participantes do snapshot."""
+        self.participantes_json = json.dumps(participantes, ensure_ascii=False)
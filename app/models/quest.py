@@ -32,6 +32,20 @@ class QuestStep:
     mapa_tatico: Optional[dict] = None  # Configuracao do mapa tatico (grid, posicoes iniciais)
 
 
+@dataclass
+class QuestSummary:
+    """Entrada do manifesto de aventuras (sem passos, dialogos nem fichas)."""
+    id: str
+    titulo: str
+    descricao: str
+    nivel_min: int = 1
+    nivel_max: int = 3
+    num_passos: int = 0
+    num_npcs: int = 0
+    monster_ids: list = field(default_factory=list)
+    content_hash: str = ""
+
+
 @dataclass
 class Quest:
     """Uma aventura completa."""
@@ -45,21 +59,61 @@ class Quest:
     monstros: dict = field(default_factory=dict)  # id -> Monster
     mapas: list = field(default_factory=list)
 
+    # Indices construidos uma vez no carregamento (ver build_indexes)
+    _steps_by_id: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    _next_steps: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    _previous_steps: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    _step_npcs: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    _step_monsters: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.build_indexes()
+
+    def build_indexes(self):
+        """Construir indices de passos, grafo de passos e NPCs/monstros por passo.
+
+        Deve ser chamado novamente se passos, npcs ou monstros forem alterados.
+        """
+        self._steps_by_id = {step.id: step for step in self.passos}
+        self._next_steps = {}
+        self._previous_steps = {step.id: [] for step in self.passos}
+        self._step_npcs = {}
+        self._step_monsters = {}
+
+        for step in self.passos:
+            next_ids = [n for n in step.proximos_passos if n in self._steps_by_id]
+            self._next_steps[step.id] = next_ids
+            for next_id in next_ids:
+                self._previous_steps[next_id].append(step.id)
+            self._step_npcs[step.id] = [self.npcs[n] for n in step.npcs if n in self.npcs]
+            self._step_monsters[step.id] = [self.monstros[m] for m in step.monstros if m in self.monstros]
+
     def get_step(self, step_id: int) -> Optional[QuestStep]:
         """Obter um passo pelo ID."""
-        for step in self.passos:
-            if step.id == step_id:
-                return step
-        return None
+        return self._steps_by_id.get(step_id)
+
+    def get_next_steps(self, step_id: int) -> list:
+        """Obter IDs dos passos seguintes (apenas os que existem)."""
+        return self._next_steps.get(step_id, [])
+
+    def get_previous_steps(self, step_id: int) -> list:
+        """Obter IDs dos passos que levam a este passo."""
+        return self._previous_steps.get(step_id, [])
 
     def get_npc(self, npc_id: str) -> Optional[NPC]:
         """Obter um NPC pelo ID."""
         return self.npcs.get(npc_id)
 
     def get_npcs_for_step(self, step: QuestStep) -> list:
-        """Obter todos os NPCs presentes num passo."""
+        """Obter todos os NPCs presentes num passo (lista partilhada, nao alterar)."""
+        cached = self._step_npcs.get(step.id)
+        if cached is not None and self._steps_by_id.get(step.id) is step:
+            return cached
         return [self.npcs[npc_id] for npc_id in step.npcs if npc_id in self.npcs]
 
     def get_monsters_for_step(self, step: QuestStep) -> list:
-        """Obter todos os monstros num passo."""
+        """Obter todos os monstros num passo (lista partilhada, nao alterar)."""
+        cached = self._step_monsters.get(step.id)
+        if cached is not None and self._steps_by_id.get(step.id) is step:
+            return cached
         return [self.monstros[m_id] for m_id in step.monstros if m_id in self.monstros]
@@ -1,6 +1,7 @@
 """Modelos para gestao de sessoes de jogo."""
 
 from app import db
+from app.models.combat import CondicoesMixin, mascara_condicoes
 from datetime import datetime
 import json
 
@@ -87,7 +88,7 @@ class GameSession(db.Model):
         return cls.count_for_quest(quest_id) < 3
 
 
-class SessionPlayer(db.Model):
+class SessionPlayer(CondicoesMixin, db.Model):
     """Um jogador numa sessao especifica com estado atual."""
     __tablename__ = 'session_players'
 
@@ -97,7 +98,7 @@ class SessionPlayer(db.Model):
     character_data = db.Column(db.Text, nullable=False)  # JSON com dados do personagem
     hp_atual = db.Column(db.Integer, nullable=False)
     hp_max = db.Column(db.Integer, nullable=False)
-    condicoes = db.Column(db.Text, default='[]')  # Array JSON de condicoes
+    condicoes_mask = db.Column(db.Integer, nullable=False, default=0)  # Bits do CONDICOES_5E
     ordem_combate = db.Column(db.Integer, nullable=True)  # Ordem no combate
     iniciativa = db.Column(db.Integer, nullable=True)
     xp_total = db.Column(db.Integer, default=0)  # XP acumulado total do personagem
@@ -116,31 +117,6 @@ class SessionPlayer(db.Model):
         """Define os dados do personagem a partir de um dicionario."""
         self.character_data = json.dumps(data, ensure_ascii=False)
 
-    def get_condicoes(self):
-        """Retorna a lista de condicoes."""
-        try:
-            return json.loads(self.condicoes)
-        except (json.JSONDecodeError, TypeError):
-            return []
-
-    def set_condicoes(self, condicoes_list):
-        """Define a lista de condicoes."""
-        self.condicoes = json.dumps(condicoes_list, ensure_ascii=False)
-
-    def add_condicao(self, condicao):
-        """Adiciona uma condicao."""
-        condicoes = self.get_condicoes()
-        if condicao not in condicoes:
-            condicoes.append(condicao)
-            self.set_condicoes(condicoes)
-
-    def remove_condicao(self, condicao):
-        """Remove uma condicao."""
-        condicoes = self.get_condicoes()
-        if condicao in condicoes:
-            condicoes.remove(condicao)
-            self.set_condicoes(condicoes)
-
     def to_dict(self):
         """Converte o jogador para dicionario."""
         char_data = self.get_character_data()
@@ -169,7 +145,7 @@ class SessionCombat(db.Model):
     activo = db.Column(db.Boolean, default=False)
     ronda_atual = db.Column(db.Integer, default=1)
     turno_atual = db.Column(db.Integer, default=0)
-    participantes_json = db.Column(db.Text, default='[]')  # Monstros + estado
+    participantes_json = db.Column(db.Text, default='[]')  # Legado: substituido por combat_participants
     quest_step_id = db.Column(db.Integer, nullable=True)  # Passo da aventura de onde veio o combate
 
     # Rastreamento de tempo de combate
@@ -177,19 +153,92 @@ class SessionCombat(db.Model):
     tempo_ronda_inicio = db.Column(db.DateTime, nullable=True)  # Quando a ronda atual comecou
     duracao_total_segundos = db.Column(db.Integer, default=0)  # Duracao real-world do combate
 
+    # Fila de expiracao das condicoes com duracao (ver ConditionScheduler); NULL = reconstruir
+    efeitos_json = db.Column(db.Text, nullable=True)
+
+    # Versao do estado (incrementada a cada alteracao, para detetar escritas concorrentes)
+    versao = db.Column(db.Integer, default=0, nullable=False)
+
+    # Ultima entrada do journal do write-behind ja escrita (ver CombatStateStore)
+    journal_seq = db.Column(db.Integer, default=0, nullable=False)
+
+    # Participantes (uma linha por participante, pela ordem do combate)
+    participantes = db.relationship(
+        'CombatParticipant',
+        backref='combate',
+        order_by='CombatParticipant.ordem',
+        cascade='all, delete-orphan'
+    )
+
+    # Action economy e spell slots (uma linha por participante e recurso)
+    recursos = db.relationship(
+        'CombatResource',
+        backref='combate',
+        lazy='dynamic',
+        cascade='all, delete-orphan'
+    )
+
     def __repr__(self):
         return f'<SessionCombat sessao={self.session_id} activo={self.activo}>'
 
     def get_participantes(self):
-        """Retorna a lista de participantes."""
+        """Retorna a lista de participantes (pela ordem do combate)."""
+        if self.participantes:
+            return [p.to_dict() for p in self.participantes]
+
+        # Combates antigos ainda guardados no blob JSON (antes da migracao 003)
         try:
-            return json.loads(self.participantes_json)
+            return json.loads(self.participantes_json or '[]')
         except (json.JSONDecodeError, TypeError):
             return []
 
     def set_participantes(self, participantes):
-        """Define a lista de participantes."""
-        self.participantes_json = json.dumps(participantes, ensure_ascii=False)
+        """
+        Define a lista de participantes.
+
+        As linhas existentes sao atualizadas no lugar (so as colunas que mudam
+        geram UPDATE); as que faltam sao removidas e as novas inseridas.
+
+        Raises:
+            ValueError: Se alguma condicao for desconhecida (a sessao da BD
+                deve ser revertida pelo chamador)
+        """
+        existentes = {p.participant_id: p for p in self.participantes}
+        linhas = []
+        for ordem, dados in enumerate(participantes):
+            participant_id = str(dados.get('id', ''))
+            linha = existentes.pop(participant_id, None)
+            if linha is None:
+                linha = CombatParticipant(participant_id=participant_id)
+            linha.update_from_dict(dados, ordem)
+            linhas.append(linha)
+
+        self.participantes = linhas
+        self.participantes_json = '[]'
+        self.efeitos_json = None  # A fila e reconstruida a partir dos efeitos dos participantes
+        self.incrementar_versao()
+
+    def incrementar_versao(self):
+        """Marca uma nova versao do estado do combate."""
+        self.versao = (self.versao or 0) + 1
+
+    def converter_blob_legado(self):
+        """Passa para linhas os participantes ainda guardados no blob JSON."""
+        if self.participantes_json and self.participantes_json != '[]':
+            self.set_participantes(self.get_participantes())
+
+    def get_linhas_participantes(self):
+        """Retorna as linhas (CombatParticipant) dos participantes."""
+        self.converter_blob_legado()
+        return self.participantes
+
+    def get_participante(self, participant_id):
+        """Obtem a linha de um participante (consulta pelo indice combate/participante)."""
+        self.converter_blob_legado()
+        return CombatParticipant.query.filter_by(
+            combat_id=self.id,
+            participant_id=str(participant_id)
+        ).first()
 
     def add_participante(self, participante):
         """Adiciona um participante ao combate."""
@@ -197,6 +246,48 @@ class SessionCombat(db.Model):
         participantes.append(participante)
         self.set_participantes(participantes)
 
+    def inserir_por_iniciativa(self, participante):
+        """
+        Insere um participante na posicao da sua iniciativa (reforcos a meio do combate).
+
+        O participante entra na posicao que deixa menos participantes fora da
+        ordem de iniciativa a sua volta: numa ordem ja por iniciativa e a
+        posicao de bisect_right, e se a ordem foi mudada a mao (reorder,
+        /atualizar) essa ordem e respeitada em vez de se assumir que esta
+        ordenada. Os participantes seguintes descem uma posicao com um so
+        UPDATE, sem reordenar nem reescrever os restantes. Se entrar antes de
+        quem esta a jogar, o turno atual acompanha o participante ativo.
+
+        Returns:
+            A linha (CombatParticipant) inserida
+        """
+        rows = self.get_linhas_participantes()
+        linha = CombatParticipant(participant_id=str(participante.get('id', '')))
+        linha.update_from_dict(participante, 0)
+
+        chave = linha.chave_iniciativa()
+        chaves = [row.chave_iniciativa() for row in rows]
+        # Custo de cada posicao: quem joga depois fica antes + quem joga antes fica depois
+        custo = sum(1 for c in chaves if c < chave)
+        melhor, posicao = custo, 0
+        for i, c in enumerate(chaves):
+            custo += (c > chave) - (c < chave)
+            if custo <= melhor:  # Empate: a mais a direita (depois de quem ja estava)
+                melhor, posicao = custo, i + 1
+        linha.ordem = posicao
+        if posicao < len(rows):
+            CombatParticipant.query.filter(
+                CombatParticipant.combat_id == self.id,
+                CombatParticipant.ordem >= posicao
+            ).update({CombatParticipant.ordem: CombatParticipant.ordem + 1})
+        rows.insert(posicao, linha)
+
+        if posicao < len(rows) - 1 and posicao <= (self.turno_atual or 0):
+            self.turno_atual = (self.turno_atual or 0) + 1
+        self.efeitos_json = None  # As duracoes por turno dependem da ordem
+        self.incrementar_versao()
+        return linha
+
     def remove_participante(self, participante_id):
         """Remove um participante pelo ID."""
         participantes = self.get_participantes()
@@ -204,60 +295,155 @@ class SessionCombat(db.Model):
         self.set_participantes(participantes)
 
     def ordenar_por_iniciativa(self):
-        """Ordena participantes por iniciativa (maior primeiro)."""
-        participantes = self.get_participantes()
-        participantes.sort(key=lambda p: p.get('iniciativa', 0), reverse=True)
-        self.set_participantes(participantes)
+        """
+        Ordena participantes por iniciativa (maior primeiro; empate: maior Destreza).
 
-    def get_action_economy(self):
-        """Retorna o estado de action economy."""
-        if not self.action_economy_json:
-            return {}
+        So a coluna ordem das linhas que mudam de posicao e atualizada; o
+        turno atual acompanha o participante ativo.
+        """
+        rows = self.get_linhas_participantes()
+        if not rows:
+            return
+        turno = min(self.turno_atual or 0, len(rows) - 1)
+        ativo = rows[turno]
+
+        rows.sort(key=CombatParticipant.chave_iniciativa)
+        for ordem, linha in enumerate(rows):
+            if linha.ordem != ordem:
+                linha.ordem = ordem
+
+        self.turno_atual = rows.index(ativo)
+        self.efeitos_json = None
+        self.incrementar_versao()
+
+    def next_turn(self):
+        """
+        Passar ao turno seguinte (e a ronda seguinte depois do ultimo participante).
+
+        Repoe a action economy do participante que comeca o turno.
+
+        Returns:
+            Dict com ronda, turno, actor (ID de quem comeca o turno) e
+            nova_ronda (True se a ronda mudou)
+
+        Raises:
+            ValueError: Se o combate nao tiver participantes
+        """
+        rows = self.get_linhas_participantes()
+        if not rows:
+            raise ValueError('Combate sem participantes')
+
+        self.turno_atual = (self.turno_atual or 0) + 1
+        nova_ronda = self.turno_atual >= len(rows)
+        if nova_ronda:
+            self.turno_atual = 0
+            self.ronda_atual = (self.ronda_atual or 1) + 1
+
+        actor = rows[self.turno_atual].participant_id
+        self.reset_action_economy_for_participant(actor)
+        return {
+            'ronda': self.ronda_atual,
+            'turno': self.turno_atual,
+            'actor': actor,
+            'nova_ronda': nova_ronda
+        }
+
+    def get_agenda_efeitos(self):
+        """Retorna a fila de expiracao das condicoes (None se tiver de ser reconstruida)."""
+        if not self.efeitos_json:
+            return None
         try:
-            return json.loads(self.action_economy_json)
+            return json.loads(self.efeitos_json)
         except (json.JSONDecodeError, TypeError):
-            return {}
+            return None
+
+    def set_agenda_efeitos(self, agenda):
+        """Define a fila de expiracao das condicoes."""
+        self.efeitos_json = json.dumps(agenda) if agenda is not None else None
+
+    # ===== ACTION ECONOMY E SPELL SLOTS =====
+    # Cada recurso e uma linha de combat_resources: gastar ou repor e um so
+    # UPDATE condicional (atomico), sem reescrever o estado dos outros.
+
+    def _garantir_recursos(self, participant_id, recursos):
+        """Cria as linhas em falta (por usar) para os recursos do participante."""
+        existentes = {
+            recurso for (recurso,) in db.session.query(CombatResource.recurso).filter(
+                CombatResource.combat_id == self.id,
+                CombatResource.participant_id == str(participant_id),
+                CombatResource.recurso.in_(recursos)
+            )
+        }
+        for recurso in recursos:
+            if recurso not in existentes:
+                db.session.add(CombatResource(
+                    combat_id=self.id, participant_id=str(participant_id), recurso=recurso, maximo=1, usados=0
+                ))
+        db.session.flush()
+
+    def _alterar_recurso(self, participant_id, recurso, delta):
+        """Gasta (delta > 0) ou repoe (delta < 0) um recurso se estiver disponivel. Retorna True se alterou."""
+        disponivel = (
+            CombatResource.usados + delta <= CombatResource.maximo if delta > 0
+            else CombatResource.usados + delta >= 0
+        )
+        result = db.session.execute(
+            db.update(CombatResource)
+            .where(
+                CombatResource.combat_id == self.id,
+                CombatResource.participant_id == str(participant_id),
+                CombatResource.recurso == recurso,
+                disponivel
+            )
+            .values(usados=CombatResource.usados + delta)
+        )
+        return result.rowcount == 1
 
-    def set_action_economy(self, economy_dict):
-        """Define o estado de action economy."""
-        self.action_economy_json = json.dumps(economy_dict, ensure_ascii=False)
+    def get_action_economy(self):
+        """Retorna o estado de action economy ({participante: {action: usada, ...}})."""
+        economy = {}
+        for recurso in self.recursos.filter(CombatResource.recurso.in_(CombatResource.ACTION_ECONOMY)):
+            economy.setdefault(recurso.participant_id, {})[recurso.recurso] = recurso.usados >= recurso.maximo
+        return economy
 
     def reset_action_economy_for_participant(self, participant_id):
         """Reseta action economy para um participante."""
-        economy = self.get_action_economy()
-        economy[participant_id] = {
-            'action': False,
-            'bonus_action': False,
-            'reaction': False,
-            'movement': False
-        }
-        self.set_action_economy(economy)
+        self._garantir_recursos(participant_id, CombatResource.ACTION_ECONOMY)
+        db.session.execute(
+            db.update(CombatResource)
+            .where(
+                CombatResource.combat_id == self.id,
+                CombatResource.participant_id == str(participant_id),
+                CombatResource.recurso.in_(CombatResource.ACTION_ECONOMY)
+            )
+            .values(usados=0)
+        )
+
+    def reset_action_economy(self):
+        """Reseta action economy de todos os participantes (nova ronda) num so UPDATE."""
+        db.session.execute(
+            db.update(CombatResource)
+            .where(
+                CombatResource.combat_id == self.id,
+                CombatResource.recurso.in_(CombatResource.ACTION_ECONOMY)
+            )
+            .values(usados=0)
+        )
 
     def use_action(self, participant_id, action_type):
-        """Marca uma ação como usada."""
-        economy = self.get_action_economy()
-        if participant_id not in economy:
-            economy[participant_id] = {
-                'action': False,
-                'bonus_action': False,
-                'reaction': False,
-                'movement': False
-            }
-        economy[participant_id][action_type] = True
-        self.set_action_economy(economy)
+        """Marca uma ação como usada. Retorna False se ja tinha sido usada."""
+        if action_type not in CombatResource.ACTION_ECONOMY:
+            raise ValueError(f'Tipo de acao invalido: {action_type}')
+        self._garantir_recursos(participant_id, (action_type,))
+        return self._alterar_recurso(participant_id, action_type, 1)
 
     def get_spell_slots(self):
-        """Retorna o estado de spell slots."""
-        if not self.spell_slots_json:
-            return {}
-        try:
-            return json.loads(self.spell_slots_json)
-        except (json.JSONDecodeError, TypeError):
-            return {}
-
-    def set_spell_slots(self, slots_dict):
-        """Define o estado de spell slots."""
-        self.spell_slots_json = json.dumps(slots_dict, ensure_ascii=False)
+        """Retorna o estado de spell slots ({participante: {nivel: {max, used}}})."""
+        slots = {}
+        for recurso in self.recursos.filter(CombatResource.recurso.like(CombatResource.SLOT_PREFIX + '%')):
+            level = recurso.recurso[len(CombatResource.SLOT_PREFIX):]
+            slots.setdefault(recurso.participant_id, {})[level] = {'max': recurso.maximo, 'used': recurso.usados}
+        return slots
 
     def initialize_spell_slots(self, participant_id, max_slots):
         """
@@ -267,36 +453,27 @@ class SessionCombat(db.Model):
             participant_id: ID do participante
             max_slots: Dict com {level: max_slots} ex: {1: 4, 2: 3, 3: 2}
         """
-        slots = self.get_spell_slots()
-        slots[participant_id] = {}
+        self.recursos.filter(
+            CombatResource.participant_id == str(participant_id),
+            CombatResource.recurso.like(CombatResource.SLOT_PREFIX + '%')
+        ).delete(synchronize_session=False)
         for level, max_count in max_slots.items():
-            slots[participant_id][str(level)] = {
-                'max': max_count,
-                'used': 0
-            }
-        self.set_spell_slots(slots)
+            db.session.add(CombatResource(
+                combat_id=self.id,
+                participant_id=str(participant_id),
+                recurso=CombatResource.slot(level),
+                maximo=max_count,
+                usados=0
+            ))
+        db.session.flush()
 
     def use_spell_slot(self, participant_id, level):
         """Usa um spell slot."""
-        slots = self.get_spell_slots()
-        if participant_id in slots and str(level) in slots[participant_id]:
-            slot_data = slots[participant_id][str(level)]
-            if slot_data['used'] < slot_data['max']:
-                slot_data['used'] += 1
-                self.set_spell_slots(slots)
-                return True
-        return False
+        return self._alterar_recurso(participant_id, CombatResource.slot(level), 1)
 
     def restore_spell_slot(self, participant_id, level):
         """Restaura um spell slot."""
-        slots = self.get_spell_slots()
-        if participant_id in slots and str(level) in slots[participant_id]:
-            slot_data = slots[participant_id][str(level)]
-            if slot_data['used'] > 0:
-                slot_data['used'] -= 1
-                self.set_spell_slots(slots)
-                return True
-        return False
+        return self._alterar_recurso(participant_id, CombatResource.slot(level), -1)
 
     def to_dict(self):
         """Converte o combate para dicionario."""
@@ -309,10 +486,110 @@ class SessionCombat(db.Model):
             'participantes': self.get_participantes(),
             'quest_step_id': self.quest_step_id,
             'action_economy': self.get_action_economy(),
-            'spell_slots': self.get_spell_slots()
+            'spell_slots': self.get_spell_slots(),
+            'versao': self.versao
         }
 
 
+class CombatParticipant(CondicoesMixin, db.Model):
+    """Um participante dum combate de sessao (jogador ou monstro)."""
+    __tablename__ = 'combat_participants'
+    __table_args__ = (
+        db.Index('ix_combat_participants_combat_participant', 'combat_id', 'participant_id'),
+    )
+
+    # Campos com coluna propria; o resto do dicionario vai para dados_json
+    CAMPOS = ('id', 'nome', 'tipo', 'hp_atual', 'hp_max', 'ac', 'iniciativa', 'condicoes')
+
+    id = db.Column(db.Integer, primary_key=True)
+    combat_id = db.Column(db.Integer, db.ForeignKey('session_combats.id'), nullable=False)
+    participant_id = db.Column(db.String(100), nullable=False)  # Ex: player_3, monster_goblin_0
+    ordem = db.Column(db.Integer, default=0)
+    nome = db.Column(db.String(200), default='')
+    tipo = db.Column(db.String(50), default='monstro')  # jogador, monstro
+    hp_atual = db.Column(db.Integer, default=0)
+    hp_max = db.Column(db.Integer, default=0)
+    ac = db.Column(db.Integer, default=10)
+    iniciativa = db.Column(db.Integer, default=0)
+    condicoes_mask = db.Column(db.Integer, nullable=False, default=0)  # Bits do CONDICOES_5E
+    dados_json = db.Column(db.Text, default='{}')  # Campos extra (xp, monster_id, destreza_mod...)
+
+    def __repr__(self):
+        return f'<CombatParticipant {self.participant_id} combate={self.combat_id}>'
+
+    @staticmethod
+    def _int(value, default=0):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
+    def get_dados(self):
+        """Retorna os campos extra do participante."""
+        try:
+            return json.loads(self.dados_json or '{}')
+        except (json.JSONDecodeError, TypeError):
+            return {}
+
+    def get_efeitos(self):
+        """Retorna a duracao das condicoes (lista de efeitos, ver ConditionScheduler)."""
+        return self.get_dados().get('efeitos') or []
+
+    def set_efeitos(self, efeitos):
+        """Define a duracao das condicoes (guardada nos campos extra)."""
+        dados = self.get_dados()
+        if efeitos:
+            dados['efeitos'] = efeitos
+        else:
+            dados.pop('efeitos', None)
+        self.dados_json = json.dumps(dados, ensure_ascii=False)
+
+    def chave_iniciativa(self):
+        """Chave da ordem de iniciativa: maior iniciativa primeiro; empate: maior modificador de Destreza."""
+        return (-(self.iniciativa or 0), -self._int(self.get_dados().get('destreza_mod')))
+
+    def aplicar_dano(self, dano):
+        """Subtrai dano ao HP (minimo 0). Retorna True se o participante caiu agora."""
+        estava_de_pe = (self.hp_atual or 0) > 0
+        self.hp_atual = max(0, (self.hp_atual or 0) - dano)
+        return estava_de_pe and self.hp_atual == 0
+
+    def update_from_dict(self, dados, ordem):
+        """Atualiza a linha a partir do dicionario usado pelo tracker (ValueError se uma condicao for desconhecida)."""
+        condicoes_mask = mascara_condicoes(dados.get('condicoes'))
+
+        self.ordem = ordem
+        self.nome = dados.get('nome') or ''
+        self.tipo = dados.get('tipo') or 'monstro'
+        self.hp_atual = self._int(dados.get('hp_atual'))
+        self.hp_max = self._int(dados.get('hp_max'))
+        self.ac = self._int(dados.get('ac'), 10)
+        self.iniciativa = self._int(dados.get('iniciativa'))
+
+        if condicoes_mask != self.condicoes_mask:
+            self.condicoes_mask = condicoes_mask
+
+        extra = {k: v for k, v in dados.items() if k not in self.CAMPOS}
+        dados_json = json.dumps(extra, ensure_ascii=False)
+        if dados_json != self.dados_json:
+            self.dados_json = dados_json
+
+    def to_dict(self):
+        """Converte o participante para o dicionario usado pelo tracker."""
+        participante = self.get_dados()
+        participante.update({
+            'id': self.participant_id,
+            'nome': self.nome,
+            'tipo': self.tipo,
+            'hp_atual': self.hp_atual,
+            'hp_max': self.hp_max,
+            'ac': self.ac,
+            'iniciativa': self.iniciativa,
+            'condicoes': self.get_condicoes()
+        })
+        return participante
+
+
 class SavedCharacter(db.Model):
     """Personagem personalizado guardado pelo utilizador."""
     __tablename__ = 'saved_characters'
@@ -354,3 +631,29 @@ class SavedCharacter(db.Model):
             'criado_em': self.criado_em.isoformat() if self.criado_em else None,
             'character_data': char_data
         }
+
+
+class CombatResource(db.Model):
+    """Recurso de um participante num combate: uma acao do turno ou os spell slots de um nivel."""
+    __tablename__ = 'combat_resources'
+    __table_args__ = (
+        db.UniqueConstraint('combat_id', 'participant_id', 'recurso', name='uq_combat_resources_participant_recurso'),
+    )
+
+    ACTION_ECONOMY = ('action', 'bonus_action', 'reaction', 'movement')
+    SLOT_PREFIX = 'slot_'  # slot_1 ... slot_9
+
+    id = db.Column(db.Integer, primary_key=True)
+    combat_id = db.Column(db.Integer, db.ForeignKey('session_combats.id'), nullable=False)
+    participant_id = db.Column(db.String(100), nullable=False)
+    recurso = db.Column(db.String(20), nullable=False)  # action, bonus_action, reaction, movement, slot_N
+    maximo = db.Column(db.Integer, nullable=False, default=1)
+    usados = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CombatResource {self.participant_id} {self.recurso} {self.usados}/{self.maximo}>'
+
+    @classmethod
+    def slot(cls, level):
+        """Nome do recurso dos spell slots de um nivel (1-9)."""
+        return f'{cls.SLOT_PREFIX}{int(level)}'
@@ -4,24 +4,56 @@ from flask import Blueprint, render_template, request, jsonify, redirect, url_fo
 from app.models.combat import CONDICOES_5E
 from app.services.session_service import SessionService
 from app.services.combat_roll_service import CombatRollService
+from app.services.combat_probability_service import CombatProbabilityService
+from app.services.dice_engine import DiceExpressionError
 from app.services.combat_log_service import CombatLogService
+from app.services.combat_patch_service import CombatPatchService, CombatPatchError, CombatVersionConflict
+from app.services.combat_state_store import get_combat_state_store
+from app.services.combat_turn_service import CombatTurnService
+from app.services.combat_event_service import CombatEventService
+from app.services.event_bus import publish_combat_state, publish_event
+from app.services.monster_catalog import get_monster_catalog
 from app import db
 
 combat_bp = Blueprint('combat', __name__)
 session_service = SessionService()
 roll_service = CombatRollService()
+probability_service = CombatProbabilityService()
 log_service = CombatLogService()
+patch_service = CombatPatchService()
+event_service = CombatEventService()
+turn_service = CombatTurnService()
+
+
+def _write_behind_store():
+    """Store de combate em memoria, se COMBAT_WRITE_BEHIND estiver ativo."""
+    store = get_combat_state_store()
+    return store if store.enabled else None
+
+
+def _flush_combat_state(session_id, evict=True):
+    """Escrever o estado em memoria antes de ler/alterar o combate diretamente na BD."""
+    get_combat_state_store().flush(session_id, evict=evict)
+
+
+def _publish_participants(session_id, result):
+    """Publicar alteracoes de participantes/turno (formato do PATCH de estado)."""
+    if result.get('participants') or 'ronda' in result or 'order' in result:
+        publish_event(session_id, 'participant', {
+            key: result[key] for key in ('versao', 'participants', 'ronda', 'turno', 'order') if key in result
+        })
 
 
 @combat_bp.route('/sessao/<int:session_id>')
 def session_tracker(session_id):
     """Rastreador de combate para uma sessao especifica."""
-    from app.services.quest_loader import QuestLoader
+    from app.services.quest_loader import get_quest_loader
 
     game_session = session_service.get_session(session_id)
     if not game_session:
         return redirect(url_for('combat.tracker'))
 
+    _flush_combat_state(session_id, evict=False)
     combat = session_service.get_session_combat(session_id)
     participants = combat.get_participantes() if combat and combat.activo else []
 
@@ -29,17 +61,30 @@ def session_tracker(session_id):
     quest = None
     current_step = None
     if game_session.quest_id:
-        quest_loader = QuestLoader()
-        quest = quest_loader.get_quest(game_session.quest_id)
+        quest = get_quest_loader().get_quest(game_session.quest_id)
         if quest and combat and combat.quest_step_id:
             current_step = quest.get_step(combat.quest_step_id)
 
+    # Perfis de ataque dos monstros em combate (compilados ao carregar a aventura)
+    monster_profiles = {}
+    for participant in participants:
+        monster_id = participant.get('monster_id')
+        if not monster_id or monster_id in monster_profiles:
+            continue
+        if quest and monster_id in quest.monstros:
+            monster_profiles[monster_id] = quest.monstros[monster_id].perfis_ataque
+        else:
+            monster = get_monster_catalog().get(monster_id)
+            if monster:
+                monster_profiles[monster_id] = monster.get('perfis_ataque', [])
+
     return render_template(
         'combat/tracker.html',
         conditions=CONDICOES_5E,
         game_session=game_session,
         session_combat=combat,
         initial_participants=participants,
+        monster_profiles=monster_profiles,
         quest=quest,
         current_step=current_step
     )
@@ -47,22 +92,156 @@ def session_tracker(session_id):
 
 @combat_bp.route('/sessao/<int:session_id>/atualizar', methods=['POST'])
 def update_session_combat(session_id):
-    """Atualizar estado de combate de uma sessao."""
+    """Substituir o estado completo do combate (com controlo de versao, como o PATCH de estado)."""
     game_session = session_service.get_session(session_id)
     if not game_session:
         return jsonify({'erro': 'Sessao nao encontrada'}), 404
 
-    data = request.get_json()
+    data = request.get_json() or {}
+    _flush_combat_state(session_id)
     combat = session_service.get_session_combat(session_id)
+    if not combat:
+        return jsonify({'erro': 'Combate nao encontrado'}), 404
 
-    if combat:
-        participants = data.get('participants', [])
+    if data.get('versao') != combat.versao:
+        # Outro cliente alterou o combate: devolver o estado atual para recarregar
+        return jsonify({
+            'erro': str(CombatVersionConflict(combat.versao)),
+            'versao': combat.versao,
+            'participants': combat.get_participantes(),
+            'ronda': combat.ronda_atual,
+            'turno': combat.turno_atual
+        }), 409
+
+    participants = data.get('participants', [])
+    try:
         combat.set_participantes(participants)
-        combat.ronda_atual = data.get('ronda', combat.ronda_atual)
-        combat.turno_atual = data.get('turno', combat.turno_atual)
-        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 400
+    combat.ronda_atual = data.get('ronda', combat.ronda_atual)
+    combat.turno_atual = data.get('turno', combat.turno_atual)
+    CombatEventService.record_restore(combat)
+    db.session.commit()
+    publish_combat_state(combat)
+
+    return jsonify({'success': True, 'versao': combat.versao})
+
+
+@combat_bp.route('/sessao/<int:session_id>/estado', methods=['PATCH'])
+def patch_session_combat(session_id):
+    """Aplicar operacoes parciais ao combate (com controlo de versao)."""
+    store = _write_behind_store()
+    combat = store.load(session_id) if store else session_service.get_session_combat(session_id)
+    if not combat:
+        return jsonify({'erro': 'Combate nao encontrado'}), 404
+
+    data = request.get_json() or {}
+    try:
+        if store:
+            patch_service.validate_patch(data.get('operations'))
+            result = store.record(session_id, data['operations'], base_version=data.get('versao'))
+            combat = store.load(session_id)
+        else:
+            result = patch_service.apply_patch(combat, data.get('versao'), data.get('operations'))
+    except CombatVersionConflict as e:
+        # Outro cliente alterou o combate: devolver o estado atual para recarregar
+        return jsonify({
+            'erro': str(e),
+            'versao': e.versao,
+            'participants': combat.get_participantes(),
+            'ronda': combat.ronda_atual,
+            'turno': combat.turno_atual
+        }), 409
+    except CombatPatchError as e:
+        return jsonify({'erro': str(e)}), 400
+
+    _publish_participants(session_id, result)
+    return jsonify(result)
+
+
+@combat_bp.route('/sessao/<int:session_id>/proximo-turno', methods=['POST'])
+def next_turn_route(session_id):
+    """Passar ao turno seguinte (action economy, tempo da ronda e evento numa so transacao)."""
+    _flush_combat_state(session_id)
+    combat = session_service.get_session_combat(session_id)
+    if not combat or not combat.activo:
+        return jsonify({'erro': 'Combate nao encontrado'}), 404
+
+    data = request.get_json(silent=True) or {}
+    try:
+        delta = turn_service.next_turn(combat, data.get('versao'))
+    except CombatVersionConflict as e:
+        return jsonify({
+            'erro': str(e),
+            'versao': e.versao,
+            'participants': combat.get_participantes(),
+            'ronda': combat.ronda_atual,
+            'turno': combat.turno_atual
+        }), 409
+    except CombatPatchError as e:
+        return jsonify({'erro': str(e)}), 400
+
+    _publish_participants(session_id, delta)
+    return jsonify(delta)
+
+
+@combat_bp.route('/sessao/<int:session_id>/desfazer', methods=['POST'])
+def undo_session_combat(session_id):
+    """Desfazer a ultima alteracao de estado do combate."""
+    return _undo_redo(session_id, undo=True)
+
 
-    return jsonify({'success': True})
+@combat_bp.route('/sessao/<int:session_id>/refazer', methods=['POST'])
+def redo_session_combat(session_id):
+    """Refazer a ultima alteracao desfeita."""
+    return _undo_redo(session_id, undo=False)
+
+
+def _undo_redo(session_id, undo):
+    _flush_combat_state(session_id)
+    combat = session_service.get_session_combat(session_id)
+    if not combat:
+        return jsonify({'erro': 'Combate nao encontrado'}), 404
+
+    result = event_service.undo(combat) if undo else event_service.redo(combat)
+    if result is None:
+        return jsonify({'erro': 'Nada para desfazer' if undo else 'Nada para refazer'}), 400
+
+    publish_combat_state(combat)
+    return jsonify({
+        'participants': combat.get_participantes(),
+        'ronda': combat.ronda_atual,
+        'turno': combat.turno_atual,
+        'versao': combat.versao,
+        'evento': result['event_id']
+    })
+
+
+@combat_bp.route('/sessao/<int:session_id>/historico', methods=['GET'])
+def combat_history_state(session_id):
+    """Estado do combate reconstruido num ponto do historico (?evento=<id> ou ?ronda=<n>)."""
+    _flush_combat_state(session_id, evict=False)
+    combat = session_service.get_session_combat(session_id)
+    if not combat:
+        return jsonify({'erro': 'Combate nao encontrado'}), 404
+
+    ronda = request.args.get('ronda', type=int)
+    if ronda is not None:
+        result = event_service.state_at_round(combat.id, ronda)
+    else:
+        result = event_service.rebuild(combat.id, request.args.get('evento', type=int))
+    if result is None:
+        return jsonify({'erro': 'Sem historico para este combate'}), 404
+
+    state = result['state']
+    return jsonify({
+        'participants': state.get_participantes(),
+        'ronda': state.ronda_atual,
+        'turno': state.turno_atual,
+        'evento': result['event_id'],
+        'eventos_reaplicados': result['replayed']
+    })
 
 
 @combat_bp.route('/sessao/<int:session_id>/terminar', methods=['POST'])
@@ -101,18 +280,25 @@ def roll_attack_route(session_id):
     attack_result['target_id'] = data.get('target_id')
     attack_result['target_nome'] = data.get('target_nome')
 
+    store = _write_behind_store()
+    state = store.load(session_id) if store and combat else combat
+
     # Log the attack
-    log_service.log_attack(
+    log_kwargs = dict(
         session_id=session_id,
         actor_id=data.get('actor_id'),
         actor_nome=data.get('actor_nome'),
         target_id=data.get('target_id'),
         target_nome=data.get('target_nome'),
         attack_result=attack_result,
-        ronda=combat.ronda_atual if combat else 1,
-        turno=combat.turno_atual if combat else 1,
+        ronda=state.ronda_atual if state else 1,
+        turno=state.turno_atual if state else 1,
         combat_id=combat.id if combat else None
     )
+    if store and combat:
+        store.record(session_id, [], [('log_attack', log_kwargs)])
+    else:
+        log_service.log_attack(**log_kwargs)
 
     return jsonify(attack_result)
 
@@ -128,58 +314,394 @@ def roll_damage_route(session_id):
     combat = session_service.get_session_combat(session_id)
 
     # Roll damage
-    damage_result = roll_service.roll_damage(
-        dice_expression=data.get('dice_expression', '1d6'),
-        damage_type=data.get('damage_type', 'slashing'),
-        crit=data.get('crit', False),
-        resistance=data.get('resistance', False),
-        immunity=data.get('immunity', False),
-        vulnerability=data.get('vulnerability', False)
-    )
+    try:
+        damage_result = roll_service.roll_damage(
+            dice_expression=data.get('dice_expression', '1d6'),
+            damage_type=data.get('damage_type', 'slashing'),
+            crit=data.get('crit', False),
+            resistance=data.get('resistance', False),
+            immunity=data.get('immunity', False),
+            vulnerability=data.get('vulnerability', False)
+        )
+    except DiceExpressionError as e:
+        return jsonify({'erro': str(e)}), 400
 
-    # Apply damage to target HP
     target_id = data.get('target_id')
-    if target_id and combat:
-        participants = combat.get_participantes()
-        for p in participants:
-            if p.get('id') == target_id:
-                p['hp_atual'] = max(0, p['hp_atual'] - damage_result['final_damage'])
-
-                # Check for death
-                if p['hp_atual'] == 0:
-                    log_service.log_death(
+    store = _write_behind_store()
+    if store and combat:
+        damage_result = _record_damage(store, session_id, combat.id, target_id, data, damage_result)
+        if damage_result['target_hp_atual'] is not None:
+            _publish_participants(session_id, {
+                'versao': damage_result['versao'],
+                'participants': [{'id': str(target_id), 'hp_atual': damage_result['target_hp_atual']}]
+            })
+        return jsonify(damage_result)
+
+    # Aplicar o dano e registar tudo numa so transacao (um commit)
+    target = combat.get_participante(target_id) if target_id and combat else None
+    with log_service.unit_of_work():
+        log_service.log_damage(
+            session_id=session_id,
+            actor_id=data.get('actor_id'),
+            actor_nome=data.get('actor_nome'),
+            target_id=target_id,
+            target_nome=data.get('target_nome'),
+            damage_result=damage_result,
+            ronda=combat.ronda_atual if combat else 1,
+            turno=combat.turno_atual if combat else 1,
+            combat_id=combat.id if combat else None
+        )
+
+        if target:
+            # UPDATE de uma so linha (hp_atual do alvo)
+            if target.aplicar_dano(damage_result['final_damage']):
+                log_service.log_death(
+                    session_id=session_id,
+                    actor_id=target_id,
+                    actor_nome=target.nome or 'Desconhecido',
+                    ronda=combat.ronda_atual,
+                    turno=combat.turno_atual,
+                    combat_id=combat.id
+                )
+            log_service.log_state(
+                session_id=session_id,
+                operations=[{'op': 'set_hp', 'id': target.participant_id, 'hp_atual': target.hp_atual}],
+                ronda=combat.ronda_atual,
+                turno=combat.turno_atual,
+                combat_id=combat.id
+            )
+            combat.incrementar_versao()
+
+    # Return updated participant info
+    damage_result['target_hp_atual'] = target.hp_atual if target else None
+    damage_result['versao'] = combat.versao if combat else None
+    if target:
+        _publish_participants(session_id, {
+            'versao': combat.versao,
+            'participants': [{'id': target.participant_id, 'hp_atual': target.hp_atual}]
+        })
+
+    return jsonify(damage_result)
+
+
+def _record_damage(store, session_id, combat_id, target_id, data, damage_result):
+    """Aplicar dano no estado em memoria (write-behind) e agendar os logs."""
+    with store.lock:
+        state = store.load(session_id)
+        target = state.get_participante(target_id) if target_id else None
+        log_kwargs = dict(
+            session_id=session_id,
+            actor_id=data.get('actor_id'),
+            actor_nome=data.get('actor_nome'),
+            target_id=target_id,
+            target_nome=data.get('target_nome'),
+            damage_result=damage_result,
+            ronda=state.ronda_atual,
+            turno=state.turno_atual,
+            combat_id=combat_id
+        )
+        logs = [('log_damage', log_kwargs)]
+        operations = []
+
+        if target:
+            hp = max(0, target.hp_atual - damage_result['final_damage'])
+            operations.append({'op': 'set_hp', 'id': target.participant_id, 'hp_atual': hp})
+            if target.hp_atual > 0 and hp == 0:
+                logs.append(('log_death', dict(
+                    session_id=session_id,
+                    actor_id=target_id,
+                    actor_nome=target.nome or 'Desconhecido',
+                    ronda=state.ronda_atual,
+                    turno=state.turno_atual,
+                    combat_id=combat_id
+                )))
+
+        result = store.record(session_id, operations, logs)
+        damage_result['target_hp_atual'] = hp if target else None
+        damage_result['versao'] = result['versao']
+    return damage_result
+
+
+def _log_hp_changes(session_id, combat, participants, hp_before, condition_operations=()):
+    """Registar como evento de estado os HP (e condicoes) alterados por uma acao em massa (devolve-os)."""
+    operations = [
+        {'op': 'set_hp', 'id': p.participant_id, 'hp_atual': p.hp_atual}
+        for p in participants if p.hp_atual != hp_before.get(p.participant_id)
+    ]
+    changed = {op['id']: {'id': op['id'], 'hp_atual': op['hp_atual']} for op in operations}
+    by_id = {p.participant_id: p for p in participants}
+    for op in condition_operations:
+        participant = by_id[op['id']]
+        changed.setdefault(op['id'], {'id': op['id']}).update(
+            condicoes=participant.get_condicoes(),
+            efeitos=participant.get_efeitos()
+        )
+    operations.extend(condition_operations)
+
+    if operations:
+        log_service.log_state(
+            session_id=session_id,
+            operations=operations,
+            ronda=combat.ronda_atual,
+            turno=combat.turno_atual,
+            combat_id=combat.id,
+            commit=False
+        )
+    return list(changed.values())
+
+
+@combat_bp.route('/sessao/<int:session_id>/ataques-em-massa', methods=['POST'])
+def bulk_attack_route(session_id):
+    """Resolver vários ataques (e dano) num só pedido e numa só transação."""
+    game_session = session_service.get_session(session_id)
+    if not game_session:
+        return jsonify({'erro': 'Sessao nao encontrada'}), 404
+
+    _flush_combat_state(session_id)
+    combat = session_service.get_session_combat(session_id)
+    if not combat or not combat.activo:
+        return jsonify({'erro': 'Combate nao encontrado'}), 404
+
+    data = request.get_json() or {}
+    attacks = data.get('attacks', [])
+    if not attacks or not isinstance(attacks, list) or not all(isinstance(attack, dict) for attack in attacks):
+        return jsonify({'erro': 'Nenhum ataque fornecido'}), 400
+
+    participants = combat.get_linhas_participantes()
+    by_id = {p.participant_id: p for p in participants}
+    hp_before = {p.participant_id: p.hp_atual for p in participants}
+
+    # AC do alvo vem do combate se não for indicada
+    for attack in attacks:
+        target = by_id.get(str(attack.get('target_id')))
+        if target is None:
+            return jsonify({'erro': f"Alvo nao encontrado: {attack.get('target_id')}"}), 400
+        try:
+            attack['bonus'] = int(attack.get('bonus', 0))
+            attack['target_ac'] = int(attack['target_ac']) if attack.get('target_ac') is not None else target.ac
+        except (TypeError, ValueError):
+            return jsonify({'erro': 'Bonus de ataque ou AC invalidos'}), 400
+
+    try:
+        results = roll_service.roll_attacks_batch(attacks)
+    except DiceExpressionError as e:
+        return jsonify({'erro': str(e)}), 400
+
+    ronda, turno = combat.ronda_atual, combat.turno_atual
+    total_damage = 0
+    # Logs e HP numa so transacao (logs inseridos em lote, um so commit)
+    with log_service.unit_of_work():
+        for attack, result in zip(attacks, results):
+            target = by_id[str(attack['target_id'])]
+            attack_result = result['attack']
+            attack_result.update({
+                'actor_id': attack.get('actor_id'),
+                'actor_nome': attack.get('actor_nome'),
+                'target_id': attack['target_id'],
+                'target_nome': target.nome
+            })
+
+            log_service.log_attack(
+                session_id=session_id,
+                actor_id=attack.get('actor_id'),
+                actor_nome=attack.get('actor_nome'),
+                target_id=attack['target_id'],
+                target_nome=target.nome,
+                attack_result=attack_result,
+                ronda=ronda,
+                turno=turno,
+                combat_id=combat.id
+            )
+
+            damage_result = result['damage']
+            if damage_result is None:
+                continue
+
+            went_down = target.aplicar_dano(damage_result['final_damage'])
+            total_damage += damage_result['final_damage']
+
+            log_service.log_damage(
+                session_id=session_id,
+                actor_id=attack.get('actor_id'),
+                actor_nome=attack.get('actor_nome'),
+                target_id=attack['target_id'],
+                target_nome=target.nome,
+                damage_result=damage_result,
+                ronda=ronda,
+                turno=turno,
+                combat_id=combat.id
+            )
+
+            if went_down:
+                log_service.log_death(
+                    session_id=session_id,
+                    actor_id=attack['target_id'],
+                    actor_nome=target.nome or 'Desconhecido',
+                    ronda=ronda,
+                    turno=turno,
+                    combat_id=combat.id
+                )
+
+        changed = _log_hp_changes(session_id, combat, participants, hp_before)
+        combat.incrementar_versao()
+    _publish_participants(session_id, {'versao': combat.versao, 'participants': changed})
+
+    hits = sum(1 for r in results if r['attack']['hit'])
+    return jsonify({
+        'results': results,
+        'hits': hits,
+        'misses': len(results) - hits,
+        'total_damage': total_damage,
+        'participants': [{'id': p.participant_id, 'hp_atual': p.hp_atual} for p in participants],
+        'versao': combat.versao
+    })
+
+
+@combat_bp.route('/sessao/<int:session_id>/salvaguardas-em-massa', methods=['POST'])
+def bulk_save_route(session_id):
+    """Resolver salvaguardas de vários alvos contra um efeito (ex: Bola de Fogo)."""
+    game_session = session_service.get_session(session_id)
+    if not game_session:
+        return jsonify({'erro': 'Sessao nao encontrada'}), 404
+
+    _flush_combat_state(session_id)
+    combat = session_service.get_session_combat(session_id)
+    if not combat or not combat.activo:
+        return jsonify({'erro': 'Combate nao encontrado'}), 404
+
+    data = request.get_json() or {}
+    saves = data.get('targets', [])
+    if not saves or not isinstance(saves, list) or not all(isinstance(save, dict) for save in saves):
+        return jsonify({'erro': 'Nenhum alvo fornecido'}), 400
+
+    try:
+        dc = int(data.get('dc', 10))
+    except (TypeError, ValueError):
+        return jsonify({'erro': 'CD invalida'}), 400
+
+    participants = combat.get_linhas_participantes()
+    by_id = {p.participant_id: p for p in participants}
+    hp_before = {p.participant_id: p.hp_atual for p in participants}
+    for save in saves:
+        if str(save.get('target_id')) not in by_id:
+            return jsonify({'erro': f"Alvo nao encontrado: {save.get('target_id')}"}), 400
+        try:
+            save['save_bonus'] = int(save.get('save_bonus', 0))
+        except (TypeError, ValueError):
+            return jsonify({'erro': 'Bonus de salvaguarda invalido'}), 400
+
+    try:
+        results = roll_service.roll_saves_batch(
+            saves,
+            dc=dc,
+            dice_expression=data.get('dice_expression'),
+            damage_type=data.get('damage_type', 'fire'),
+            half_on_success=data.get('half_on_success', True)
+        )
+    except DiceExpressionError as e:
+        return jsonify({'erro': str(e)}), 400
+
+    ronda, turno = combat.ronda_atual, combat.turno_atual
+    actor_id = data.get('actor_id', 'efeito')
+    actor_nome = data.get('actor_nome', 'Efeito')
+    total_damage = 0
+    condition_operations = []
+    # Logs e HP numa so transacao (logs inseridos em lote, um so commit)
+    with log_service.unit_of_work():
+        for save, result in zip(saves, results):
+            target = by_id[str(save['target_id'])]
+            result['target_id'] = save['target_id']
+            result['target_nome'] = target.nome
+
+            damage = result.get('final_damage') or 0
+            went_down = target.aplicar_dano(damage) if damage else False
+            total_damage += damage
+
+            log_service.log_save(
+                session_id=session_id,
+                actor_id=actor_id,
+                actor_nome=actor_nome,
+                target_id=save['target_id'],
+                target_nome=target.nome,
+                save_result=result,
+                ronda=ronda,
+                turno=turno,
+                combat_id=combat.id
+            )
+
+            # Uma salvaguarda bem-sucedida termina as condicoes "ate passar a salvaguarda"
+            if result['success']:
+                atributo = save.get('atributo', data.get('atributo'))
+                result['condicoes_terminadas'] = patch_service.scheduler.terminar_por_salvaguarda(target, atributo)
+                for condition in result['condicoes_terminadas']:
+                    condition_operations.append({'op': 'remove_condition', 'id': target.participant_id, 'condition': condition})
+                    log_service.log_condition(
                         session_id=session_id,
-                        actor_id=target_id,
-                        actor_nome=p.get('nome', 'Desconhecido'),
-                        ronda=combat.ronda_atual,
-                        turno=combat.turno_atual,
+                        actor_id=target.participant_id,
+                        actor_nome=target.nome or 'Desconhecido',
+                        condition=condition,
+                        added=False,
+                        ronda=ronda,
+                        turno=turno,
                         combat_id=combat.id
                     )
-                break
 
-        combat.set_participantes(participants)
-        db.session.commit()
+            if went_down:
+                log_service.log_death(
+                    session_id=session_id,
+                    actor_id=save['target_id'],
+                    actor_nome=target.nome or 'Desconhecido',
+                    ronda=ronda,
+                    turno=turno,
+                    combat_id=combat.id
+                )
 
-    # Log the damage
-    log_service.log_damage(
-        session_id=session_id,
-        actor_id=data.get('actor_id'),
-        actor_nome=data.get('actor_nome'),
-        target_id=target_id,
-        target_nome=data.get('target_nome'),
-        damage_result=damage_result,
-        ronda=combat.ronda_atual if combat else 1,
-        turno=combat.turno_atual if combat else 1,
-        combat_id=combat.id if combat else None
-    )
+        changed = _log_hp_changes(session_id, combat, participants, hp_before, condition_operations)
+        combat.incrementar_versao()
+    _publish_participants(session_id, {'versao': combat.versao, 'participants': changed})
 
-    # Return updated participant info
-    damage_result['target_hp_atual'] = next(
-        (p['hp_atual'] for p in combat.get_participantes() if p.get('id') == target_id),
-        None
-    ) if combat else None
+    return jsonify({
+        'results': results,
+        'successes': sum(1 for r in results if r['success']),
+        'failures': sum(1 for r in results if not r['success']),
+        'total_damage': total_damage,
+        'participants': [{'id': p.participant_id, 'hp_atual': p.hp_atual} for p in participants],
+        'versao': combat.versao
+    })
 
-    return jsonify(damage_result)
+
+@combat_bp.route('/probabilidades', methods=['POST'])
+def attack_probabilities_route():
+    """Probabilidades exatas de acerto/crítico e dano esperado de um ataque."""
+    data = request.get_json() or {}
+
+    try:
+        bonus = int(data.get('bonus', 0))
+        target_ac = int(data.get('target_ac', 10))
+    except (TypeError, ValueError):
+        return jsonify({'erro': 'Bonus e AC devem ser numeros'}), 400
+
+    advantage = data.get('advantage', False)
+    disadvantage = data.get('disadvantage', False)
+    dice_expression = data.get('dice_expression')
+
+    if not dice_expression:
+        return jsonify(probability_service.attack_probabilities(bonus, target_ac, advantage, disadvantage))
+
+    try:
+        result = probability_service.expected_damage(
+            bonus, target_ac, dice_expression,
+            advantage=advantage,
+            disadvantage=disadvantage,
+            resistance=data.get('resistance', False),
+            immunity=data.get('immunity', False),
+            vulnerability=data.get('vulnerability', False)
+        )
+        result['dice'] = probability_service.dice_stats(dice_expression)
+    except DiceExpressionError as e:
+        return jsonify({'erro': str(e)}), 400
+
+    return jsonify(result)
 
 
 @combat_bp.route('/sessao/<int:session_id>/magia', methods=['POST'])
@@ -190,6 +712,7 @@ def cast_spell_route(session_id):
         return jsonify({'erro': 'Sessao nao encontrada'}), 404
 
     data = request.get_json()
+    _flush_combat_state(session_id)
     combat = session_service.get_session_combat(session_id)
 
     if not combat:
@@ -199,26 +722,23 @@ def cast_spell_route(session_id):
     spell_level = data.get('spell_level', 0)
 
     # Use spell slot (if not cantrip)
-    slot_used = True
-    if spell_level > 0:
-        slot_used = combat.use_spell_slot(participant_id, spell_level)
-        if not slot_used:
-            return jsonify({'erro': 'Nenhum spell slot disponivel'}), 400
-        db.session.commit()
-
-    # Log the spell
-    log_service.log_spell(
-        session_id=session_id,
-        actor_id=data.get('actor_id'),
-        actor_nome=data.get('actor_nome'),
-        spell_name=data.get('spell_name', 'Magia'),
-        spell_level=spell_level,
-        target_id=data.get('target_id'),
-        target_nome=data.get('target_nome'),
-        ronda=combat.ronda_atual,
-        turno=combat.turno_atual,
-        combat_id=combat.id
-    )
+    if spell_level > 0 and not combat.use_spell_slot(participant_id, spell_level):
+        return jsonify({'erro': 'Nenhum spell slot disponivel'}), 400
+
+    # Gastar o slot e registar a magia numa so transacao
+    with log_service.unit_of_work():
+        log_service.log_spell(
+            session_id=session_id,
+            actor_id=data.get('actor_id'),
+            actor_nome=data.get('actor_nome'),
+            spell_name=data.get('spell_name', 'Magia'),
+            spell_level=spell_level,
+            target_id=data.get('target_id'),
+            target_nome=data.get('target_nome'),
+            ronda=combat.ronda_atual,
+            turno=combat.turno_atual,
+            combat_id=combat.id
+        )
 
     return jsonify({
         'success': True,
@@ -228,21 +748,36 @@ def cast_spell_route(session_id):
 
 @combat_bp.route('/sessao/<int:session_id>/log', methods=['GET'])
 def get_combat_log_route(session_id):
-    """Obter combat log."""
+    """Obter combat log (mais recente primeiro).
+
+    Paginacao por ID: ?since_id=<maior ID recebido> devolve so as entradas
+    novas; ?before_id=<menor ID recebido> devolve a pagina anterior.
+    has_more indica se ha mais entradas nessa direcao.
+    """
     game_session = session_service.get_session(session_id)
     if not game_session:
         return jsonify({'erro': 'Sessao nao encontrada'}), 404
 
-    limit = request.args.get('limit', 50, type=int)
+    _flush_combat_state(session_id, evict=False)
+
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
     combat_id = request.args.get('combat_id', type=int)
+    since_id = request.args.get('since_id', type=int)
 
+    # Pedir mais um para saber se ha mais entradas
     logs = log_service.get_combat_logs(
         session_id=session_id,
-        limit=limit,
-        combat_id=combat_id
+        limit=limit + 1,
+        combat_id=combat_id,
+        since_id=since_id,
+        before_id=request.args.get('before_id', type=int)
     )
+    has_more = len(logs) > limit
+    if has_more:
+        logs = logs[1:] if since_id is not None else logs[:limit]
 
     return jsonify({
+        'has_more': has_more,
         'logs': [
             {
                 'id': log.id,
@@ -266,6 +801,8 @@ def clear_combat_log_route(session_id):
     if not game_session:
         return jsonify({'erro': 'Sessao nao encontrada'}), 404
 
+    _flush_combat_state(session_id, evict=False)
+
     combat_id = request.get_json().get('combat_id') if request.is_json else None
     count = log_service.clear_combat_logs(session_id, combat_id)
 
@@ -280,6 +817,7 @@ def use_action_route(session_id):
         return jsonify({'erro': 'Sessao nao encontrada'}), 404
 
     data = request.get_json()
+    _flush_combat_state(session_id)
     combat = session_service.get_session_combat(session_id)
 
     if not combat:
@@ -288,8 +826,16 @@ def use_action_route(session_id):
     participant_id = data.get('participant_id')
     action_type = data.get('action_type')  # 'action', 'bonus_action', 'reaction', 'movement'
 
-    combat.use_action(participant_id, action_type)
+    try:
+        used = combat.use_action(participant_id, action_type)
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
     db.session.commit()
+    if not used:
+        return jsonify({
+            'erro': 'Acao ja usada',
+            'action_economy': combat.get_action_economy().get(participant_id, {})
+        }), 400
 
     return jsonify({
         'success': True,
@@ -299,18 +845,24 @@ def use_action_route(session_id):
 
 @combat_bp.route('/sessao/<int:session_id>/action-economy/reset', methods=['POST'])
 def reset_action_economy_route(session_id):
-    """Resetar action economy para um participante."""
+    """Resetar action economy de um participante (ou de todos, sem participant_id)."""
     game_session = session_service.get_session(session_id)
     if not game_session:
         return jsonify({'erro': 'Sessao nao encontrada'}), 404
 
     data = request.get_json()
+    _flush_combat_state(session_id)
     combat = session_service.get_session_combat(session_id)
 
     if not combat:
         return jsonify({'erro': 'Combate nao encontrado'}), 404
 
     participant_id = data.get('participant_id')
+    if participant_id is None:
+        combat.reset_action_economy()
+        db.session.commit()
+        return jsonify({'success': True, 'action_economy': combat.get_action_economy()})
+
     combat.reset_action_economy_for_participant(participant_id)
     db.session.commit()
 
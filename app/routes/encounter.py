@@ -4,7 +4,13 @@ Rotas para o Gerador de Encontros
 
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, session
 from app.services.encounter_generator import EncounterGeneratorService
-from app.services.quest_loader import QuestLoader
+from app.services.quest_loader import get_quest_loader
+from app.services.monster_catalog import get_monster_catalog
+from app.services.combat_simulator import CombatSimulatorService, MAX_COMBATANTS, MAX_ITERATIONS, get_simulation_executor
+from app.services.combat_state_store import get_combat_state_store
+from app.services.combat_event_service import CombatEventService
+from app.services.combat_roll_service import CombatRollService
+from app.services.event_bus import publish_combat_state
 from app.services.session_service import SessionService
 from app.models.session import GameSession
 
@@ -12,15 +18,15 @@ encounter_bp = Blueprint('encounter', __name__, url_prefix='/gerador-encontros')
 
 # Serviços
 encounter_service = EncounterGeneratorService()
-quest_loader = QuestLoader()
 session_service = SessionService()
+simulator_service = CombatSimulatorService()
 
 
 @encounter_bp.route('/')
 def generator_page():
     """Página do gerador de encontros."""
-    # Carregar todas as quests para obter pool de monstros
-    quests = quest_loader.get_all_quests()
+    # Resumo das quests para o selector de pool de monstros
+    quests = get_quest_loader().get_quest_summaries()
 
     # Obter sessão activa se existir
     active_session_id = session.get('active_session_id')
@@ -48,6 +54,8 @@ def generate_encounter():
         quest_id = data.get('quest_id')  # Opcional
         max_monsters = data.get('max_monsters', 10)
         min_monsters = data.get('min_monsters', 1)
+        mode = data.get('mode', 'greedy')  # 'greedy' ou 'exact'
+        seed = data.get('seed')  # Opcional, para resultados reprodutiveis
 
         # Validações
         if not isinstance(party_levels, list) or not party_levels:
@@ -56,29 +64,11 @@ def generate_encounter():
         if difficulty not in ['easy', 'medium', 'hard', 'deadly']:
             return jsonify({'error': 'Dificuldade inválida'}), 400
 
-        # Obter pool de monstros
-        monster_pool = []
-
-        if quest_id and quest_id != 'all':
-            # Monstros de uma quest específica
-            quest = quest_loader.get_quest(quest_id)
-            if quest and hasattr(quest, 'monstros') and quest.monstros:
-                # monstros é um dict {id: Monster}, pegar os valores
-                monster_pool = [m.__dict__ if hasattr(m, '__dict__') else m for m in quest.monstros.values()]
-        else:
-            # Todos os monstros de todas as quests
-            quests = quest_loader.get_all_quests()
-            seen_ids = set()
-            for q in quests:
-                if hasattr(q, 'monstros') and q.monstros:
-                    # monstros é um dict {id: Monster}
-                    for monster_id, monster in q.monstros.items():
-                        # Evitar duplicados
-                        if monster_id not in seen_ids:
-                            # Converter Monster object para dict
-                            monster_dict = monster.__dict__ if hasattr(monster, '__dict__') else monster
-                            monster_pool.append(monster_dict)
-                            seen_ids.add(monster_id)
+        if mode not in ['greedy', 'exact']:
+            return jsonify({'error': 'Modo de geração inválido'}), 400
+
+        # Obter pool de monstros (catálogo global indexado)
+        monster_pool = get_monster_catalog().get_pool(quest_id)
 
         if not monster_pool:
             return jsonify({'error': 'Nenhum monstro disponível no pool selecionado'}), 400
@@ -89,7 +79,9 @@ def generate_encounter():
             difficulty=difficulty,
             monster_pool=monster_pool,
             max_monsters=max_monsters,
-            min_monsters=min_monsters
+            min_monsters=min_monsters,
+            mode=mode,
+            seed=seed
         )
 
         # Adicionar dificuldade real calculada
@@ -100,10 +92,110 @@ def generate_encounter():
 
         return jsonify(encounter)
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro ao gerar encontro: {str(e)}'}), 500
 
 
+@encounter_bp.route('/gerar-lote', methods=['POST'])
+def generate_encounters_batch():
+    """Gera vários encontros candidatos para o mesmo grupo."""
+    try:
+        data = request.get_json()
+
+        party_size = data.get('party_size', 4)
+        party_levels = data.get('party_levels', [1] * party_size)
+        difficulty = data.get('difficulty', 'medium')
+        quest_id = data.get('quest_id')
+        max_monsters = data.get('max_monsters', 10)
+        min_monsters = data.get('min_monsters', 1)
+        count = data.get('count', 20)
+        seed = data.get('seed')
+
+        if not isinstance(party_levels, list) or not party_levels:
+            return jsonify({'error': 'Níveis do grupo inválidos'}), 400
+
+        if difficulty not in ['easy', 'medium', 'hard', 'deadly']:
+            return jsonify({'error': 'Dificuldade inválida'}), 400
+
+        if not isinstance(count, int) or not 1 <= count <= 100:
+            return jsonify({'error': 'Número de encontros deve estar entre 1 e 100'}), 400
+
+        monster_pool = get_monster_catalog().get_pool(quest_id)
+        if not monster_pool:
+            return jsonify({'error': 'Nenhum monstro disponível no pool selecionado'}), 400
+
+        result = encounter_service.generate_encounters_batch(
+            party_levels=party_levels,
+            difficulty=difficulty,
+            monster_pool=monster_pool,
+            count=count,
+            max_monsters=max_monsters,
+            min_monsters=min_monsters,
+            seed=seed
+        )
+
+        return jsonify(result)
+
+    except Exception as e:
+        return jsonify({'error': f'Erro ao gerar encontros: {str(e)}'}), 500
+
+
+@encounter_bp.route('/simular', methods=['POST'])
+def simulate_encounter():
+    """Estima a letalidade de um encontro por simulação Monte Carlo."""
+    try:
+        data = request.get_json()
+
+        session_id = data.get('session_id')
+        party_levels = data.get('party_levels', [1] * data.get('party_size', 4))
+        monsters = data.get('monsters', [])
+        iterations = data.get('iterations', 10000)
+        seed = data.get('seed')
+
+        if not monsters:
+            return jsonify({'error': 'Nenhum monstro para simular'}), 400
+
+        if not isinstance(iterations, int) or not 1 <= iterations <= MAX_ITERATIONS:
+            return jsonify({'error': f'Número de simulações deve estar entre 1 e {MAX_ITERATIONS}'}), 400
+
+        # Grupo: personagens da sessão, ou aventureiros genéricos pelos níveis
+        players = []
+        if session_id:
+            for player in session_service.get_session_players(session_id):
+                players.append(simulator_service.player_from_character(
+                    player.nome_jogador, player.get_character_data(), player.hp_atual
+                ))
+        if not players:
+            if not isinstance(party_levels, list) or not party_levels:
+                return jsonify({'error': 'Níveis do grupo inválidos'}), 400
+            players = [simulator_service.generic_player(level) for level in party_levels]
+
+        quantities = [monster_data.get('quantity', 1) for monster_data in monsters]
+        if any(isinstance(q, bool) or not isinstance(q, int) or q < 1 for q in quantities):
+            return jsonify({'error': 'Quantidade de monstros inválida'}), 400
+        if len(players) + sum(quantities) > MAX_COMBATANTS:
+            return jsonify({'error': f'Uma simulação pode ter no máximo {MAX_COMBATANTS} combatentes'}), 400
+
+        catalog = get_monster_catalog()
+        combatants = []
+        for monster_data, quantity in zip(monsters, quantities):
+            monster = catalog.get(monster_data.get('id')) or monster_data
+            combatant = simulator_service.monster_combatant(monster)
+            combatants.extend(dict(combatant) for _ in range(quantity))
+
+        result = simulator_service.simulate(
+            players, combatants, iterations=iterations, seed=seed, executor=get_simulation_executor()
+        )
+        return jsonify(result)
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Erro ao simular encontro: {str(e)}'}), 500
+
+
 @encounter_bp.route('/adicionar-combate', methods=['POST'])
 def add_to_combat():
     """Adiciona o encontro gerado ao combat tracker de uma sessão."""
@@ -124,7 +216,8 @@ def add_to_combat():
         if not game_session:
             return jsonify({'error': 'Sessão não encontrada'}), 404
 
-        # Obter ou criar combate
+        # Obter ou criar combate (escrevendo antes o estado em memória, se houver)
+        get_combat_state_store().flush(session_id, evict=True)
         combat = game_session.combate
         if not combat:
             from app.models.session import SessionCombat
@@ -134,14 +227,21 @@ def add_to_combat():
             db.session.commit()
 
         # Adicionar monstros ao combate
-        participantes = combat.get_participantes()
+        total = len(combat.get_linhas_participantes())
+        catalog = get_monster_catalog()
+        novos = []
 
         for monster_data in monsters:
             quantity = monster_data.get('quantity', 1)
+            base_id = monster_data.get('id', 'monster')
+            destreza_mod = monster_data.get('destreza_mod')
+            if destreza_mod is None:
+                destreza = monster_data.get('destreza') or (catalog.get(base_id) or {}).get('destreza', 10)
+                destreza_mod = (destreza - 10) // 2
+
             for i in range(quantity):
                 # Gerar ID único para cada instância
-                base_id = monster_data.get('id', 'monster')
-                unique_id = f"{base_id}_{len(participantes) + 1}"
+                unique_id = f"{base_id}_{total + len(novos) + 1}"
 
                 participante = {
                     'id': unique_id,
@@ -150,16 +250,22 @@ def add_to_combat():
                     'hp_atual': monster_data.get('hp_max', 10),
                     'hp_max': monster_data.get('hp_max', 10),
                     'ac': monster_data.get('ac', 10),
-                    'iniciativa': 10,  # Placeholder
-                    'xp': monster_data.get('xp', 0)
+                    'destreza_mod': destreza_mod,
+                    'xp': monster_data.get('xp', 0),
+                    'monster_id': base_id
                 }
-                participantes.append(participante)
+                novos.append(participante)
+
+        # Iniciativa rolada no servidor; cada monstro entra na sua posição da ordem
+        for participante in CombatRollService.roll_initiative_batch(novos, group=bool(data.get('iniciativa_grupo'))):
+            combat.inserir_por_iniciativa(participante)
 
-        combat.set_participantes(participantes)
         combat.activo = True
+        CombatEventService.record_restore(combat)
 
         from app import db
         db.session.commit()
+        publish_combat_state(combat)
 
         return jsonify({
             'success': True,
@@ -181,9 +287,11 @@ def calculate_budget():
         difficulty = data.get('difficulty', 'medium')
 
         xp_budget = encounter_service.calculate_xp_budget(party_levels, difficulty)
+        thresholds = encounter_service.classify(party_levels, 0)['thresholds']
 
         return jsonify({
             'xp_budget': xp_budget,
+            'thresholds': thresholds,
             'party_size': len(party_levels),
             'difficulty': difficulty
         })
@@ -46,9 +46,9 @@ def characters():
 @main_bp.route('/ajuda')
 def help_page():
     """Pagina de ajuda - como usar o DM Companion."""
-    from app.services.quest_loader import QuestLoader
-    loader = QuestLoader()
-    quests = loader.get_all_quests()
+    from app.services.quest_loader import get_quest_loader
+    loader = get_quest_loader()
+    quests = loader.get_quest_summaries()
     return render_template('help.html', quests=quests)
 
 
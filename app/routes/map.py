@@ -2,11 +2,17 @@
 
 from flask import Blueprint, request, jsonify
 from app.services.position_service import PositionService
+from app.services.event_bus import publish_event
 
 map_bp = Blueprint('map', __name__, url_prefix='/mapa')
 position_service = PositionService()
 
 
+def _publish_entity(session_id, step_id, data):
+    """Publicar alteracao de uma entidade do mapa para os clientes da sessao."""
+    publish_event(session_id, 'entity', dict(data, step_id=step_id))
+
+
 @map_bp.route('/sessao/<int:session_id>/passo/<int:step_id>/posicoes')
 def get_positions(session_id, step_id):
     """Obter todas as posicoes de entidades para um passo.
@@ -51,6 +57,7 @@ def move_entity(session_id, step_id):
     result = position_service.move_entity(session_id, step_id, entity_id, new_x, new_y)
 
     if result:
+        _publish_entity(session_id, step_id, result)
         return jsonify(result)
 
     return jsonify({'error': 'Entidade nao encontrada'}), 404
@@ -79,6 +86,7 @@ def toggle_visibility(session_id, step_id):
     visible = position_service.toggle_entity_visibility(session_id, step_id, entity_id)
 
     if visible is not None:
+        _publish_entity(session_id, step_id, {'entity_id': entity_id, 'visivel': visible})
         return jsonify({
             'entity_id': entity_id,
             'visivel': visible
@@ -113,6 +121,7 @@ def set_visibility(session_id, step_id):
     success = position_service.set_entity_visibility(session_id, step_id, entity_id, visible)
 
     if success:
+        _publish_entity(session_id, step_id, {'entity_id': entity_id, 'visivel': visible})
         return jsonify({
             'entity_id': entity_id,
             'visivel': visible
@@ -178,6 +187,7 @@ def update_entity_appearance(session_id, step_id, entity_id):
     )
 
     if result:
+        _publish_entity(session_id, step_id, result)
         return jsonify(result)
 
     return jsonify({'error': 'Entidade nao encontrada'}), 404
@@ -193,6 +203,7 @@ def remove_entity(session_id, step_id, entity_id):
     success = position_service.remove_entity(session_id, step_id, entity_id)
 
     if success:
+        _publish_entity(session_id, step_id, {'entity_id': entity_id, 'removido': True})
         return jsonify({
             'success': True,
             'entity_id': entity_id,
@@ -259,6 +270,7 @@ def initialize_map(session_id, step_id):
     positions_created = position_service.place_entities_initial(
         session_id, step_id, initial_positions
     )
+    _publish_entity(session_id, step_id, {'recarregar': True})
 
     return jsonify({
         'success': True,
@@ -276,6 +288,7 @@ def clear_positions(session_id, step_id):
         JSON com numero de posicoes removidas
     """
     count = position_service.clear_step_positions(session_id, step_id)
+    _publish_entity(session_id, step_id, {'recarregar': True})
 
     return jsonify({
         'success': True,
@@ -3,7 +3,7 @@
 import json
 import os
 from flask import Blueprint, render_template, abort
-from app.services.quest_loader import QuestLoader
+from app.services.quest_loader import get_quest_loader
 
 print_bp = Blueprint('print', __name__)
 
@@ -21,7 +21,7 @@ def load_characters():
 @print_bp.route('/mapa/<quest_id>')
 def map_view(quest_id):
     """Mapa imprimível da aventura."""
-    loader = QuestLoader()
+    loader = get_quest_loader()
     quest = loader.get_quest(quest_id)
     if not quest:
         abort(404)
@@ -37,7 +37,7 @@ def character_sheets():
 @print_bp.route('/aventura/<quest_id>')
 def quest_summary(quest_id):
     """Resumo imprimível da aventura."""
-    loader = QuestLoader()
+    loader = get_quest_loader()
     quest = loader.get_quest(quest_id)
     if not quest:
         abort(404)
@@ -47,7 +47,7 @@ def quest_summary(quest_id):
 @print_bp.route('/monstros/<quest_id>')
 def monster_cards(quest_id):
     """Fichas de monstros imprimíveis."""
-    loader = QuestLoader()
+    loader = get_quest_loader()
     quest = loader.get_quest(quest_id)
     if not quest:
         abort(404)
@@ -1,8 +1,10 @@
 """Rotas de gestao de aventuras."""
 
+import re
 from flask import Blueprint, render_template, abort, session, redirect, url_for, request, jsonify, flash
-from app.services.quest_loader import QuestLoader
+from app.services.quest_loader import get_quest_loader
 from app.services.session_service import SessionService, load_character_templates, get_saved_characters
+from app.services.combat_roll_service import CombatRollService
 from app.models.combat import CONDICOES_5E
 
 quest_bp = Blueprint('quest', __name__)
@@ -12,8 +14,8 @@ session_service = SessionService()
 @quest_bp.route('/')
 def list_quests():
     """Lista todas as aventuras disponiveis com informacao de sessoes."""
-    loader = QuestLoader()
-    quests = loader.get_all_quests()
+    loader = get_quest_loader()
+    quests = loader.get_quest_summaries()
 
     # Adicionar informacao de sessoes a cada aventura
     quests_data = []
@@ -32,7 +34,7 @@ def list_quests():
 @quest_bp.route('/<quest_id>/iniciar')
 def start_quest(quest_id):
     """Pagina para iniciar ou continuar uma aventura."""
-    loader = QuestLoader()
+    loader = get_quest_loader()
     quest = loader.get_quest(quest_id)
     if not quest:
         abort(404)
@@ -49,7 +51,7 @@ def start_quest(quest_id):
 @quest_bp.route('/<quest_id>/nova-sessao', methods=['POST'])
 def create_quest_session(quest_id):
     """Criar nova sessao para uma aventura."""
-    loader = QuestLoader()
+    loader = get_quest_loader()
     quest = loader.get_quest(quest_id)
     if not quest:
         flash('Aventura nao encontrada.', 'danger')
@@ -84,7 +86,7 @@ def delete_quest_session(quest_id, session_id):
 @quest_bp.route('/<quest_id>/sessao/<int:session_id>/escolher')
 def select_characters(quest_id, session_id):
     """Pagina para escolher personagens para a sessao."""
-    loader = QuestLoader()
+    loader = get_quest_loader()
     quest = loader.get_quest(quest_id)
     if not quest:
         abort(404)
@@ -177,7 +179,7 @@ def overview(quest_id):
         flash('Sessão não encontrada.', 'danger')
         return redirect(url_for('quest.start_quest', quest_id=quest_id))
 
-    loader = QuestLoader()
+    loader = get_quest_loader()
     quest = loader.get_quest(quest_id)
     if not quest:
         abort(404)
@@ -204,7 +206,7 @@ def step(quest_id, step_id):
         flash('Sessão não encontrada.', 'danger')
         return redirect(url_for('quest.start_quest', quest_id=quest_id))
 
-    loader = QuestLoader()
+    loader = get_quest_loader()
     quest = loader.get_quest(quest_id)
     if not quest:
         abort(404)
@@ -215,6 +217,10 @@ def step(quest_id, step_id):
 
     players = session_service.get_session_players(session_id)
 
+    # Navegacao pelo grafo de passos (indices construidos ao carregar a aventura)
+    previous_steps = [quest.get_step(i) for i in quest.get_previous_steps(step_id)]
+    next_steps = [quest.get_step(i) for i in quest.get_next_steps(step_id)]
+
     # Guardar progresso na base de dados
     session_service.update_progress(session_id, step_id)
 
@@ -226,6 +232,8 @@ def step(quest_id, step_id):
         quest=quest,
         step=current_step,
         step_id=step_id,
+        previous_steps=previous_steps,
+        next_steps=next_steps,
         game_session=game_session,
         players=players,
         CONDICOES_5E=CONDICOES_5E
@@ -246,7 +254,7 @@ def npcs(quest_id):
         flash('Sessão não encontrada.', 'danger')
         return redirect(url_for('quest.start_quest', quest_id=quest_id))
 
-    loader = QuestLoader()
+    loader = get_quest_loader()
     quest = loader.get_quest(quest_id)
     if not quest:
         abort(404)
@@ -271,7 +279,7 @@ def monsters(quest_id):
         flash('Sessão não encontrada.', 'danger')
         return redirect(url_for('quest.start_quest', quest_id=quest_id))
 
-    loader = QuestLoader()
+    loader = get_quest_loader()
     quest = loader.get_quest(quest_id)
     if not quest:
         abort(404)
@@ -282,6 +290,31 @@ def monsters(quest_id):
                           session_id=session_id)
 
 
+@quest_bp.route('/<quest_id>/api/monstros')
+def monsters_api(quest_id):
+    """Monstros da aventura em JSON, com os perfis de ataque compilados."""
+    quest = get_quest_loader().get_quest(quest_id)
+    if not quest:
+        return jsonify({'error': 'Aventura não encontrada'}), 404
+
+    return jsonify([
+        {
+            'id': monster.id,
+            'nome': monster.nome,
+            'tipo': monster.tipo,
+            'cr': monster.cr,
+            'xp': monster.xp,
+            'ac': monster.ac,
+            'hp_max': monster.hp_max,
+            'resistencias': monster.resistencias,
+            'imunidades': monster.imunidades,
+            'vulnerabilidades': monster.vulnerabilidades,
+            'perfis_ataque': monster.perfis_ataque
+        }
+        for monster in quest.monstros.values()
+    ])
+
+
 @quest_bp.route('/<quest_id>/passo/<int:step_id>/iniciar-combate', methods=['POST'])
 def start_step_combat(quest_id, step_id):
     """Preparar combate - redirecionar para pagina de iniciativa."""
@@ -297,37 +330,17 @@ def start_step_combat(quest_id, step_id):
                             session_id=session_id))
 
 
-@quest_bp.route('/<quest_id>/passo/<int:step_id>/iniciativa')
-def setup_initiative(quest_id, step_id):
-    """Pagina para definir iniciativa antes de comecar combate."""
-    session_id = request.args.get('session_id', type=int)
-    if not session_id:
-        flash('Sessao nao especificada.', 'danger')
-        return redirect(url_for('quest.step', quest_id=quest_id, step_id=step_id))
-
-    game_session = session_service.get_session(session_id)
-    if not game_session:
-        flash('Sessao nao encontrada.', 'danger')
-        return redirect(url_for('quest.list_quests'))
-
-    loader = QuestLoader()
-    quest = loader.get_quest(quest_id)
-    if not quest:
-        flash('Aventura nao encontrada.', 'danger')
-        return redirect(url_for('quest.list_quests'))
-
-    current_step = quest.get_step(step_id)
-    if not current_step:
-        flash('Passo nao encontrado.', 'danger')
-        return redirect(url_for('quest.step', quest_id=quest_id, step_id=step_id))
-
-    # Construir lista de participantes
+def _participantes_do_passo(quest, step, session_id):
+    """Participantes do combate dum passo: jogadores da sessao e monstros do passo."""
     participants = []
 
     # Adicionar jogadores da sessao
     players = session_service.get_session_players(session_id)
     for player in players:
         char_data = player.get_character_data()
+        destreza_mod = char_data.get('destreza_mod')
+        if destreza_mod is None:
+            destreza_mod = (char_data.get('destreza', 10) - 10) // 2
         participants.append({
             'id': f'player_{player.id}',
             'nome': char_data.get('nome', player.nome_jogador),
@@ -335,11 +348,11 @@ def setup_initiative(quest_id, step_id):
             'hp_max': player.hp_max,
             'hp_atual': player.hp_atual,
             'ac': char_data.get('ac', 10),
-            'destreza_mod': char_data.get('destreza_mod', 0)
+            'destreza_mod': destreza_mod
         })
 
     # Adicionar monstros do passo
-    monstros = quest.get_monsters_for_step(current_step)
+    monstros = quest.get_monsters_for_step(step)
     for i, monster in enumerate(monstros):
         participants.append({
             'id': f'monster_{monster.id}_{i}',
@@ -348,9 +361,49 @@ def setup_initiative(quest_id, step_id):
             'hp_max': monster.hp_max,
             'hp_atual': monster.hp_max,
             'ac': monster.ac,
-            'destreza_mod': getattr(monster, 'destreza_mod', 0)
+            'destreza_mod': monster.mod_destreza,
+            'monster_id': monster.id
         })
 
+    return participants
+
+
+def _carregar_passo(quest_id, step_id, session_id):
+    """Sessao, aventura e passo do combate (ou um redirect com a mensagem de erro)."""
+    if not session_id:
+        flash('Sessao nao especificada.', 'danger')
+        return None, redirect(url_for('quest.step', quest_id=quest_id, step_id=step_id))
+
+    game_session = session_service.get_session(session_id)
+    if not game_session:
+        flash('Sessao nao encontrada.', 'danger')
+        return None, redirect(url_for('quest.list_quests'))
+
+    loader = get_quest_loader()
+    quest = loader.get_quest(quest_id)
+    if not quest:
+        flash('Aventura nao encontrada.', 'danger')
+        return None, redirect(url_for('quest.list_quests'))
+
+    current_step = quest.get_step(step_id)
+    if not current_step:
+        flash('Passo nao encontrado.', 'danger')
+        return None, redirect(url_for('quest.step', quest_id=quest_id, step_id=step_id))
+
+    return (game_session, quest, current_step), None
+
+
+@quest_bp.route('/<quest_id>/passo/<int:step_id>/iniciativa')
+def setup_initiative(quest_id, step_id):
+    """Pagina para definir iniciativa antes de comecar combate."""
+    session_id = request.args.get('session_id', type=int)
+    carregado, erro = _carregar_passo(quest_id, step_id, session_id)
+    if erro:
+        return erro
+    game_session, quest, current_step = carregado
+
+    participants = _participantes_do_passo(quest, current_step, session_id)
+
     return render_template('quest/initiative.html',
                            quest=quest,
                            step=current_step,
@@ -358,6 +411,29 @@ def setup_initiative(quest_id, step_id):
                            participants=participants)
 
 
+@quest_bp.route('/<quest_id>/passo/<int:step_id>/iniciativa-automatica', methods=['POST'])
+def roll_initiative(quest_id, step_id):
+    """Lancar a iniciativa de todos no servidor e iniciar o combate."""
+    session_id = request.form.get('session_id', type=int)
+    carregado, erro = _carregar_passo(quest_id, step_id, session_id)
+    if erro:
+        return erro
+    game_session, quest, current_step = carregado
+
+    # Um so lancamento para todos; com grupo, cada tipo de monstro partilha o d20
+    participants = CombatRollService.roll_initiative_batch(
+        _participantes_do_passo(quest, current_step, session_id),
+        group=bool(request.form.get('grupo'))
+    )
+    for participant in participants:
+        participant['condicoes'] = []
+
+    session_service.start_combat(session_id, participants, quest_step_id=step_id)
+
+    flash('Iniciativa lancada. Combate iniciado!', 'success')
+    return redirect(url_for('combat.session_tracker', session_id=session_id))
+
+
 @quest_bp.route('/<quest_id>/passo/<int:step_id>/confirmar-combate', methods=['POST'])
 def confirm_combat(quest_id, step_id):
     """Iniciar combate com valores de iniciativa definidos."""
@@ -378,12 +454,18 @@ def confirm_combat(quest_id, step_id):
             'hp_atual': int(request.form.get(f'participant_{i}_hp_atual', 10)),
             'ac': int(request.form.get(f'participant_{i}_ac', 10)),
             'iniciativa': int(request.form.get(f'participant_{i}_iniciativa', 0)),
+            'destreza_mod': int(request.form.get(f'participant_{i}_destreza_mod', 0)),
             'condicoes': []
         }
+        # Guardar o ID do monstro para o tracker encontrar os perfis de ataque
+        monster_match = re.match(r'^monster_(.+)_\d+$', participant['id'] or '')
+        if monster_match:
+            participant['monster_id'] = monster_match.group(1)
         participants.append(participant)
         i += 1
 
-    # Iniciar combate na sessao
+    # Iniciar combate na sessao (por iniciativa; empate: maior Destreza)
+    participants.sort(key=CombatRollService.initiative_key)
     combat = session_service.start_combat(session_id, participants, quest_step_id=step_id)
 
     flash('Combate iniciado!', 'success')
@@ -1,14 +1,15 @@
 """Rotas para gestao de sessoes de jogo."""
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
+import json
+from flask import Blueprint, Response, current_app, render_template, request, redirect, url_for, flash, session, jsonify
 from app import db
+from app.services.event_bus import get_event_bus, publish_event
 from app.services.session_service import SessionService, load_character_templates, get_saved_characters
-from app.services.quest_loader import QuestLoader
+from app.services.quest_loader import get_quest_loader
 from app.services.time_service import TimeTrackingService
 
 session_bp = Blueprint('session', __name__, url_prefix='/sessao')
 session_service = SessionService()
-quest_loader = QuestLoader()
 time_service = TimeTrackingService()
 
 
@@ -16,16 +17,13 @@ time_service = TimeTrackingService()
 def list_sessions():
     """Lista todas as sessoes."""
     sessions = session_service.get_all_sessions()
+    quest_summaries = {q.id: q for q in get_quest_loader().get_quest_summaries()}
 
     # Adicionar informacao da quest a cada sessao
     sessions_data = []
     for s in sessions:
         session_dict = s.to_dict()
-        if s.quest_id:
-            quest = quest_loader.get_quest(s.quest_id)
-            session_dict['quest'] = quest
-        else:
-            session_dict['quest'] = None
+        session_dict['quest'] = quest_summaries.get(s.quest_id) if s.quest_id else None
         sessions_data.append(session_dict)
 
     return render_template('session/list.html', sessions=sessions_data)
@@ -34,7 +32,7 @@ def list_sessions():
 @session_bp.route('/nova', methods=['GET', 'POST'])
 def create_session():
     """Criar uma nova sessao."""
-    quests = quest_loader.get_all_quests()
+    quests = get_quest_loader().get_quest_summaries()
 
     if request.method == 'POST':
         nome = request.form.get('nome', 'Nova Sessao')
@@ -73,7 +71,7 @@ def dashboard(session_id):
     quest = None
     current_step = None
     if game_session.quest_id:
-        quest = quest_loader.get_quest(game_session.quest_id)
+        quest = get_quest_loader().get_quest(game_session.quest_id)
         if quest:
             current_step = quest.get_step(game_session.passo_atual)
 
@@ -106,7 +104,7 @@ def set_quest(session_id):
 
     quest_id = request.form.get('quest_id')
     if quest_id:
-        quest = quest_loader.get_quest(quest_id)
+        quest = get_quest_loader().get_quest(quest_id)
         if quest:
             session_service.set_quest(session_id, quest_id)
             flash(f'Aventura "{quest.titulo}" selecionada!', 'success')
@@ -212,11 +210,18 @@ def toggle_player_condition(session_id, player_id):
     """Adicionar ou remover condicao de um jogador."""
     condition = request.form.get('condition')
 
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
     if condition:
-        session_service.toggle_player_condition(player_id, condition)
+        try:
+            session_service.toggle_player_condition(player_id, condition)
+        except ValueError as e:
+            if is_ajax:
+                return jsonify({'error': str(e)}), 400
+            flash(str(e), 'danger')
 
     # Se for AJAX, retornar JSON
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+    if is_ajax:
         player = session_service.get_player(player_id)
         if player:
             return jsonify(player.to_dict())
@@ -306,12 +311,59 @@ def update_state(session_id):
     return redirect(url_for('session.dashboard', session_id=session_id))
 
 
+# ===== EVENTOS EM TEMPO REAL (SSE) =====
+
+@session_bp.app_template_global()
+def session_events_since():
+    """ID do ultimo evento publicado, para a pagina retomar o stream a partir dele."""
+    return get_event_bus().last_event_id()
+
+
+@session_bp.route('/<int:session_id>/eventos')
+def event_stream(session_id):
+    """Stream de eventos da sessao (Server-Sent Events).
+
+    Retoma a partir do cabecalho Last-Event-ID (reconexao automatica do
+    EventSource) ou do parametro ?desde= (ID dado a pagina quando foi gerada).
+    """
+    if not session_service.get_session(session_id):
+        return jsonify({'error': 'Sessao nao encontrada'}), 404
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('desde')
+    subscription = get_event_bus().subscribe(session_id, last_event_id)
+    heartbeat = current_app.config.get('SSE_HEARTBEAT_SECONDS', 15)
+
+    def stream():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                evt = subscription.get(timeout=heartbeat)
+                if evt is None:
+                    yield ': ping\n\n'  # Manter a ligacao aberta (proxies)
+                    continue
+                data = json.dumps(evt.data, ensure_ascii=False)
+                yield f'id: {evt.id}\nevent: {evt.type}\ndata: {data}\n\n'
+        finally:
+            subscription.close()
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
 # ===== RASTREAMENTO DE TEMPO (API) =====
 
+def _publish_time(session_id):
+    """Publicar o estado do tempo para os clientes ligados a sessao."""
+    publish_event(session_id, 'time', time_service.get_all_time_status(session_id))
+
+
 @session_bp.route('/<int:session_id>/tempo/iniciar', methods=['POST'])
 def start_timer(session_id):
     """Iniciar cronometro da sessao."""
     if time_service.start_session_timer(session_id):
+        _publish_time(session_id)
         return jsonify({'success': True})
     return jsonify({'error': 'Sessao nao encontrada'}), 404
 
@@ -321,6 +373,7 @@ def pause_timer(session_id):
     """Pausar cronometro da sessao."""
     total = time_service.pause_session_timer(session_id)
     if total >= 0:
+        _publish_time(session_id)
         return jsonify({'success': True, 'total_seconds': total})
     return jsonify({'error': 'Sessao nao encontrada'}), 404
 
@@ -342,6 +395,7 @@ def advance_time(session_id):
 
     result = time_service.advance_game_time(session_id, minutes=minutes, hours=hours, days=days)
     if result:
+        _publish_time(session_id)
         return jsonify(result)
 
     return jsonify({'error': 'Sessao nao encontrada'}), 404
@@ -355,6 +409,7 @@ def set_time(session_id):
     hora = data.get('hora', '08:00')
 
     if time_service.set_game_time(session_id, dia, hora):
+        _publish_time(session_id)
         return jsonify(time_service.get_game_time(session_id))
 
     return jsonify({'error': 'Formato de hora invalido ou sessao nao encontrada'}), 400
@@ -368,6 +423,7 @@ def register_rest(session_id):
 
     result = time_service.register_rest(session_id, rest_type)
     if result:
+        _publish_time(session_id)
         return jsonify(result)
 
     return jsonify({'error': 'Tipo de descanso invalido ou sessao nao encontrada'}), 400
@@ -380,6 +436,7 @@ def advance_exploration(session_id):
     turns = data.get('turnos', 1)
 
     total = time_service.advance_exploration_turn(session_id, turns)
+    _publish_time(session_id)
     return jsonify({
         'turnos_total': total,
         'tempo_jogo': time_service.get_game_time(session_id)
@@ -397,6 +454,7 @@ def advance_combat_round(session_id):
 
     # Avancar tempo no jogo (6 segundos = 1 ronda D&D)
     time_service.advance_game_time(session_id, seconds=6)
+    _publish_time(session_id)
 
     # Retornar estado atualizado
     return jsonify({
@@ -0,0 +1,279 @@
+"""
+Serviço de Eventos de Combate (event sourcing)
+
+O estado de um combate é derivado dos eventos 'state' do CombatLog (uma
+lista de operações do CombatPatchService por evento, ou um 'restore' com o
+estado completo no início do combate). O SessionCombat passa a ser apenas a
+cache do último estado.
+
+- Snapshots (CombatSnapshot) guardam o estado completo depois de um evento;
+  reconstruir custa O(eventos desde o snapshot). São criados quando uma
+  reconstrução de escrita (desfazer/refazer) tem de reaplicar
+  SNAPSHOT_INTERVAL ou mais eventos, e gravados no commit dessa escrita.
+- Desfazer/refazer são eventos próprios ('undo'/'redo', com o ID do evento
+  em target_id): o histórico nunca é reescrito.
+- Qualquer ponto do histórico (evento ou fim de uma ronda) pode ser
+  reconstruído para inspeção.
+"""
+
+from app import db
+from app.models.combat_log import CombatLog, CombatSnapshot
+from app.services.combat_log_service import CombatLogService
+from app.services.combat_patch_service import CombatPatchService, CombatPatchError
+from app.services.combat_state_store import CombatState, ParticipantState
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class CombatEventService:
+    """Serviço para reconstruir, inspecionar e desfazer o estado de combate."""
+
+    SNAPSHOT_INTERVAL = 25
+
+    def __init__(self):
+        self.patch_service = CombatPatchService()
+
+    # --- Reconstrução ---
+
+    def _history_marks(self, combat_id: int, until_event_id: Optional[int]) -> List[Tuple[int, str, int]]:
+        """Eventos de desfazer/refazer como (id, tipo, id do evento alvo), por ordem."""
+        query = CombatLog.query.filter(
+            CombatLog.combat_id == combat_id,
+            CombatLog.action_type.in_(CombatLog.HISTORY_EVENT_TYPES)
+        )
+        if until_event_id is not None:
+            query = query.filter(CombatLog.id <= until_event_id)
+        marks = []
+        for log in query.order_by(CombatLog.id).all():
+            try:
+                marks.append((log.id, log.action_type, int(log.target_id)))
+            except (TypeError, ValueError):
+                continue
+        return marks
+
+    def _undone(self, marks: List[Tuple[int, str, int]], after_event_id: int = 0) -> Set[int]:
+        """IDs de eventos desfeitos pelas marcas posteriores a after_event_id."""
+        undone = set()
+        for mark_id, kind, target in marks:
+            if mark_id <= after_event_id:
+                continue
+            if kind == 'undo':
+                undone.add(target)
+            else:
+                undone.discard(target)
+        return undone
+
+    def _base_snapshot(self, combat_id: int, head: int, marks) -> Optional[CombatSnapshot]:
+        """
+        Snapshot mais recente que pode servir de base até head.
+
+        Um snapshot deixa de servir se houver, depois dele, um desfazer/refazer
+        de um evento que ele já inclui; nesse caso recua-se para antes do alvo.
+        """
+        limit = head
+        while True:
+            snapshot = CombatSnapshot.query.filter(
+                CombatSnapshot.combat_id == combat_id,
+                CombatSnapshot.event_id <= limit
+            ).order_by(CombatSnapshot.event_id.desc()).first()
+            if snapshot is None:
+                return None
+            stale = [target for mark_id, _, target in marks
+                     if mark_id > snapshot.event_id and target <= snapshot.event_id]
+            if not stale:
+                return snapshot
+            limit = min(stale) - 1
+
+    def _head(self, combat_id: int) -> Optional[int]:
+        """ID do último evento de estado/histórico do combate."""
+        return db.session.query(db.func.max(CombatLog.id)).filter(
+            CombatLog.combat_id == combat_id,
+            CombatLog.action_type.in_(CombatLog.STATE_EVENT_TYPES + CombatLog.HISTORY_EVENT_TYPES)
+        ).scalar()
+
+    def _apply_event(self, state: CombatState, operations: List[Dict]):
+        """Aplicar as operações de um evento ao estado."""
+        for operation in operations:
+            if operation.get('op') == 'restore':
+                state.participantes = [
+                    ParticipantState.from_dict(p, i) for i, p in enumerate(operation.get('participants', []))
+                ]
+                state.ronda_atual = operation.get('ronda', state.ronda_atual)
+                state.turno_atual = operation.get('turno', state.turno_atual)
+                state.agenda_efeitos = None  # Reconstruída a partir dos efeitos dos participantes
+                continue
+            try:
+                self.patch_service.apply_operations(state, [operation])
+            except CombatPatchError:
+                continue  # Operação que já não se aplica (ex: participante removido)
+
+    def rebuild(self, combat_id: int, until_event_id: Optional[int] = None, snapshot: bool = False) -> Optional[Dict]:
+        """
+        Reconstruir o estado do combate a partir dos eventos.
+
+        Args:
+            combat_id: ID do SessionCombat
+            until_event_id: Reconstruir só até este evento (por defeito, o último)
+            snapshot: Adicionar um snapshot à sessão se a reconstrução reaplicar
+                SNAPSHOT_INTERVAL ou mais eventos (o commit fica para quem chama)
+
+        Returns:
+            Dict com state (CombatState), event_id e replayed (eventos reaplicados),
+            ou None se o combate não tiver eventos
+        """
+        head = until_event_id if until_event_id is not None else self._head(combat_id)
+        if head is None:
+            return None
+
+        marks = self._history_marks(combat_id, head)
+        base = self._base_snapshot(combat_id, head, marks)
+
+        state = CombatState(session_id=0, combat_id=combat_id)
+        start = 0
+        if base is not None:
+            start = base.event_id
+            self._apply_event(state, [{
+                'op': 'restore',
+                'participants': base.get_participantes(),
+                'ronda': base.ronda,
+                'turno': base.turno
+            }])
+        undone = self._undone(marks, start)
+
+        events = CombatLog.query.filter(
+            CombatLog.combat_id == combat_id,
+            CombatLog.action_type.in_(CombatLog.STATE_EVENT_TYPES),
+            CombatLog.id > start,
+            CombatLog.id <= head
+        ).order_by(CombatLog.id).all()
+
+        if base is None and not events:
+            return None
+
+        replayed = 0
+        for event in events:
+            state.session_id = event.session_id
+            if event.id in undone:
+                continue
+            self._apply_event(state, event.get_details().get('operations', []))
+            replayed += 1
+
+        if snapshot and replayed >= self.SNAPSHOT_INTERVAL:
+            self._take_snapshot(combat_id, head, state)
+
+        return {'state': state, 'event_id': head, 'replayed': replayed}
+
+    def _take_snapshot(self, combat_id: int, event_id: int, state: CombatState):
+        """Adicionar à sessão o estado reconstruído até event_id (sem commit)."""
+        snapshot = CombatSnapshot(
+            combat_id=combat_id,
+            event_id=event_id,
+            ronda=state.ronda_atual,
+            turno=state.turno_atual
+        )
+        snapshot.set_participantes(state.get_participantes())
+        db.session.add(snapshot)
+
+    def state_at_round(self, combat_id: int, ronda: int) -> Optional[Dict]:
+        """Reconstruir o estado no fim de uma ronda."""
+        event_id = db.session.query(db.func.max(CombatLog.id)).filter(
+            CombatLog.combat_id == combat_id,
+            CombatLog.action_type.in_(CombatLog.STATE_EVENT_TYPES + CombatLog.HISTORY_EVENT_TYPES),
+            CombatLog.ronda <= ronda
+        ).scalar()
+        if event_id is None:
+            return None
+        return self.rebuild(combat_id, event_id)
+
+    # --- Desfazer / refazer ---
+
+    def _write_cache(self, combat, state: CombatState):
+        """Passar o estado reconstruído para a cache (SessionCombat)."""
+        combat.set_participantes(state.get_participantes())
+        combat.ronda_atual = state.ronda_atual
+        combat.turno_atual = state.turno_atual
+
+    def undo(self, combat) -> Optional[Dict]:
+        """
+        Desfazer o último evento de estado ainda ativo.
+
+        Returns:
+            Resultado de rebuild depois de desfazer, ou None se não houver nada
+            para desfazer (o início do combate não pode ser desfeito)
+        """
+        undone = self._undone(self._history_marks(combat.id, None))
+        target = CombatLog.query.filter(
+            CombatLog.combat_id == combat.id,
+            CombatLog.action_type.in_(CombatLog.STATE_EVENT_TYPES),
+            CombatLog.id.notin_(undone)
+        ).order_by(CombatLog.id.desc()).first()
+
+        if target is None or target.get_details().get('base'):
+            return None
+
+        return self._mark(combat, 'undo', target, f'↩️ Desfeito: evento #{target.id}')
+
+    def redo(self, combat) -> Optional[Dict]:
+        """
+        Refazer o último evento desfeito, se não houve alterações novas depois.
+
+        Returns:
+            Resultado de rebuild depois de refazer, ou None se não houver nada
+            para refazer
+        """
+        marks = self._history_marks(combat.id, None)
+        undone = self._undone(marks)
+        last_state = db.session.query(db.func.max(CombatLog.id)).filter(
+            CombatLog.combat_id == combat.id,
+            CombatLog.action_type.in_(CombatLog.STATE_EVENT_TYPES)
+        ).scalar() or 0
+
+        for mark_id, kind, target in reversed(marks):
+            if mark_id < last_state:
+                break
+            if kind == 'undo' and target in undone:
+                event = db.session.get(CombatLog, target)
+                return self._mark(combat, 'redo', event, f'↪️ Refeito: evento #{target}')
+        return None
+
+    def _mark(self, combat, kind: str, event: CombatLog, message: str) -> Optional[Dict]:
+        """Registar desfazer/refazer, reconstruir e atualizar a cache (e o snapshot) num só commit."""
+        log = CombatLog(
+            session_id=combat.session_id,
+            combat_id=combat.id,
+            ronda=combat.ronda_atual,
+            turno=combat.turno_atual,
+            actor_id='sistema',
+            actor_nome='Sistema',
+            action_type=kind,
+            target_id=str(event.id),
+            message=message
+        )
+        db.session.add(log)
+        db.session.flush()
+
+        result = self.rebuild(combat.id, snapshot=True)
+        self._write_cache(combat, result['state'])
+        db.session.commit()
+        return result
+
+    # --- Registo ---
+
+    @staticmethod
+    def record_restore(combat, base: bool = False, commit: bool = False):
+        """Registar o estado completo atual do combate como evento (início ou substituição)."""
+        if combat.id is None:
+            db.session.flush()
+        return CombatLogService.log_state(
+            session_id=combat.session_id,
+            operations=[{
+                'op': 'restore',
+                'participants': combat.get_participantes(),
+                'ronda': combat.ronda_atual,
+                'turno': combat.turno_atual
+            }],
+            ronda=combat.ronda_atual,
+            turno=combat.turno_atual,
+            combat_id=combat.id,
+            base=base,
+            commit=commit
+        )
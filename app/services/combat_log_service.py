@@ -2,17 +2,68 @@
 Serviço de Combat Log
 
 Gere o histórico de ações de combate.
+
+Cada log_* faz commit por defeito. Dentro de unit_of_work() as entradas
+ficam em memória e são inseridas de uma vez, no mesmo commit que as
+alterações de estado da ação (um só fsync e a ação é atómica).
 """
 
 from app import db
-from app.models.combat_log import CombatLog
+from app.models.combat_log import CombatLog, VISIBLE_LOG_CONDITION
+from contextlib import contextmanager
 from typing import List, Dict, Optional
 from datetime import datetime
 
+# Chave em db.session.info com as entradas pendentes da unidade de trabalho
+_BATCH_KEY = 'combat_log_batch'
+
 
 class CombatLogService:
     """Serviço para gestão de combat logs."""
 
+    @staticmethod
+    @contextmanager
+    def unit_of_work():
+        """
+        Agrupar os logs e as alterações de estado de uma ação num só commit.
+
+        Dentro do bloco, os log_* não fazem commit: as entradas são guardadas
+        e inseridas todas juntas (INSERT em lote) no fim, com um único commit
+        que inclui também o resto do que foi alterado na sessão. Se ocorrer
+        uma exceção, nada é escrito. Blocos aninhados juntam-se ao exterior.
+
+        Exemplo:
+            with CombatLogService.unit_of_work():
+                target.aplicar_dano(dano)
+                CombatLogService.log_damage(...)
+                CombatLogService.log_death(...)
+        """
+        if _BATCH_KEY in db.session.info:
+            yield
+            return
+
+        batch = db.session.info[_BATCH_KEY] = []
+        try:
+            yield
+            db.session.add_all(batch)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.info.pop(_BATCH_KEY, None)
+
+    @staticmethod
+    def _save(log: CombatLog, commit: bool = True):
+        """Adicionar uma entrada (na unidade de trabalho, se houver uma aberta)."""
+        batch = db.session.info.get(_BATCH_KEY)
+        if batch is not None:
+            batch.append(log)
+            return
+        db.session.add(log)
+        if commit:
+            db.session.commit()
+
     @staticmethod
     def log_attack(
         session_id: int,
@@ -23,7 +74,8 @@ class CombatLogService:
         attack_result: Dict,
         ronda: int = 1,
         turno: int = 1,
-        combat_id: Optional[int] = None
+        combat_id: Optional[int] = None,
+        commit: bool = True
     ) -> CombatLog:
         """
         Registra um attack roll.
@@ -38,6 +90,7 @@ class CombatLogService:
             ronda: Ronda atual
             turno: Turno atual
             combat_id: ID do combate (opcional)
+            commit: Se False, só adiciona à sessão (para escrever vários de uma vez)
 
         Returns:
             CombatLog criado
@@ -66,8 +119,7 @@ class CombatLogService:
         )
         log.set_details(attack_result)
 
-        db.session.add(log)
-        db.session.commit()
+        CombatLogService._save(log, commit)
 
         return log
 
@@ -81,7 +133,8 @@ class CombatLogService:
         damage_result: Dict,
         ronda: int = 1,
         turno: int = 1,
-        combat_id: Optional[int] = None
+        combat_id: Optional[int] = None,
+        commit: bool = True
     ) -> CombatLog:
         """
         Registra dano aplicado.
@@ -96,6 +149,7 @@ class CombatLogService:
             ronda: Ronda atual
             turno: Turno atual
             combat_id: ID do combate (opcional)
+            commit: Se False, só adiciona à sessão (para escrever vários de uma vez)
 
         Returns:
             CombatLog criado
@@ -133,8 +187,7 @@ class CombatLogService:
         )
         log.set_details(damage_result)
 
-        db.session.add(log)
-        db.session.commit()
+        CombatLogService._save(log, commit)
 
         return log
 
@@ -148,7 +201,8 @@ class CombatLogService:
         amount: int,
         ronda: int = 1,
         turno: int = 1,
-        combat_id: Optional[int] = None
+        combat_id: Optional[int] = None,
+        commit: bool = True
     ) -> CombatLog:
         """Registra cura."""
         message = f"💚 {actor_nome} cura {amount} HP em {target_nome}."
@@ -167,8 +221,7 @@ class CombatLogService:
         )
         log.set_details({'amount': amount})
 
-        db.session.add(log)
-        db.session.commit()
+        CombatLogService._save(log, commit)
 
         return log
 
@@ -181,7 +234,8 @@ class CombatLogService:
         added: bool = True,
         ronda: int = 1,
         turno: int = 1,
-        combat_id: Optional[int] = None
+        combat_id: Optional[int] = None,
+        commit: bool = True
     ) -> CombatLog:
         """Registra adição/remoção de condição."""
         if added:
@@ -201,8 +255,7 @@ class CombatLogService:
         )
         log.set_details({'condition': condition, 'added': added})
 
-        db.session.add(log)
-        db.session.commit()
+        CombatLogService._save(log, commit)
 
         return log
 
@@ -217,7 +270,8 @@ class CombatLogService:
         target_nome: Optional[str] = None,
         ronda: int = 1,
         turno: int = 1,
-        combat_id: Optional[int] = None
+        combat_id: Optional[int] = None,
+        commit: bool = True
     ) -> CombatLog:
         """Registra lançamento de magia."""
         target_text = f" em {target_nome}" if target_nome else ""
@@ -242,8 +296,7 @@ class CombatLogService:
             'spell_level': spell_level
         })
 
-        db.session.add(log)
-        db.session.commit()
+        CombatLogService._save(log, commit)
 
         return log
 
@@ -254,7 +307,8 @@ class CombatLogService:
         actor_nome: str,
         ronda: int = 1,
         turno: int = 1,
-        combat_id: Optional[int] = None
+        combat_id: Optional[int] = None,
+        commit: bool = True
     ) -> CombatLog:
         """Registra morte de participante."""
         message = f"💀 {actor_nome} foi derrotado!"
@@ -270,8 +324,85 @@ class CombatLogService:
             message=message
         )
 
-        db.session.add(log)
-        db.session.commit()
+        CombatLogService._save(log, commit)
+
+        return log
+
+    @staticmethod
+    def log_save(
+        session_id: int,
+        actor_id: str,
+        actor_nome: str,
+        target_id: str,
+        target_nome: str,
+        save_result: Dict,
+        ronda: int = 1,
+        turno: int = 1,
+        combat_id: Optional[int] = None,
+        commit: bool = True
+    ) -> CombatLog:
+        """Registra uma salvaguarda contra um efeito (e o dano resultante)."""
+        roll_text = f"d20: {save_result['d20_result']}+{save_result['bonus']} = {save_result['total']} vs CD {save_result['dc']}"
+        damage = save_result.get('final_damage')
+        damage_text = f" Sofre {damage} de dano {save_result.get('damage_type', '')}." if damage is not None else ""
+
+        if save_result['success']:
+            message = f"🛡️ {target_nome} resiste ao efeito de {actor_nome}. ({roll_text}){damage_text}"
+        else:
+            message = f"🔥 {target_nome} falha a salvaguarda contra {actor_nome}! ({roll_text}){damage_text}"
+
+        log = CombatLog(
+            session_id=session_id,
+            combat_id=combat_id,
+            ronda=ronda,
+            turno=turno,
+            actor_id=actor_id,
+            actor_nome=actor_nome,
+            target_id=target_id,
+            target_nome=target_nome,
+            action_type='save',
+            message=message
+        )
+        log.set_details(save_result)
+
+        CombatLogService._save(log, commit)
+
+        return log
+
+    @staticmethod
+    def log_state(
+        session_id: int,
+        operations: List[Dict],
+        ronda: int = 1,
+        turno: int = 1,
+        combat_id: Optional[int] = None,
+        base: bool = False,
+        commit: bool = True
+    ) -> CombatLog:
+        """
+        Registra um evento de estado (fonte de verdade do combate).
+
+        Args:
+            operations: Operações do CombatPatchService aplicadas ao estado
+                (ou [{'op': 'restore', ...}] com o estado completo)
+            base: Se o evento é o início de um combate (não pode ser desfeito)
+        """
+        log = CombatLog(
+            session_id=session_id,
+            combat_id=combat_id,
+            ronda=ronda,
+            turno=turno,
+            actor_id='sistema',
+            actor_nome='Sistema',
+            action_type='state',
+            message='Estado do combate atualizado'
+        )
+        details = {'operations': operations}
+        if base:
+            details['base'] = True
+        log.set_details(details)
+
+        CombatLogService._save(log, commit)
 
         return log
 
@@ -284,7 +415,8 @@ class CombatLogService:
         ronda: int = 1,
         turno: int = 1,
         combat_id: Optional[int] = None,
-        details: Optional[Dict] = None
+        details: Optional[Dict] = None,
+        commit: bool = True
     ) -> CombatLog:
         """Registra ação personalizada."""
         log = CombatLog(
@@ -300,8 +432,7 @@ class CombatLogService:
         if details:
             log.set_details(details)
 
-        db.session.add(log)
-        db.session.commit()
+        CombatLogService._save(log, commit)
 
         return log
 
@@ -309,33 +440,51 @@ class CombatLogService:
     def get_combat_logs(
         session_id: int,
         limit: int = 50,
-        combat_id: Optional[int] = None
+        combat_id: Optional[int] = None,
+        since_id: Optional[int] = None,
+        before_id: Optional[int] = None
     ) -> List[CombatLog]:
         """
-        Obtém logs de combate.
+        Obtém logs de combate (paginação por ID, keyset).
+
+        O ID é crescente, por isso serve de cursor: cada página é uma leitura
+        do índice a partir do cursor, com o mesmo custo seja a primeira página
+        ou uma página antiga de um log com milhares de entradas.
 
         Args:
             session_id: ID da sessão
             limit: Número máximo de logs a retornar
             combat_id: Filtrar por combat_id específico (opcional)
+            since_id: Só logs mais recentes que este ID (os `limit` seguintes,
+                para o cliente continuar a partir do maior ID recebido)
+            before_id: Só logs mais antigos que este ID (página anterior)
 
         Returns:
-            Lista de CombatLog ordenados por timestamp (mais recente primeiro)
+            Lista de CombatLog ordenados por ID (mais recente primeiro), sem
+            eventos de estado nem desfazer/refazer
         """
-        query = CombatLog.query.filter_by(session_id=session_id)
+        query = CombatLog.query.filter_by(session_id=session_id).filter(db.text(VISIBLE_LOG_CONDITION))
 
         if combat_id is not None:
             query = query.filter_by(combat_id=combat_id)
+        if before_id is not None:
+            query = query.filter(CombatLog.id < before_id)
 
-        logs = query.order_by(CombatLog.timestamp.desc()).limit(limit).all()
+        if since_id is not None:
+            logs = query.filter(CombatLog.id > since_id).order_by(CombatLog.id.asc()).limit(limit).all()
+            logs.reverse()
+            return logs
 
-        return logs
+        return query.order_by(CombatLog.id.desc()).limit(limit).all()
 
     @staticmethod
     def clear_combat_logs(session_id: int, combat_id: Optional[int] = None) -> int:
         """
         Limpa logs de combate.
 
+        Os eventos de estado (e desfazer/refazer) não são apagados: são o
+        histórico a partir do qual o estado do combate é reconstruído.
+
         Args:
             session_id: ID da sessão
             combat_id: Limpar apenas logs de um combate específico (opcional)
@@ -343,7 +492,7 @@ class CombatLogService:
         Returns:
             Número de logs apagados
         """
-        query = CombatLog.query.filter_by(session_id=session_id)
+        query = CombatLog.query.filter_by(session_id=session_id).filter(db.text(VISIBLE_LOG_CONDITION))
 
         if combat_id is not None:
             query = query.filter_by(combat_id=combat_id)
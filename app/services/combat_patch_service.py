@@ -0,0 +1,226 @@
+"""
+Serviço de Patches de Combate
+
+Aplica alterações parciais ao estado de um combate de sessão em vez de
+reescrever a lista completa de participantes. Cada patch indica a versão
+em que se baseia; se o combate já mudou entretanto (outro separador, outro
+pedido), o patch é rejeitado em vez de apagar as alterações alheias.
+
+Operações suportadas:
+- {"op": "set_hp", "id": ..., "hp_atual": 12}
+- {"op": "add_condition", "id": ..., "condition": "envenenado"}
+  (opcional "expira": duração da condição, ver ConditionScheduler)
+- {"op": "remove_condition", "id": ..., "condition": "envenenado"}
+- {"op": "reorder", "order": [id, id, ...]}
+- {"op": "next_turn"} (aplica também as expirações de condições)
+- {"op": "set_turn", "ronda": 2, "turno": 0}
+
+"next_turn" é só para uso interno (CombatTurnService): um PATCH não pode
+passar o turno, porque a passagem de turno também repõe a action economy e
+contabiliza o tempo da ronda (POST /combate/sessao/<id>/proximo-turno).
+"""
+
+from app import db
+from app.models.combat import chave_condicao
+from app.services.combat_log_service import CombatLogService
+from app.services.condition_scheduler import ConditionScheduler
+from typing import Dict, List, Tuple
+
+
+class CombatPatchError(ValueError):
+    """Operação de patch inválida."""
+
+
+class CombatVersionConflict(Exception):
+    """O patch foi feito sobre uma versão desatualizada do combate."""
+
+    def __init__(self, versao: int):
+        super().__init__(f'Versao desatualizada (atual: {versao})')
+        self.versao = versao
+
+
+class CombatPatchService:
+    """Serviço para aplicar patches versionados ao estado de combate."""
+
+    OPERATIONS = ('set_hp', 'add_condition', 'remove_condition', 'reorder', 'next_turn', 'set_turn')
+    PATCH_OPERATIONS = ('set_hp', 'add_condition', 'remove_condition', 'reorder', 'set_turn')
+
+    def __init__(self):
+        self.scheduler = ConditionScheduler()
+
+    def apply_patch(self, combat, base_version: int, operations: List[Dict]) -> Dict:
+        """
+        Aplicar uma lista de operações de forma atómica.
+
+        Args:
+            combat: SessionCombat a alterar
+            base_version: Versão do estado em que o cliente se baseou
+            operations: Lista de operações (ver docstring do módulo)
+
+        Returns:
+            Dict com versao (nova), participants (só os campos alterados de
+            cada participante alterado) e, se mudaram, ronda, turno e order
+
+        Raises:
+            CombatVersionConflict: Se base_version não for a versão atual
+            CombatPatchError: Se alguma operação for inválida (nada é aplicado)
+        """
+        if base_version != combat.versao:
+            raise CombatVersionConflict(combat.versao)
+        self.validate_patch(operations)
+
+        try:
+            result = self.apply_operations(combat, operations)
+        except CombatPatchError:
+            db.session.rollback()
+            raise
+
+        with CombatLogService.unit_of_work():
+            # O evento é a fonte de verdade; o SessionCombat fica como cache
+            CombatLogService.log_state(
+                session_id=combat.session_id,
+                operations=operations,
+                ronda=combat.ronda_atual,
+                turno=combat.turno_atual,
+                combat_id=combat.id
+            )
+            logs = self.condition_logs(result, combat.session_id, combat.id, combat.ronda_atual, combat.turno_atual)
+            for method, kwargs in logs:
+                getattr(CombatLogService, method)(**kwargs)
+            combat.incrementar_versao()
+
+        result['versao'] = combat.versao
+        return result
+
+    def validate_patch(self, operations: List[Dict]):
+        """
+        Validar as operações de um PATCH vindo do cliente.
+
+        Raises:
+            CombatPatchError: Se não houver operações ou alguma não puder ser
+                feita por PATCH (ex: next_turn)
+        """
+        if not isinstance(operations, list) or not operations:
+            raise CombatPatchError('Nenhuma operacao fornecida')
+        for operation in operations:
+            op = operation.get('op') if isinstance(operation, dict) else None
+            if op == 'next_turn':
+                raise CombatPatchError('Use /proximo-turno para passar o turno')
+            if op not in self.PATCH_OPERATIONS:
+                raise CombatPatchError(f'Operacao invalida: {op}')
+
+    @staticmethod
+    def condition_logs(result: Dict, session_id: int, combat_id: int, ronda: int, turno: int) -> List[Tuple[str, Dict]]:
+        """Logs (método do CombatLogService, kwargs) das condições que expiraram num resultado."""
+        return [
+            ('log_condition', dict(
+                session_id=session_id,
+                actor_id=expirado['id'],
+                actor_nome=expirado['nome'] or 'Desconhecido',
+                condition=expirado['condicao'],
+                added=False,
+                ronda=ronda,
+                turno=turno,
+                combat_id=combat_id
+            ))
+            for expirado in result.get('expirados', [])
+        ]
+
+    def apply_operations(self, combat, operations: List[Dict]) -> Dict:
+        """
+        Aplicar operações ao estado sem escrever na base de dados.
+
+        Funciona com um SessionCombat ou com qualquer objeto com a mesma
+        interface (get_linhas_participantes, ronda_atual, turno_atual), como
+        o estado em memória do CombatStateStore.
+
+        Returns:
+            Dict com participants (campos alterados) e, se mudaram, ronda, turno e order
+        """
+        rows = combat.get_linhas_participantes()
+        by_id = {p.participant_id: p for p in rows}
+        changes = {}
+        result = {}
+
+        for operation in operations:
+            self._apply(combat, rows, by_id, operation, changes, result)
+
+        result['participants'] = [dict(fields, id=pid) for pid, fields in changes.items()]
+        return result
+
+    def _apply(self, combat, rows, by_id, operation: Dict, changes: Dict, result: Dict):
+        """Aplicar uma operação às linhas (sem commit)."""
+        op = operation.get('op') if isinstance(operation, dict) else None
+        if op not in self.OPERATIONS:
+            raise CombatPatchError(f'Operacao invalida: {op}')
+
+        if op in ('set_hp', 'add_condition', 'remove_condition'):
+            participant = by_id.get(str(operation.get('id')))
+            if participant is None:
+                raise CombatPatchError(f"Participante nao encontrado: {operation.get('id')}")
+
+            if op == 'set_hp':
+                try:
+                    hp = int(operation.get('hp_atual'))
+                except (TypeError, ValueError):
+                    raise CombatPatchError('hp_atual invalido')
+                participant.hp_atual = max(0, min(hp, participant.hp_max or hp))
+                changes.setdefault(participant.participant_id, {})['hp_atual'] = participant.hp_atual
+            else:
+                if not operation.get('condition'):
+                    raise CombatPatchError('Condicao nao indicada')
+                condition = chave_condicao(operation['condition'])
+                if condition is None:
+                    raise CombatPatchError(f"Condicao desconhecida: {operation['condition']}")
+                if op == 'add_condition':
+                    participant.add_condicao(condition)
+                else:
+                    participant.remove_condicao(condition)
+
+                # Sem "expira", a condição fica até ser removida
+                if op == 'add_condition' and operation.get('expira'):
+                    try:
+                        self.scheduler.agendar(combat, participant, condition, operation['expira'])
+                    except ValueError as e:
+                        raise CombatPatchError(str(e))
+                else:
+                    self.scheduler.cancelar(participant, condition)
+                changes.setdefault(participant.participant_id, {}).update(
+                    condicoes=participant.get_condicoes(),
+                    efeitos=participant.get_efeitos()
+                )
+
+        elif op == 'reorder':
+            order = [str(pid) for pid in operation.get('order') or []]
+            if sorted(order) != sorted(by_id):
+                raise CombatPatchError('A nova ordem tem de incluir todos os participantes')
+            for ordem, pid in enumerate(order):
+                by_id[pid].ordem = ordem
+            rows.sort(key=lambda p: p.ordem)
+            self.scheduler.invalidar(combat)  # As durações por turno dependem da ordem
+            result['order'] = order
+
+        elif op == 'next_turn':
+            try:
+                result.update(combat.next_turn())
+            except ValueError as e:
+                raise CombatPatchError(str(e))
+
+            expirados, salvaguardas = self.scheduler.expirar(combat)
+            for alterado in expirados + salvaguardas:
+                participant = by_id[alterado['id']]
+                changes.setdefault(participant.participant_id, {}).update(
+                    condicoes=participant.get_condicoes(),
+                    efeitos=participant.get_efeitos()
+                )
+            result.setdefault('expirados', []).extend(expirados)
+            result.setdefault('salvaguardas', []).extend(salvaguardas)
+
+        elif op == 'set_turn':
+            try:
+                combat.ronda_atual = max(1, int(operation.get('ronda', combat.ronda_atual)))
+                combat.turno_atual = max(0, int(operation.get('turno', combat.turno_atual)))
+            except (TypeError, ValueError):
+                raise CombatPatchError('Ronda/turno invalidos')
+            result['ronda'] = combat.ronda_atual
+            result['turno'] = combat.turno_atual
@@ -0,0 +1,280 @@
+"""
+Serviço de Probabilidades de Combate
+
+Calcula distribuições exatas (sem amostragem) para expressões de dados e
+ataques do D&D 5ª Edição, com as mesmas regras do CombatRollService:
+- Natural 20 acerta sempre e é crítico (dados a dobrar)
+- Natural 1 falha sempre
+- Resistência divide o dano a meio (arredondado para baixo), vulnerabilidade dobra
+
+Os resultados ficam em cache por argumentos, por isso consultas repetidas
+são O(1) depois do primeiro cálculo.
+"""
+
+from functools import lru_cache
+from math import comb
+from typing import Dict, Tuple
+from app.services.dice_engine import compile_dice, DiceExpressionError, DiceTerm
+
+
+# Limite de estados para termos com keep (ex: 4d6kh3)
+MAX_KEEP_STATES = 50000
+
+# Limite do suporte da distribuição (soma de dados × faces, já com o crítico):
+# a convolução custa O(suporte²), e o parser aceita até 1000d1000
+MAX_PMF_SUPPORT = 1000
+
+
+def _convolve(a: Dict[int, float], b: Dict[int, float]) -> Dict[int, float]:
+    """Convolução de duas distribuições (soma de variáveis independentes)."""
+    result = {}
+    for x, px in a.items():
+        for y, py in b.items():
+            result[x + y] = result.get(x + y, 0.0) + px * py
+    return result
+
+
+def _die_pmf(term: DiceTerm) -> Dict[int, float]:
+    """Distribuição de um único dado do termo, com reroll e mínimo."""
+    sides = term.sides
+    face = 1.0 / sides
+    pmf = {v: face for v in range(1, sides + 1)}
+
+    if term.reroll_below:
+        # Reroll uma vez: resultados <= limite são substituídos por um novo roll
+        rerolled = term.reroll_below * face
+        pmf = {v: (face if v > term.reroll_below else 0.0) + rerolled * face for v in pmf}
+
+    if term.minimum:
+        floor_mass = sum(p for v, p in pmf.items() if v <= term.minimum)
+        pmf = {v: p for v, p in pmf.items() if v > term.minimum}
+        pmf[term.minimum] = floor_mass
+
+    return {v: p for v, p in pmf.items() if p > 0}
+
+
+def _keep_pmf(die: Dict[int, float], count: int, keep: int, highest: bool) -> Dict[int, float]:
+    """Distribuição da soma dos `keep` maiores (ou menores) de `count` dados."""
+    if comb(len(die) + keep - 1, keep) > MAX_KEEP_STATES:
+        raise DiceExpressionError('Expressão demasiado complexa para calcular a distribuição')
+
+    # Estado: tuplo ordenado dos dados mantidos até agora
+    states = {(): 1.0}
+    for _ in range(count):
+        nxt = {}
+        for kept, p in states.items():
+            for v, pv in die.items():
+                merged = sorted(kept + (v,), reverse=highest)[:keep]
+                key = tuple(merged)
+                nxt[key] = nxt.get(key, 0.0) + p * pv
+        states = nxt
+
+    result = {}
+    for kept, p in states.items():
+        total = sum(kept)
+        result[total] = result.get(total, 0.0) + p
+    return result
+
+
+def _term_pmf(term: DiceTerm, crit: bool) -> Dict[int, float]:
+    """Distribuição de um termo (já com sinal)."""
+    if not term.is_dice:
+        return {term.sign * term.value: 1.0}
+
+    count = term.count * 2 if crit else term.count
+    die = _die_pmf(term)
+    if term.keep:
+        mode, keep = term.keep
+        keep = min(count, keep * 2 if crit else keep)
+        pmf = _keep_pmf(die, count, keep, highest=(mode == 'h'))
+    else:
+        pmf = {0: 1.0}
+        for _ in range(count):
+            pmf = _convolve(pmf, die)
+
+    if term.sign < 0:
+        pmf = {-v: p for v, p in pmf.items()}
+    return pmf
+
+
+@lru_cache(maxsize=512)
+def _expression_pmf(expression: str, crit: bool) -> Tuple[Tuple[int, float], ...]:
+    """PMF de uma expressão como tuplo ordenado (imutável, para a cache)."""
+    compiled = compile_dice(expression)
+    support = sum(t.count * t.sides for t in compiled.terms if t.is_dice) * (2 if crit else 1)
+    if support > MAX_PMF_SUPPORT:
+        raise DiceExpressionError('Expressão demasiado grande para calcular a distribuição')
+
+    pmf = {0: 1.0}
+    for term in compiled.terms:
+        pmf = _convolve(pmf, _term_pmf(term, crit))
+
+    # Como no roll, o total nunca é negativo
+    clamped = {}
+    for v, p in pmf.items():
+        clamped[max(0, v)] = clamped.get(max(0, v), 0.0) + p
+    return tuple(sorted(clamped.items()))
+
+
+@lru_cache(maxsize=1024)
+def _d20_faces(advantage: bool, disadvantage: bool) -> Tuple[float, ...]:
+    """Probabilidade de cada face (índice 1-20) do d20 final."""
+    if advantage and disadvantage:
+        advantage = disadvantage = False
+
+    faces = [0.0] * 21
+    for v in range(1, 21):
+        if advantage:
+            faces[v] = (v * v - (v - 1) * (v - 1)) / 400.0
+        elif disadvantage:
+            faces[v] = ((21 - v) ** 2 - (20 - v) ** 2) / 400.0
+        else:
+            faces[v] = 1 / 20.0
+    return tuple(faces)
+
+
+@lru_cache(maxsize=1024)
+def _attack_odds(bonus: int, target_ac: int, advantage: bool, disadvantage: bool) -> Tuple[float, float]:
+    """(probabilidade de acertar incluindo críticos, probabilidade de crítico)."""
+    faces = _d20_faces(advantage, disadvantage)
+    hit = faces[20]
+    for v in range(2, 20):
+        if v + bonus >= target_ac:
+            hit += faces[v]
+    return hit, faces[20]
+
+
+def _apply_modifiers(damage: int, resistance: bool, immunity: bool, vulnerability: bool) -> int:
+    """Aplicar resistência/imunidade/vulnerabilidade como no roll_damage."""
+    if immunity:
+        return 0
+    if resistance:
+        return damage // 2
+    if vulnerability:
+        return damage * 2
+    return damage
+
+
+@lru_cache(maxsize=1024)
+def _attack_damage_pmf(
+    bonus: int,
+    target_ac: int,
+    dice_expression: str,
+    advantage: bool,
+    disadvantage: bool,
+    resistance: bool,
+    immunity: bool,
+    vulnerability: bool
+) -> Tuple[Tuple[int, float], ...]:
+    """PMF do dano de um ataque (falhas contam como 0)."""
+    hit, crit = _attack_odds(bonus, target_ac, advantage, disadvantage)
+    outcome = {0: 1.0 - hit}
+    for pmf, weight in ((_expression_pmf(dice_expression, False), hit - crit),
+                        (_expression_pmf(dice_expression, True), crit)):
+        if weight <= 0:
+            continue
+        for v, p in pmf:
+            damage = _apply_modifiers(v, resistance, immunity, vulnerability)
+            outcome[damage] = outcome.get(damage, 0.0) + p * weight
+    return tuple(sorted((v, p) for v, p in outcome.items() if p > 0))
+
+
+@lru_cache(maxsize=1024)
+def _expected_damage(*args) -> float:
+    """Valor esperado da PMF de _attack_damage_pmf (mesmos argumentos)."""
+    return sum(v * p for v, p in _attack_damage_pmf(*args))
+
+
+class CombatProbabilityService:
+    """Serviço para probabilidades exatas de dados e ataques."""
+
+    @staticmethod
+    def dice_pmf(dice_expression: str, crit: bool = False) -> Dict[int, float]:
+        """
+        Distribuição exata do total de uma expressão de dados.
+
+        Args:
+            dice_expression: Expressão (ex: "2d6+3", "4d6kh3")
+            crit: Se é critical hit (dados a dobrar)
+
+        Returns:
+            Dict {total: probabilidade}
+
+        Raises:
+            DiceExpressionError: Se a expressão for inválida ou demasiado grande (MAX_PMF_SUPPORT)
+        """
+        return dict(_expression_pmf(dice_expression, bool(crit)))
+
+    @staticmethod
+    def dice_stats(dice_expression: str) -> Dict:
+        """Mínimo, máximo e média de uma expressão de dados."""
+        pmf = _expression_pmf(dice_expression, False)
+        return {
+            'expression': compile_dice(dice_expression).expression,
+            'min': pmf[0][0],
+            'max': pmf[-1][0],
+            'mean': round(sum(v * p for v, p in pmf), 4)
+        }
+
+    @staticmethod
+    def attack_probabilities(
+        bonus: int,
+        target_ac: int,
+        advantage: bool = False,
+        disadvantage: bool = False
+    ) -> Dict:
+        """
+        Probabilidades exatas de um attack roll.
+
+        Returns:
+            Dict com hit (inclui críticos), crit e miss
+        """
+        hit, crit = _attack_odds(int(bonus), int(target_ac), bool(advantage), bool(disadvantage))
+        return {
+            'hit': round(hit, 6),
+            'crit': round(crit, 6),
+            'miss': round(1.0 - hit, 6)
+        }
+
+    @staticmethod
+    def attack_damage_pmf(
+        bonus: int,
+        target_ac: int,
+        dice_expression: str,
+        advantage: bool = False,
+        disadvantage: bool = False,
+        resistance: bool = False,
+        immunity: bool = False,
+        vulnerability: bool = False
+    ) -> Dict[int, float]:
+        """Distribuição exata do dano de um ataque, incluindo falhas (dano 0)."""
+        return dict(_attack_damage_pmf(
+            int(bonus), int(target_ac), dice_expression, bool(advantage), bool(disadvantage),
+            bool(resistance), bool(immunity), bool(vulnerability)
+        ))
+
+    @staticmethod
+    def expected_damage(
+        bonus: int,
+        target_ac: int,
+        dice_expression: str,
+        advantage: bool = False,
+        disadvantage: bool = False,
+        resistance: bool = False,
+        immunity: bool = False,
+        vulnerability: bool = False
+    ) -> Dict:
+        """
+        Dano esperado de um ataque contra uma AC.
+
+        Returns:
+            Dict com hit, crit, miss, expected_damage e expected_on_hit
+        """
+        odds = CombatProbabilityService.attack_probabilities(bonus, target_ac, advantage, disadvantage)
+        expected = _expected_damage(
+            int(bonus), int(target_ac), dice_expression, bool(advantage), bool(disadvantage),
+            bool(resistance), bool(immunity), bool(vulnerability)
+        )
+        odds['expected_damage'] = round(expected, 4)
+        odds['expected_on_hit'] = round(expected / odds['hit'], 4) if odds['hit'] else 0.0
+        return odds
@@ -5,8 +5,9 @@ Implementa mecânicas de attack rolls e damage rolls do D&D 5ª Edição.
 """
 
 import random
-import re
-from typing import Dict, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
+from app.services.dice_engine import compile_dice, DiceExpressionError
+from app.services.monster_actions import compile_action_text, legacy_attack
 
 
 class CombatRollService:
@@ -24,36 +25,27 @@ class CombatRollService:
         Returns:
             Tuple[int, dict]: (resultado final, detalhes do roll)
         """
-        # Se tem ambos, cancelam-se
-        if advantage and disadvantage:
-            advantage = False
-            disadvantage = False
-
         roll1 = random.randint(1, 20)
+        roll2 = random.randint(1, 20) if bool(advantage) != bool(disadvantage) else None
+        return CombatRollService._d20_from_rolls(roll1, roll2, advantage, disadvantage)
 
-        if advantage or disadvantage:
-            roll2 = random.randint(1, 20)
-            if advantage:
-                result = max(roll1, roll2)
-                return result, {
-                    'rolls': [roll1, roll2],
-                    'result': result,
-                    'advantage': True,
-                    'dropped': min(roll1, roll2)
-                }
-            else:  # disadvantage
-                result = min(roll1, roll2)
-                return result, {
-                    'rolls': [roll1, roll2],
-                    'result': result,
-                    'disadvantage': True,
-                    'dropped': max(roll1, roll2)
-                }
-        else:
-            return roll1, {
-                'rolls': [roll1],
-                'result': roll1
-            }
+    @staticmethod
+    def _d20_from_rolls(roll1: int, roll2: Optional[int], advantage: bool, disadvantage: bool) -> Tuple[int, Dict]:
+        """
+        Resultado de um d20 a partir de dados já rolados (partilhado por roll_d20 e pelos lotes).
+
+        roll2 só é usado com vantagem ou desvantagem (se tem ambos, cancelam-se).
+        """
+        if advantage and disadvantage:
+            advantage = disadvantage = False
+
+        if advantage:
+            result = max(roll1, roll2)
+            return result, {'rolls': [roll1, roll2], 'result': result, 'advantage': True, 'dropped': min(roll1, roll2)}
+        if disadvantage:
+            result = min(roll1, roll2)
+            return result, {'rolls': [roll1, roll2], 'result': result, 'disadvantage': True, 'dropped': max(roll1, roll2)}
+        return roll1, {'rolls': [roll1], 'result': roll1}
 
     @staticmethod
     def roll_attack(
@@ -85,7 +77,11 @@ class CombatRollService:
             }
         """
         d20_result, d20_details = CombatRollService.roll_d20(advantage, disadvantage)
+        return CombatRollService._attack_from_d20(d20_result, d20_details, bonus, target_ac)
 
+    @staticmethod
+    def _attack_from_d20(d20_result: int, d20_details: Dict, bonus: int, target_ac: int) -> Dict:
+        """Resultado de um attack roll (formato de roll_attack) a partir do d20 já resolvido."""
         total = d20_result + bonus
         hit = total >= target_ac
         crit = d20_result == 20
@@ -114,28 +110,26 @@ class CombatRollService:
         """
         Parse uma expressão de dados (ex: "2d6+3", "1d8", "3d4-1").
 
+        Formato simplificado (só o primeiro grupo de dados); para expressões
+        completas usar dice_engine.compile_dice.
+
         Args:
             expression: Expressão de dados
 
         Returns:
             Tuple[int, int, int]: (número de dados, lados, modificador)
         """
-        expression = expression.strip().lower().replace(' ', '')
-
-        # Padrão: XdY+Z ou XdY-Z ou XdY
-        match = re.match(r'(\d+)?d(\d+)([+-]\d+)?', expression)
-
-        if not match:
-            # Tentar apenas número (dano fixo)
-            if expression.isdigit():
-                return 0, 0, int(expression)
+        try:
+            compiled = compile_dice(expression)
+        except DiceExpressionError:
             return 1, 6, 0  # Padrão fallback
 
-        num_dice = int(match.group(1)) if match.group(1) else 1
-        dice_sides = int(match.group(2))
-        modifier = int(match.group(3)) if match.group(3) else 0
+        dice_terms = compiled.dice_terms
+        if not dice_terms:
+            return 0, 0, compiled.modifier
 
-        return num_dice, dice_sides, modifier
+        first = dice_terms[0]
+        return first.count, first.sides, compiled.modifier
 
     @staticmethod
     def roll_dice(num_dice: int, dice_sides: int, modifier: int = 0, crit: bool = False) -> Dict:
@@ -186,8 +180,8 @@ class CombatRollService:
         Rola dano com modificadores de resistência.
 
         Args:
-            dice_expression: Expressão de dados (ex: "2d6+3")
-            damage_type: Tipo de dano
+            dice_expression: Expressão de dados (ex: "2d6+3", "1d8[cortante]+2d6[fogo]")
+            damage_type: Tipo de dano (para termos sem tipo)
             crit: Se é critical hit
             resistance: Se alvo tem resistência
             immunity: Se alvo é imune
@@ -206,39 +200,232 @@ class CombatRollService:
                 'vulnerability': bool,
                 'crit': bool
             }
+
+        Raises:
+            DiceExpressionError: Se a expressão for inválida
         """
-        num_dice, dice_sides, modifier = CombatRollService.parse_dice_expression(dice_expression)
-        roll_result = CombatRollService.roll_dice(num_dice, dice_sides, modifier, crit)
+        compiled = compile_dice(dice_expression)
+        return CombatRollService._damage_from_compiled(
+            dice_expression, compiled, damage_type, crit, resistance, immunity, vulnerability
+        )
 
+    @staticmethod
+    def _damage_from_compiled(
+        dice_expression: str,
+        compiled,
+        damage_type: str,
+        crit: bool,
+        resistance: bool,
+        immunity: bool,
+        vulnerability: bool
+    ) -> Dict:
+        """Rolar uma expressão já compilada e devolver o resultado no formato de roll_damage."""
+        roll_result = compiled.roll(crit=crit, default_type=damage_type)
         base_damage = roll_result['total']
-        final_damage = base_damage
-
-        # Aplicar modificadores
-        if immunity:
-            final_damage = 0
-        elif resistance:
-            final_damage = final_damage // 2  # Metade (arredondado para baixo)
-        elif vulnerability:
-            final_damage = final_damage * 2  # Dobro
 
         return {
             'expression': dice_expression,
-            'damage_type': damage_type,
+            'damage_type': compiled.primary_damage_type or damage_type,
             'roll_result': roll_result,
             'base_damage': base_damage,
-            'final_damage': final_damage,
+            'final_damage': CombatRollService._apply_damage_modifiers(base_damage, resistance, immunity, vulnerability),
             'resistance': resistance,
             'immunity': immunity,
             'vulnerability': vulnerability,
             'crit': crit
         }
 
+    @staticmethod
+    def _apply_damage_modifiers(damage: int, resistance: bool, immunity: bool, vulnerability: bool) -> int:
+        """Aplicar imunidade, resistência ou vulnerabilidade a um valor de dano."""
+        if immunity:
+            return 0
+        if resistance:
+            return damage // 2
+        if vulnerability:
+            return damage * 2
+        return damage
+
+    @staticmethod
+    def roll_attacks_batch(attacks: List[Dict]) -> List[Dict]:
+        """
+        Resolve vários ataques de uma vez (ex: uma ronda de 12 goblins).
+
+        Todos os d20 são gerados numa única passagem e as expressões de dano
+        vêm da cache do dice_engine, por isso cada ataque custa poucos
+        microssegundos.
+
+        Args:
+            attacks: Lista de dicts com bonus, target_ac, advantage, disadvantage,
+                dice_expression (opcional), damage_type, resistance, immunity,
+                vulnerability
+
+        Returns:
+            Lista (mesma ordem) de {'attack': <roll_attack()>, 'damage': <roll_damage()> ou None}
+
+        Raises:
+            DiceExpressionError: Se alguma expressão de dano for inválida (antes de rolar)
+        """
+        compiled = [
+            compile_dice(a['dice_expression']) if a.get('dice_expression') else None
+            for a in attacks
+        ]
+
+        randint = random.randint
+        d20s = [(randint(1, 20), randint(1, 20)) for _ in attacks]
+
+        results = []
+        for attack, expression, (roll1, roll2) in zip(attacks, compiled, d20s):
+            d20, d20_details = CombatRollService._d20_from_rolls(
+                roll1, roll2, bool(attack.get('advantage', False)), bool(attack.get('disadvantage', False))
+            )
+            attack_result = CombatRollService._attack_from_d20(
+                d20, d20_details, attack.get('bonus', 0), attack.get('target_ac', 10)
+            )
+
+            damage_result = None
+            if attack_result['hit'] and expression is not None:
+                damage_result = CombatRollService._damage_from_compiled(
+                    attack['dice_expression'],
+                    expression,
+                    attack.get('damage_type', 'slashing'),
+                    attack_result['crit'],
+                    attack.get('resistance', False),
+                    attack.get('immunity', False),
+                    attack.get('vulnerability', False)
+                )
+
+            results.append({'attack': attack_result, 'damage': damage_result})
+
+        return results
+
+    @staticmethod
+    def roll_saves_batch(
+        saves: List[Dict],
+        dc: int,
+        dice_expression: Optional[str] = None,
+        damage_type: str = 'fire',
+        half_on_success: bool = True
+    ) -> List[Dict]:
+        """
+        Resolve salvaguardas de vários alvos contra o mesmo efeito (ex: Bola de Fogo).
+
+        O dano é rolado uma única vez e aplicado a todos os alvos, como nas
+        regras de área do 5e; cada alvo aplica a sua resistência.
+
+        Args:
+            saves: Lista de dicts com save_bonus, advantage, disadvantage,
+                resistance, immunity, vulnerability
+            dc: Classe de dificuldade da salvaguarda
+            dice_expression: Dano do efeito (opcional)
+            damage_type: Tipo de dano para termos sem tipo
+            half_on_success: Se um sucesso sofre metade do dano (senão, nenhum)
+
+        Returns:
+            Lista (mesma ordem) de resultados com d20_result, total, success e final_damage
+
+        Raises:
+            DiceExpressionError: Se a expressão de dano for inválida
+        """
+        damage_roll = None
+        if dice_expression:
+            compiled = compile_dice(dice_expression)
+            damage_roll = compiled.roll(default_type=damage_type)
+            damage_type = compiled.primary_damage_type or damage_type
+
+        randint = random.randint
+        d20s = [(randint(1, 20), randint(1, 20)) for _ in saves]
+
+        results = []
+        for save, (roll1, roll2) in zip(saves, d20s):
+            d20, d20_details = CombatRollService._d20_from_rolls(
+                roll1, roll2, bool(save.get('advantage', False)), bool(save.get('disadvantage', False))
+            )
+            rolls = d20_details['rolls']
+
+            bonus = save.get('save_bonus', 0)
+            total = d20 + bonus
+            success = total >= dc
+
+            result = {
+                'd20_result': d20,
+                'rolls': rolls,
+                'bonus': bonus,
+                'total': total,
+                'dc': dc,
+                'success': success
+            }
+
+            if damage_roll is not None:
+                base = damage_roll['total']
+                if success:
+                    base = base // 2 if half_on_success else 0
+                result.update({
+                    'expression': dice_expression,
+                    'damage_type': damage_type,
+                    'base_damage': damage_roll['total'],
+                    'final_damage': CombatRollService._apply_damage_modifiers(
+                        base,
+                        save.get('resistance', False),
+                        save.get('immunity', False),
+                        save.get('vulnerability', False)
+                    )
+                })
+
+            results.append(result)
+
+        return results
+
+    @staticmethod
+    def initiative_key(participant: Dict) -> Tuple[int, int]:
+        """
+        Chave de ordenação da iniciativa: maior iniciativa primeiro e, em caso
+        de empate, maior modificador de Destreza.
+        """
+        return (-int(participant.get('iniciativa') or 0), -int(participant.get('destreza_mod') or 0))
+
+    @staticmethod
+    def roll_initiative_batch(participants: List[Dict], group: bool = False) -> List[Dict]:
+        """
+        Rola a iniciativa (d20 + modificador de Destreza) de todos os participantes.
+
+        Args:
+            participants: Lista de dicts do tracker com destreza_mod (e
+                monster_id, para a iniciativa de grupo); são alterados no lugar
+            group: Se os monstros do mesmo tipo (monster_id) partilham um só d20
+
+        Returns:
+            Os participantes ordenados por iniciativa (ver initiative_key), com
+            iniciativa e destreza_mod preenchidos
+        """
+        randint = random.randint
+        group_rolls = {}
+
+        for participant in participants:
+            try:
+                modifier = int(participant.get('destreza_mod') or 0)
+            except (TypeError, ValueError):
+                modifier = 0
+
+            monster_id = participant.get('monster_id') if group else None
+            if monster_id:
+                d20 = group_rolls.setdefault(monster_id, randint(1, 20))
+            else:
+                d20 = randint(1, 20)
+
+            participant['destreza_mod'] = modifier
+            participant['iniciativa'] = d20 + modifier
+
+        return sorted(participants, key=CombatRollService.initiative_key)
+
     @staticmethod
     def parse_attack_from_monster_action(action_text: str) -> Optional[Dict]:
         """
         Extrai informação de ataque de uma descrição de ação de monstro.
 
         Formato esperado: "Ataque corpo a corpo com arma: +X para acertar, ... Acerto: YdZ+W de dano tipo."
+        O texto é compilado uma vez (monster_actions) e reutilizado nas chamadas seguintes;
+        os monstros das aventuras já trazem os perfis em Monster.perfis_ataque.
 
         Args:
             action_text: Texto da descrição da ação
@@ -249,48 +436,4 @@ class CombatRollService:
         if not action_text:
             return None
 
-        # Extrair bónus de ataque (+X para acertar)
-        attack_match = re.search(r'\+(\d+)\s+para acertar', action_text, re.IGNORECASE)
-        bonus = int(attack_match.group(1)) if attack_match else 0
-
-        # Extrair dano (Acerto: XdY+Z)
-        damage_match = re.search(r'Acerto:\s*(\d+\s*\(\s*\d+d\d+[+-]?\d*\s*\))', action_text, re.IGNORECASE)
-        if not damage_match:
-            # Tentar formato mais simples
-            damage_match = re.search(r'(\d+d\d+[+-]?\d*)', action_text)
-
-        damage_expression = "1d6"  # Padrão
-        if damage_match:
-            damage_str = damage_match.group(1)
-            # Extrair apenas a expressão de dados
-            dice_expr_match = re.search(r'(\d+d\d+[+-]?\d*)', damage_str)
-            if dice_expr_match:
-                damage_expression = dice_expr_match.group(1)
-
-        # Extrair tipo de dano
-        damage_type = "slashing"  # Padrão
-        type_patterns = [
-            (r'perfurante', 'piercing'),
-            (r'cortante', 'slashing'),
-            (r'contundente', 'bludgeoning'),
-            (r'fogo', 'fire'),
-            (r'gelo', 'cold'),
-            (r'elétrico', 'lightning'),
-            (r'ácido', 'acid'),
-            (r'veneno', 'poison'),
-            (r'psíquico', 'psychic'),
-            (r'necrótico', 'necrotic'),
-            (r'radiante', 'radiant'),
-            (r'trovão', 'thunder')
-        ]
-
-        for pattern, dtype in type_patterns:
-            if re.search(pattern, action_text, re.IGNORECASE):
-                damage_type = dtype
-                break
-
-        return {
-            'bonus': bonus,
-            'damage_expression': damage_expression,
-            'damage_type': damage_type
-        }
+        return legacy_attack(compile_action_text(action_text))
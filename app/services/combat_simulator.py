@@ -0,0 +1,316 @@
+"""
+Simulador de Combate (Monte Carlo)
+
+Estima a letalidade de um encontro simulando milhares de combates
+simplificados entre o grupo e os monstros. Complementa os thresholds de XP
+do EncounterGeneratorService, que são apenas uma aproximação.
+
+Modelo simplificado:
+- Cada combatente usa o ataque com maior dano esperado contra o alvo
+- Os jogadores concentram ataques no monstro com menos HP
+- Os monstros atacam um jogador aleatório ainda de pé
+- Jogadores a 0 HP ficam caídos (sem death saves nem cura)
+"""
+
+import atexit
+import bisect
+import os
+import random
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from flask import current_app
+from typing import Dict, List, Optional, Tuple
+from app.services.combat_probability_service import CombatProbabilityService
+from app.services.dice_engine import compile_dice, DiceExpressionError
+from app.services.monster_actions import compile_monster_actions, attack_profiles
+
+
+PLAYER = 0
+MONSTER = 1
+
+# A partir deste número de iterações o trabalho é dividido por processos
+PARALLEL_THRESHOLD = 50000
+
+# Processos do executor partilhado (get_simulation_executor)
+PARALLEL_WORKERS = min(os.cpu_count() or 1, 8)
+
+# Máximo de iterações por simulação (o número vem do cliente)
+MAX_ITERATIONS = 200000
+
+# Máximo de combatentes (grupo + monstros) numa simulação
+MAX_COMBATANTS = 100
+
+_executor_lock = threading.Lock()
+
+
+def _run_simulations(setup: Dict, iterations: int, seed: Optional[int]) -> Dict:
+    """
+    Correr iterações do combate (função de módulo para poder ir para um processo).
+
+    Returns:
+        Totais agregados: vitórias, rondas, jogadores caídos, empates
+    """
+    rng = random.Random(seed)
+    rand = rng.random
+    randrange = rng.randrange
+    bisect_right = bisect.bisect_right
+
+    sides = setup['sides']
+    base_hp = setup['hp']
+    init_mods = setup['init']
+    tables = setup['tables']  # tables[atacante][alvo] -> (acumulada, danos, esperado)
+    max_rounds = setup['max_rounds']
+    n = len(sides)
+    player_ids = [i for i in range(n) if sides[i] == PLAYER]
+    monster_ids = [i for i in range(n) if sides[i] == MONSTER]
+
+    wins = 0
+    timeouts = 0
+    rounds_total = 0
+    downs_total = 0
+
+    for _ in range(iterations):
+        hp = list(base_hp)
+        order = sorted(range(n), key=lambda i: -(randrange(1, 21) + init_mods[i] + rand() * 0.1))
+        players_up = [i for i in player_ids if hp[i] > 0]
+        monsters_up = [i for i in monster_ids if hp[i] > 0]
+
+        rounds = 0
+        while players_up and monsters_up and rounds < max_rounds:
+            rounds += 1
+            for attacker in order:
+                if hp[attacker] <= 0:
+                    continue
+                if sides[attacker] == PLAYER:
+                    if not monsters_up:
+                        break
+                    target = min(monsters_up, key=hp.__getitem__)
+                else:
+                    if not players_up:
+                        break
+                    target = players_up[randrange(len(players_up))]
+
+                cumulative, damages, _ = tables[attacker][target]
+                damage = damages[bisect_right(cumulative, rand())]
+                if damage:
+                    hp[target] -= damage
+                    if hp[target] <= 0:
+                        if sides[target] == PLAYER:
+                            players_up.remove(target)
+                        else:
+                            monsters_up.remove(target)
+
+        rounds_total += rounds
+        downs_total += len(player_ids) - len(players_up)
+        if not monsters_up:
+            wins += 1
+        elif players_up:
+            timeouts += 1
+
+    return {
+        'iterations': iterations,
+        'wins': wins,
+        'timeouts': timeouts,
+        'rounds': rounds_total,
+        'downs': downs_total
+    }
+
+
+class CombatSimulatorService:
+    """Serviço para estimar a letalidade de encontros por simulação."""
+
+    DEFAULT_ATTACK = (2, '1d4')  # Ataque desarmado se não houver outro
+
+    def __init__(self):
+        self.probability_service = CombatProbabilityService()
+
+    # --- Combatentes ---
+
+    def player_from_character(self, nome: str, character_data: Dict, hp: Optional[int] = None) -> Dict:
+        """
+        Construir um combatente a partir do character_data de um SessionPlayer.
+
+        Args:
+            nome: Nome a mostrar
+            character_data: Dados do personagem (ac, hp_max, destreza, ataques)
+            hp: HP atual (por defeito, hp_max)
+        """
+        attacks = []
+        for ataque in character_data.get('ataques', []) or []:
+            try:
+                bonus = int(str(ataque.get('bonus', '0')).replace(' ', ''))
+            except ValueError:
+                bonus = 0
+            dano = str(ataque.get('dano', ''))
+            try:
+                compile_dice(dano)
+            except DiceExpressionError:
+                continue
+            attacks.append((bonus, dano))
+
+        return {
+            'nome': nome,
+            'side': PLAYER,
+            'ac': int(character_data.get('ac', 10)),
+            'hp': int(hp if hp is not None else character_data.get('hp_max', 10)),
+            'init': (int(character_data.get('destreza', 10)) - 10) // 2,
+            'attacks': attacks or [self.DEFAULT_ATTACK]
+        }
+
+    def generic_player(self, level: int) -> Dict:
+        """Combatente genérico para um nível, quando não há personagens reais."""
+        level = max(1, min(20, int(level)))
+        proficiency = 2 + (level - 1) // 4
+        return {
+            'nome': f'Aventureiro nv{level}',
+            'side': PLAYER,
+            'ac': 14 + level // 5,
+            'hp': 10 + 7 * (level - 1),
+            'init': 2,
+            'attacks': [(3 + proficiency, '1d8+3' if level < 5 else '2d8+3')]
+        }
+
+    def monster_combatant(self, monster: Dict) -> Dict:
+        """Construir um combatente a partir do stat block de um monstro."""
+        profiles = monster.get('perfis_ataque') or compile_monster_actions(monster.get('acoes', []))
+        attacks = [(p['bonus'], p['damage_expression']) for p in attack_profiles(profiles)]
+
+        return {
+            'nome': monster.get('nome', monster.get('id', 'Monstro')),
+            'side': MONSTER,
+            'ac': int(monster.get('ac', 10)),
+            'hp': int(monster.get('hp_max', 10)),
+            'init': (int(monster.get('destreza', 10)) - 10) // 2,
+            'attacks': attacks or [self.DEFAULT_ATTACK]
+        }
+
+    # --- Simulação ---
+
+    def _build_setup(self, combatants: List[Dict], max_rounds: int) -> Dict:
+        """Pré-calcular as tabelas de dano de cada par atacante/alvo."""
+        tables = []
+        for attacker in combatants:
+            row = []
+            for target in combatants:
+                if target['side'] == attacker['side']:
+                    row.append(None)
+                    continue
+                best = None
+                best_expected = -1.0
+                for bonus, expression in attacker['attacks']:
+                    pmf = self.probability_service.attack_damage_pmf(bonus, target['ac'], expression)
+                    expected = sum(d * p for d, p in pmf.items())
+                    if expected > best_expected:
+                        best, best_expected = pmf, expected
+                row.append(self._cumulative_table(best, best_expected))
+            tables.append(row)
+
+        return {
+            'sides': [c['side'] for c in combatants],
+            'hp': [c['hp'] for c in combatants],
+            'init': [c['init'] for c in combatants],
+            'tables': tables,
+            'max_rounds': max_rounds
+        }
+
+    @staticmethod
+    def _cumulative_table(pmf: Dict[int, float], expected: float) -> Tuple[List[float], List[int], float]:
+        """Converter uma PMF de dano em (probabilidades acumuladas, danos, esperado)."""
+        damages = sorted(pmf)
+        cumulative = []
+        running = 0.0
+        for damage in damages:
+            running += pmf[damage]
+            cumulative.append(running)
+        cumulative[-1] = 1.0
+        return cumulative, damages, expected
+
+    @staticmethod
+    def _expected_damage_per_round(setup: Dict) -> Tuple[float, float]:
+        """Dano esperado por ronda de cada lado (média sobre os alvos possíveis), sem amostragem."""
+        totals = [0.0, 0.0]
+        for attacker, row in enumerate(setup['tables']):
+            expected = [entry[2] for entry in row if entry is not None]
+            if expected:
+                totals[setup['sides'][attacker]] += sum(expected) / len(expected)
+        return totals[PLAYER], totals[MONSTER]
+
+    def simulate(
+        self,
+        players: List[Dict],
+        monsters: List[Dict],
+        iterations: int = 10000,
+        max_rounds: int = 20,
+        seed: Optional[int] = None,
+        executor: Optional[Executor] = None
+    ) -> Dict:
+        """
+        Simular o combate entre o grupo e os monstros.
+
+        Args:
+            players: Combatentes do grupo (player_from_character/generic_player)
+            monsters: Combatentes monstros (monster_combatant), um por criatura
+            iterations: Número de combates a simular
+            max_rounds: Rondas até o combate contar como inconclusivo
+            seed: Semente para resultados reprodutíveis
+            executor: Executor partilhado (get_simulation_executor); com ele, a
+                partir de PARALLEL_THRESHOLD iterações o trabalho é dividido
+                por PARALLEL_WORKERS processos
+
+        Returns:
+            Dicionário com win_probability, expected_rounds, expected_downs, ...
+
+        Raises:
+            ValueError: Sem combatentes, mais de MAX_COMBATANTS ou iterations
+                fora de 1..MAX_ITERATIONS
+        """
+        if not players or not monsters:
+            raise ValueError('O grupo e o encontro precisam de pelo menos um combatente')
+        if len(players) + len(monsters) > MAX_COMBATANTS:
+            raise ValueError(f'Uma simulação pode ter no máximo {MAX_COMBATANTS} combatentes')
+        if not 1 <= iterations <= MAX_ITERATIONS:
+            raise ValueError(f'Número de simulações deve estar entre 1 e {MAX_ITERATIONS}')
+
+        setup = self._build_setup(players + monsters, max_rounds)
+
+        if executor is not None and PARALLEL_WORKERS > 1 and iterations >= PARALLEL_THRESHOLD:
+            base_seed = seed if seed is not None else random.randrange(2 ** 32)
+            chunk, extra = divmod(iterations, PARALLEL_WORKERS)
+            sizes = [chunk + (1 if i < extra else 0) for i in range(PARALLEL_WORKERS)]
+            futures = [
+                executor.submit(_run_simulations, setup, size, base_seed + i)
+                for i, size in enumerate(sizes) if size
+            ]
+            parts = [f.result() for f in futures]
+        else:
+            parts = [_run_simulations(setup, iterations, seed)]
+
+        totals = {key: sum(p[key] for p in parts) for key in ('iterations', 'wins', 'timeouts', 'rounds', 'downs')}
+        runs = totals['iterations'] or 1
+        party_dpr, monster_dpr = self._expected_damage_per_round(setup)
+
+        return {
+            'iterations': totals['iterations'],
+            'win_probability': round(totals['wins'] / runs, 4),
+            'loss_probability': round((runs - totals['wins'] - totals['timeouts']) / runs, 4),
+            'timeout_probability': round(totals['timeouts'] / runs, 4),
+            'expected_rounds': round(totals['rounds'] / runs, 2),
+            'expected_downs': round(totals['downs'] / runs, 2),
+            'party_damage_per_round': round(party_dpr, 2),
+            'monster_damage_per_round': round(monster_dpr, 2),
+            'party_size': len(players),
+            'num_monsters': len(monsters)
+        }
+
+
+def get_simulation_executor() -> ProcessPoolExecutor:
+    """Obter o executor de processos partilhado pela aplicação Flask atual (um por app)."""
+    executor = current_app.extensions.get('simulation_executor')
+    if executor is None:
+        with _executor_lock:
+            executor = current_app.extensions.get('simulation_executor')
+            if executor is None:
+                executor = ProcessPoolExecutor(max_workers=PARALLEL_WORKERS)
+                current_app.extensions['simulation_executor'] = executor
+                atexit.register(executor.shutdown, wait=False)
+    return executor
@@ -0,0 +1,417 @@
+"""
+Store de Estado de Combate (write-behind)
+
+Durante um combate quase todas as interações (dano, condições, turnos,
+ataques) geram uma escrita. Com o store ativo (COMBAT_WRITE_BEHIND), o
+estado do combate de cada sessão fica em memória: leituras e escritas são
+servidas daí e as alterações são agrupadas e escritas em SessionCombat /
+CombatLog periodicamente (COMBAT_FLUSH_INTERVAL), no fim do combate e ao
+terminar o processo.
+
+Cada alteração é também acrescentada a um journal por sessão
+(instance/combat_journal/<sessao>.jsonl) antes de responder ao pedido. Se o
+processo for morto, o journal é reaplicado sobre o último estado escrito na
+base de dados quando o combate voltar a ser carregado (ou no arranque).
+Cada entrada tem um número de sequência ('seq') e o flush guarda o último
+escrito em SessionCombat.journal_seq, na mesma transação: ao reaplicar,
+as entradas já escritas (operações ou só logs) são ignoradas.
+
+A passagem de turno não passa pelo store: /proximo-turno escreve o estado
+pendente e passa o turno no SessionCombat (CombatTurnService), que também
+repõe a action economy.
+"""
+
+import atexit
+import copy
+import json
+import os
+import threading
+from dataclasses import dataclass, field, replace
+from flask import current_app
+from typing import Dict, List, Optional, Tuple
+from app import db
+from app.models.combat import CondicoesMixin, mascara_condicoes
+from app.models.session import SessionCombat
+from app.services.combat_log_service import CombatLogService
+from app.services.combat_patch_service import CombatPatchService, CombatPatchError, CombatVersionConflict
+
+
+@dataclass
+class ParticipantState(CondicoesMixin):
+    """Participante em memória (mesma interface que CombatParticipant)."""
+    participant_id: str
+    ordem: int = 0
+    nome: str = ''
+    tipo: str = 'monstro'
+    hp_atual: int = 0
+    hp_max: int = 0
+    ac: int = 10
+    iniciativa: int = 0
+    condicoes_mask: int = 0
+    dados: Dict = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, dados: Dict, ordem: int) -> 'ParticipantState':
+        extra = {k: v for k, v in dados.items()
+                 if k not in ('id', 'nome', 'tipo', 'hp_atual', 'hp_max', 'ac', 'iniciativa', 'condicoes')}
+        return cls(
+            participant_id=str(dados.get('id', '')),
+            ordem=ordem,
+            nome=dados.get('nome') or '',
+            tipo=dados.get('tipo') or 'monstro',
+            hp_atual=dados.get('hp_atual') or 0,
+            hp_max=dados.get('hp_max') or 0,
+            ac=dados.get('ac') or 10,
+            iniciativa=dados.get('iniciativa') or 0,
+            condicoes_mask=mascara_condicoes(dados.get('condicoes')),
+            dados=extra
+        )
+
+    def copiar(self) -> 'ParticipantState':
+        """Cópia que pode ser alterada sem mexer nesta (os efeitos já são copiados por get_efeitos)."""
+        return replace(self, dados=dict(self.dados))
+
+    def get_efeitos(self) -> List[Dict]:
+        return copy.deepcopy(self.dados.get('efeitos') or [])
+
+    def set_efeitos(self, efeitos: List[Dict]):
+        if efeitos:
+            self.dados['efeitos'] = efeitos
+        else:
+            self.dados.pop('efeitos', None)
+
+    def to_dict(self) -> Dict:
+        participante = dict(self.dados)
+        participante.update({
+            'id': self.participant_id,
+            'nome': self.nome,
+            'tipo': self.tipo,
+            'hp_atual': self.hp_atual,
+            'hp_max': self.hp_max,
+            'ac': self.ac,
+            'iniciativa': self.iniciativa,
+            'condicoes': self.get_condicoes()
+        })
+        return participante
+
+
+@dataclass
+class CombatState:
+    """Estado em memória do combate de uma sessão."""
+    session_id: int
+    combat_id: int
+    ronda_atual: int = 1
+    turno_atual: int = 0
+    versao: int = 0
+    journal_seq: int = 0  # Última entrada do journal aplicada
+    participantes: List[ParticipantState] = field(default_factory=list)
+    agenda_efeitos: Optional[Dict] = None  # Fila de expiração das condições (ConditionScheduler)
+    logs: List[Tuple[str, Dict]] = field(default_factory=list)  # (método do CombatLogService, kwargs)
+    dirty: bool = False
+
+    def get_linhas_participantes(self) -> List[ParticipantState]:
+        return self.participantes
+
+    def get_participantes(self) -> List[Dict]:
+        return [p.to_dict() for p in self.participantes]
+
+    def get_participante(self, participant_id) -> Optional[ParticipantState]:
+        return next((p for p in self.participantes if p.participant_id == str(participant_id)), None)
+
+    def get_agenda_efeitos(self) -> Optional[Dict]:
+        return self.agenda_efeitos
+
+    def set_agenda_efeitos(self, agenda: Optional[Dict]):
+        self.agenda_efeitos = agenda
+
+    def incrementar_versao(self):
+        self.versao += 1
+
+    def next_turn(self) -> Dict:
+        """
+        Passar ao turno seguinte, como SessionCombat.next_turn.
+
+        Só é usado ao reaplicar eventos de turno (CombatEventService.rebuild);
+        a action economy não faz parte deste estado.
+        """
+        if not self.participantes:
+            raise ValueError('Combate sem participantes')
+        self.turno_atual += 1
+        nova_ronda = self.turno_atual >= len(self.participantes)
+        if nova_ronda:
+            self.turno_atual = 0
+            self.ronda_atual += 1
+        actor = self.participantes[self.turno_atual].participant_id
+        return {
+            'ronda': self.ronda_atual,
+            'turno': self.turno_atual,
+            'actor': actor,
+            'nova_ronda': nova_ronda
+        }
+
+
+class CombatStateStore:
+    """Estado de combate em memória com journal e escrita periódica para SQLite."""
+
+    def __init__(self, enabled: bool = False, journal_folder: Optional[str] = None,
+                 flush_interval: float = 2.0):
+        self.enabled = enabled
+        self.journal_folder = journal_folder
+        self.flush_interval = flush_interval
+        self.lock = threading.RLock()
+        self.patch_service = CombatPatchService()
+        self._states: Dict[int, CombatState] = {}
+        self._app = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Ciclo de vida ---
+
+    def start(self, app):
+        """Recuperar journals pendentes e arrancar a escrita periódica."""
+        if not self.enabled or self._thread is not None:
+            return
+        self._app = app
+        if self.journal_folder:
+            os.makedirs(self.journal_folder, exist_ok=True)
+            with app.app_context():
+                self.recover()
+
+        self._thread = threading.Thread(target=self._run, name='combat-state-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def shutdown(self):
+        """Parar a escrita periódica e escrever tudo o que falta."""
+        self._stop.set()
+        if self._app is not None:
+            with self._app.app_context():
+                self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                with self._app.app_context():
+                    self.flush()
+            except Exception as e:
+                self._app.logger.error(f'Erro ao escrever estado de combate: {e}')
+
+    # --- Journal ---
+
+    def _journal_path(self, session_id: int) -> Optional[str]:
+        if not self.journal_folder:
+            return None
+        return os.path.join(self.journal_folder, f'{int(session_id)}.jsonl')
+
+    def _append_journal(self, session_id: int, entry: Dict):
+        path = self._journal_path(session_id)
+        if path:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def _read_journal(self, session_id: int) -> List[Dict]:
+        path = self._journal_path(session_id)
+        if not path or not os.path.exists(path):
+            return []
+        entries = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break  # Última linha incompleta (processo morto a meio da escrita)
+        return entries
+
+    def _clear_journal(self, session_id: int):
+        path = self._journal_path(session_id)
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def recover(self) -> int:
+        """Reaplicar e escrever os journals deixados por um processo anterior."""
+        if not self.journal_folder or not os.path.isdir(self.journal_folder):
+            return 0
+        recovered = 0
+        for name in os.listdir(self.journal_folder):
+            if name.endswith('.jsonl') and name[:-6].isdigit():
+                if self.load(int(name[:-6])) is not None:
+                    recovered += 1
+        self.flush()
+        return recovered
+
+    # --- Leitura e escrita ---
+
+    def load(self, session_id: int) -> Optional[CombatState]:
+        """Obter o estado em memória, carregando-o da base de dados se preciso."""
+        with self.lock:
+            state = self._states.get(session_id)
+            if state is not None:
+                return state
+
+            combat = SessionCombat.query.filter_by(session_id=session_id).first()
+            if combat is None:
+                return None
+
+            state = CombatState(
+                session_id=session_id,
+                combat_id=combat.id,
+                ronda_atual=combat.ronda_atual or 1,
+                turno_atual=combat.turno_atual or 0,
+                versao=combat.versao or 0,
+                journal_seq=combat.journal_seq or 0,
+                agenda_efeitos=combat.get_agenda_efeitos(),
+                participantes=[ParticipantState.from_dict(p, i) for i, p in enumerate(combat.get_participantes())]
+            )
+
+            for entry in self._read_journal(session_id):
+                # Entradas já escritas (processo morto entre o commit e apagar o journal)
+                if entry.get('seq', 0) <= state.journal_seq:
+                    continue
+                state.journal_seq = entry['seq']
+                try:
+                    self.patch_service.apply_operations(state, entry.get('operations', []))
+                except CombatPatchError:
+                    continue
+                state.versao = entry.get('versao', state.versao)
+                state.logs.extend((method, kwargs) for method, kwargs in entry.get('logs', []))
+                state.dirty = True
+
+            self._states[session_id] = state
+            return state
+
+    def record(self, session_id: int, operations: List[Dict], logs: Optional[List[Tuple[str, Dict]]] = None,
+               base_version: Optional[int] = None) -> Dict:
+        """
+        Aplicar operações e/ou registar logs no estado em memória.
+
+        Args:
+            session_id: ID da sessão
+            operations: Operações do CombatPatchService (pode ser vazia, só logs)
+            logs: Lista de (método do CombatLogService, kwargs) a escrever no flush
+            base_version: Se indicada, rejeita o pedido se o estado já mudou
+
+        Returns:
+            Resultado do apply_operations com a nova versão
+
+        Raises:
+            CombatVersionConflict, CombatPatchError: Como no CombatPatchService
+                (next_turn incluído: o turno passa por /proximo-turno)
+        """
+        if operations:
+            self.patch_service.validate_patch(operations)
+        with self.lock:
+            state = self.load(session_id)
+            if state is None:
+                raise CombatPatchError('Combate nao encontrado')
+            if base_version is not None and base_version != state.versao:
+                raise CombatVersionConflict(state.versao)
+
+            # Aplicar sobre uma cópia para o pedido ser atómico
+            pending = state.logs
+            draft = self._draft(state, operations or [])
+            result = self.patch_service.apply_operations(draft, operations or [])
+            if operations:
+                draft.incrementar_versao()
+            logs = list(logs or [])
+            if operations:
+                logs.append(('log_state', dict(
+                    session_id=session_id,
+                    operations=operations,
+                    ronda=draft.ronda_atual,
+                    turno=draft.turno_atual,
+                    combat_id=draft.combat_id
+                )))
+            logs.extend(self.patch_service.condition_logs(
+                result, session_id, draft.combat_id, draft.ronda_atual, draft.turno_atual
+            ))
+            draft.logs = pending + logs
+            draft.dirty = True
+            draft.journal_seq += 1
+
+            self._append_journal(session_id, {
+                'seq': draft.journal_seq,
+                'versao': draft.versao,
+                'operations': operations or [],
+                'logs': [list(entry) for entry in logs]
+            })
+            self._states[session_id] = draft
+
+            result['versao'] = draft.versao
+            return result
+
+    @staticmethod
+    def _draft(state: CombatState, operations: List[Dict]) -> CombatState:
+        """
+        Cópia do estado sobre a qual as operações de um pedido são aplicadas.
+
+        Só são copiados os participantes que as operações podem alterar (todos,
+        se houver um reorder) e a fila de expirações; os restantes
+        participantes e os logs pendentes são partilhados com o estado atual.
+        """
+        alterados = {str(op.get('id')) for op in operations
+                     if op.get('op') in ('set_hp', 'add_condition', 'remove_condition')}
+        todos = any(op.get('op') == 'reorder' for op in operations)
+        agenda = state.agenda_efeitos
+        return replace(
+            state,
+            participantes=[p.copiar() if todos or p.participant_id in alterados else p for p in state.participantes],
+            agenda_efeitos=dict(agenda, heap=list(agenda['heap'])) if agenda else agenda
+        )
+
+    def flush(self, session_id: Optional[int] = None, evict: bool = False) -> int:
+        """
+        Escrever o estado pendente na base de dados (numa só transação).
+
+        Args:
+            session_id: Só esta sessão (por defeito, todas)
+            evict: Remover o estado da memória depois de escrito
+
+        Returns:
+            Número de combates escritos
+        """
+        with self.lock:
+            session_ids = [session_id] if session_id is not None else list(self._states)
+            dirty = [self._states[sid] for sid in session_ids if sid in self._states and self._states[sid].dirty]
+            if dirty:
+                with CombatLogService.unit_of_work():
+                    for state in dirty:
+                        self._write(state)
+            if evict:
+                for sid in session_ids:
+                    self._states.pop(sid, None)
+            written = len(dirty)
+            if written:
+                for sid in session_ids:
+                    state = self._states.get(sid)
+                    if state is not None:
+                        state.logs = []
+                        state.dirty = False
+                    self._clear_journal(sid)
+            return written
+
+    def _write(self, state: CombatState):
+        """Passar um estado para SessionCombat e CombatLog (dentro da unidade de trabalho do flush)."""
+        combat = db.session.get(SessionCombat, state.combat_id)
+        if combat is not None:
+            combat.set_participantes(state.get_participantes())
+            combat.ronda_atual = state.ronda_atual
+            combat.turno_atual = state.turno_atual
+            combat.versao = state.versao
+            combat.journal_seq = state.journal_seq
+            combat.set_agenda_efeitos(state.agenda_efeitos)
+
+        for method, kwargs in state.logs:
+            getattr(CombatLogService, method)(**kwargs)
+
+
+def get_combat_state_store() -> CombatStateStore:
+    """Obter o CombatStateStore partilhado pela aplicação Flask atual."""
+    store = current_app.extensions.get('combat_state_store')
+    if store is None:
+        config = current_app.config
+        store = current_app.extensions.setdefault('combat_state_store', CombatStateStore(
+            enabled=config.get('COMBAT_WRITE_BEHIND', False),
+            journal_folder=config.get('COMBAT_JOURNAL_FOLDER'),
+            flush_interval=config.get('COMBAT_FLUSH_INTERVAL', 2.0)
+        ))
+    return store
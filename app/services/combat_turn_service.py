@@ -0,0 +1,75 @@
+"""
+Serviço de Turnos de Combate
+
+Passagem de turno feita no servidor, numa só transação:
+- avança turno_atual/ronda_atual (SessionCombat.next_turn)
+- repõe a action economy do participante que começa o turno
+- retira as condições cuja duração acabou (ConditionScheduler)
+- na mudança de ronda, repõe a action economy de todos (um só UPDATE),
+  acumula o tempo real da ronda que acabou e inicia o timer da seguinte
+- regista o evento de estado e incrementa a versão
+
+Devolve só o que mudou (delta), em vez do combate completo.
+"""
+
+from app.services.combat_log_service import CombatLogService
+from app.services.combat_patch_service import CombatPatchService, CombatVersionConflict
+from app.services.time_service import TimeTrackingService
+from typing import Dict, Optional
+
+
+class CombatTurnService:
+    """Serviço para passar o turno de um combate de sessão."""
+
+    OPERATIONS = [{'op': 'next_turn'}]
+
+    def __init__(self):
+        self.patch_service = CombatPatchService()
+        self.time_service = TimeTrackingService()
+
+    def next_turn(self, combat, base_version: Optional[int] = None) -> Dict:
+        """
+        Passar ao turno seguinte.
+
+        Args:
+            combat: SessionCombat a alterar
+            base_version: Versão em que o cliente se baseou (opcional); evita
+                que dois cliques/separadores passem dois turnos
+
+        Returns:
+            Dict com versao, ronda, turno, actor (ID de quem começa o turno),
+            nova_ronda, action_economy (do actor, já reposta), participants
+            (condições alteradas), expirados e salvaguardas (ver ConditionScheduler)
+
+        Raises:
+            CombatVersionConflict: Se base_version não for a versão atual
+            CombatPatchError: Se o combate não tiver participantes
+        """
+        if base_version is not None and base_version != combat.versao:
+            raise CombatVersionConflict(combat.versao)
+
+        with CombatLogService.unit_of_work():
+            delta = self.patch_service.apply_operations(combat, self.OPERATIONS)
+
+            if delta['nova_ronda']:
+                combat.reset_action_economy()
+                self.time_service.end_combat_round(combat.session_id, commit=False)
+                self.time_service.start_combat_round_timer(combat.session_id, commit=False)
+
+            CombatLogService.log_state(
+                session_id=combat.session_id,
+                operations=self.OPERATIONS,
+                ronda=combat.ronda_atual,
+                turno=combat.turno_atual,
+                combat_id=combat.id
+            )
+            logs = self.patch_service.condition_logs(
+                delta, combat.session_id, combat.id, combat.ronda_atual, combat.turno_atual
+            )
+            for method, kwargs in logs:
+                getattr(CombatLogService, method)(**kwargs)
+            combat.incrementar_versao()
+
+        delta['versao'] = combat.versao
+        delta['action_economy'] = combat.get_action_economy().get(delta['actor'])
+        return delta
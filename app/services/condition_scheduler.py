@@ -0,0 +1,210 @@
+"""
+Agendador de Duração de Condições
+
+As condições dos participantes são uma máscara de bits do CONDICOES_5E
+(CondicoesMixin); a duração de cada uma fica em 'efeitos' no participante:
+
+    {'id': 3, 'condicao': 'atordoado', 'tipo': 'turno_fonte', 'ronda': 2, 'fonte': 'player_1'}
+
+Tipos de duração:
+- 'ronda': até ao fim da ronda indicada ('ronda', ou 'rondas' a contar da atual)
+- 'turno_fonte': até ao fim do próximo turno da fonte ('fonte'; por defeito o
+  próprio participante)
+- 'salvaguarda': até o participante passar uma salvaguarda ('atributo', 'cd');
+  no fim de cada turno dele é lembrado que pode repetir a salvaguarda
+
+As expirações ficam numa fila de prioridade (heapq) com chave (ronda, turno)
+guardada no combate: ao passar o turno só se retiram as que chegaram ao fim,
+em O(log n) cada, sem percorrer todos os efeitos. A fila é um índice: um
+efeito removido à mão fica na fila e é ignorado quando sair (a fonte de
+verdade são os 'efeitos' do participante). Quando os participantes são
+substituídos ou reordenados a fila é descartada e reconstruída a partir dos
+efeitos na próxima passagem de turno.
+
+Funciona com um SessionCombat ou com o estado em memória do CombatStateStore
+(get_linhas_participantes, ronda_atual, turno_atual, get/set_agenda_efeitos).
+"""
+
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+
+class ConditionScheduler:
+    """Agenda e aplica a expiração de condições ao passar os turnos."""
+
+    TIPOS = ('ronda', 'turno_fonte', 'salvaguarda')
+
+    # --- Fila de expirações ---
+
+    def _agenda(self, combat, rows) -> Dict:
+        """Fila do combate (reconstruída a partir dos efeitos se não existir)."""
+        agenda = combat.get_agenda_efeitos()
+        if agenda is not None:
+            return agenda
+
+        heap, seq = [], 0
+        for participant in rows:
+            for efeito in participant.get_efeitos():
+                heap.append(self._entrada(rows, participant.participant_id, efeito))
+                seq = max(seq, efeito.get('id', 0))
+        heapq.heapify(heap)
+        return {'seq': seq, 'heap': heap}
+
+    def _entrada(self, rows, participant_id: str, efeito: Dict) -> List:
+        """Entrada da fila: [ronda, turno, id, participante] da passagem de turno em que o efeito acaba."""
+        ronda = efeito['ronda']
+        if efeito['tipo'] == 'ronda':
+            return [ronda + 1, 0, efeito['id'], participant_id]
+
+        fonte = efeito.get('fonte') or participant_id
+        indice = next((i for i, p in enumerate(rows) if p.participant_id == fonte), None)
+        if indice is None or indice + 1 >= len(rows):
+            return [ronda + 1, 0, efeito['id'], participant_id]  # Fonte saiu do combate ou é a última a jogar
+        return [ronda, indice + 1, efeito['id'], participant_id]
+
+    def invalidar(self, combat):
+        """Descartar a fila (a ordem dos turnos mudou); é reconstruída quando for precisa."""
+        combat.set_agenda_efeitos(None)
+
+    # --- Operações ---
+
+    def agendar(self, combat, participant, condicao: str, expira: Dict) -> Dict:
+        """
+        Dar uma duração a uma condição do participante (substitui a anterior).
+
+        Args:
+            combat: Combate (para a ronda/turno atual e a ordem)
+            participant: Linha do participante
+            condicao: Nome da condição
+            expira: {'tipo': ..., 'ronda'/'rondas', 'fonte', 'atributo', 'cd'}
+
+        Returns:
+            O efeito criado
+
+        Raises:
+            ValueError: Se a duração for inválida
+        """
+        if not isinstance(expira, dict) or expira.get('tipo') not in self.TIPOS:
+            raise ValueError('Duracao invalida')
+
+        rows = combat.get_linhas_participantes()
+        agenda = self._agenda(combat, rows)
+        ronda = combat.ronda_atual or 1
+        turno = combat.turno_atual or 0
+        agenda['seq'] += 1
+        efeito = {'id': agenda['seq'], 'condicao': condicao, 'tipo': expira['tipo']}
+
+        if expira['tipo'] == 'ronda':
+            try:
+                if expira.get('rondas') is not None:
+                    efeito['ronda'] = ronda + max(1, int(expira['rondas'])) - 1
+                else:
+                    efeito['ronda'] = max(ronda, int(expira.get('ronda', ronda)))
+            except (TypeError, ValueError):
+                raise ValueError('Ronda invalida')
+        else:
+            fonte = participant.participant_id if expira['tipo'] == 'salvaguarda' else str(expira.get('fonte') or participant.participant_id)
+            indice = next((i for i, p in enumerate(rows) if p.participant_id == fonte), None)
+            if indice is None:
+                raise ValueError(f'Fonte nao encontrada: {fonte}')
+            efeito['fonte'] = fonte
+            efeito['ronda'] = ronda if indice > turno else ronda + 1
+            if expira['tipo'] == 'salvaguarda':
+                efeito['atributo'] = expira.get('atributo')
+                efeito['cd'] = expira.get('cd')
+
+        efeitos = [e for e in participant.get_efeitos() if e.get('condicao') != condicao]
+        efeitos.append(efeito)
+        participant.set_efeitos(efeitos)
+
+        heapq.heappush(agenda['heap'], self._entrada(rows, participant.participant_id, efeito))
+        combat.set_agenda_efeitos(agenda)
+        return efeito
+
+    def cancelar(self, participant, condicao: str) -> bool:
+        """Retirar a duração de uma condição (a entrada na fila passa a ser ignorada)."""
+        efeitos = participant.get_efeitos()
+        restantes = [e for e in efeitos if e.get('condicao') != condicao]
+        if len(restantes) == len(efeitos):
+            return False
+        participant.set_efeitos(restantes)
+        return True
+
+    def expirar(self, combat) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Aplicar as expirações até à ronda/turno atual (chamar depois de passar o turno).
+
+        Returns:
+            (expirados, salvaguardas): condições removidas ({id, nome, condicao})
+            e salvaguardas que o participante pode repetir ({id, nome, condicao,
+            atributo, cd}; o efeito continua e volta a ser lembrado no fim do
+            próximo turno dele)
+        """
+        rows = combat.get_linhas_participantes()
+        agenda = combat.get_agenda_efeitos()
+        if agenda is None:
+            if not any(p.get_efeitos() for p in rows):
+                return [], []
+            agenda = self._agenda(combat, rows)
+
+        heap = agenda['heap']
+        agora = [combat.ronda_atual or 1, combat.turno_atual or 0]
+        by_id = {p.participant_id: p for p in rows}
+        expirados, salvaguardas = [], []
+
+        while heap and heap[0][:2] <= agora:
+            _, _, efeito_id, participant_id = heapq.heappop(heap)
+            participant = by_id.get(participant_id)
+            efeitos = participant.get_efeitos() if participant else []
+            efeito = next((e for e in efeitos if e.get('id') == efeito_id), None)
+            if efeito is None:
+                continue  # Efeito cancelado ou participante removido
+
+            condicao = efeito['condicao']
+            if not participant.tem_condicao(condicao):
+                self.cancelar(participant, condicao)
+                continue
+
+            if efeito['tipo'] == 'salvaguarda':
+                efeito['ronda'] += 1
+                participant.set_efeitos(efeitos)
+                heapq.heappush(heap, self._entrada(rows, participant_id, efeito))
+                salvaguardas.append({
+                    'id': participant_id,
+                    'nome': participant.nome,
+                    'condicao': condicao,
+                    'atributo': efeito.get('atributo'),
+                    'cd': efeito.get('cd')
+                })
+                continue
+
+            participant.remove_condicao(condicao)
+            self.cancelar(participant, condicao)
+            expirados.append({'id': participant_id, 'nome': participant.nome, 'condicao': condicao})
+
+        combat.set_agenda_efeitos(agenda)
+        return expirados, salvaguardas
+
+    def terminar_por_salvaguarda(self, participant, atributo: Optional[str]) -> List[str]:
+        """
+        Terminar as condições que acabam com uma salvaguarda bem-sucedida.
+
+        Args:
+            participant: Linha do participante que passou a salvaguarda
+            atributo: Atributo da salvaguarda (ex: 'wis'); sem atributo nada termina
+
+        Returns:
+            Nomes das condições removidas
+        """
+        if not atributo:
+            return []
+
+        terminadas = [
+            e['condicao'] for e in participant.get_efeitos()
+            if e.get('tipo') == 'salvaguarda' and e.get('atributo') in (None, atributo)
+        ]
+        if terminadas:
+            for condicao in terminadas:
+                participant.remove_condicao(condicao)
+            participant.set_efeitos([e for e in participant.get_efeitos() if e.get('condicao') not in terminadas])
+        return terminadas
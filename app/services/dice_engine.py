@@ -0,0 +1,286 @@
+"""
+Motor de Expressões de Dados
+
+Compila expressões de dados na notação do D&D 5ª Edição para uma lista de
+termos, avaliada sem voltar a fazer parsing. As expressões compiladas ficam
+numa cache LRU limitada, por isso um roll repetido só paga o custo de gerar
+os números aleatórios.
+
+Notação suportada:
+- Vários termos: "2d6+1d4+3", "1d8-1"
+- Manter maiores/menores: "4d6kh3" (ou "4d6k3"), "2d20kl1"
+- Rerolls (uma vez): "2d6r2" ou "2d6r<=2" (rerolar 1 e 2), "2d6r<3"
+- Mínimo por dado: "2d6mi2" (resultados abaixo de 2 contam como 2)
+- Tipo de dano por termo: "1d8[cortante]+2d6[fogo]+3"
+- Tipo de dano para toda a expressão: "1d8+3 cortante" (só tipos conhecidos,
+  DAMAGE_TYPE_WORDS; qualquer outro sufixo é um erro)
+"""
+
+import random
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+
+MAX_DICE = 1000
+MAX_SIDES = 1000
+
+_TERM_RE = re.compile(
+    r'(?P<sign>[+-]?)'
+    r'(?:(?P<count>\d*)d(?P<sides>\d+|%)(?P<mods>(?:kh\d+|kl\d+|k\d+|r<=\d+|r<\d+|r\d+|mi\d+)*)'
+    r'|(?P<const>\d+))'
+    r'(?:\[(?P<type>[^\]]+)\])?'
+)
+_MOD_RE = re.compile(r'(kh|kl|k|r<=|r<|r|mi)(\d+)')
+_TRAILING_TYPE_RE = re.compile(r'^(?P<expr>.*[\d\]])\s+(?P<type>[^\d\s\[\]+-][^\[\]+]*)$')
+
+# Tipos de dano aceites como sufixo da expressão (português, com e sem acentos, e inglês)
+DAMAGE_TYPE_WORDS = frozenset({
+    'acid', 'bludgeoning', 'cold', 'fire', 'force', 'lightning', 'necrotic',
+    'piercing', 'poison', 'psychic', 'radiant', 'slashing', 'thunder',
+    'ácido', 'acido', 'contundente', 'cortante', 'elétrico', 'eletrico',
+    'energia', 'fogo', 'força', 'forca', 'frio', 'gelo', 'necrótico',
+    'necrotico', 'perfurante', 'psíquico', 'psiquico', 'radiante',
+    'relâmpago', 'relampago', 'trovão', 'trovao', 'veneno'
+})
+
+
+class DiceExpressionError(ValueError):
+    """Expressão de dados inválida."""
+
+
+@dataclass(frozen=True)
+class DiceTerm:
+    """Um termo da expressão: grupo de dados ou constante."""
+    sign: int
+    count: int  # 0 para constantes
+    sides: int  # 0 para constantes
+    value: int = 0  # Valor da constante
+    keep: Optional[Tuple[str, int]] = None  # ('h'|'l', n)
+    reroll_below: int = 0  # Rerolar uma vez resultados <= este valor
+    minimum: int = 0  # Valor mínimo de cada dado
+    damage_type: Optional[str] = None
+
+    @property
+    def is_dice(self) -> bool:
+        return self.count > 0
+
+    def notation(self) -> str:
+        """Representação normalizada do termo (sem sinal)."""
+        if not self.is_dice:
+            text = str(self.value)
+        else:
+            text = f'{self.count}d{self.sides}'
+            if self.keep:
+                text += f'k{self.keep[0]}{self.keep[1]}'
+            if self.reroll_below:
+                text += f'r{self.reroll_below}'
+            if self.minimum:
+                text += f'mi{self.minimum}'
+        if self.damage_type:
+            text += f'[{self.damage_type}]'
+        return text
+
+
+class CompiledDice:
+    """Expressão de dados compilada, pronta a avaliar."""
+
+    __slots__ = ('expression', 'terms', 'damage_type')
+
+    def __init__(self, expression: str, terms: Tuple[DiceTerm, ...], damage_type: Optional[str] = None):
+        self.expression = expression
+        self.terms = terms
+        self.damage_type = damage_type  # Tipo por defeito (sufixo da expressão)
+
+    def __repr__(self):
+        return f'<CompiledDice {self.expression}>'
+
+    @property
+    def dice_terms(self) -> List[DiceTerm]:
+        return [t for t in self.terms if t.is_dice]
+
+    @property
+    def modifier(self) -> int:
+        """Soma das constantes da expressão."""
+        return sum(t.sign * t.value for t in self.terms if not t.is_dice)
+
+    @property
+    def primary_damage_type(self) -> Optional[str]:
+        """Tipo de dano principal: o do sufixo ou o do primeiro termo com tipo."""
+        if self.damage_type:
+            return self.damage_type
+        return next((t.damage_type for t in self.terms if t.damage_type), None)
+
+    def roll(self, crit: bool = False, default_type: Optional[str] = None, rng=None) -> Dict:
+        """
+        Avaliar a expressão.
+
+        Args:
+            crit: Critical hit (dobra o número de dados de cada termo)
+            default_type: Tipo de dano para termos sem tipo
+            rng: Gerador aleatório (por defeito, o módulo random)
+
+        Returns:
+            Dict com rolls, total_dice, modifier, total (nunca negativo),
+            crit, terms (detalhe por termo) e by_type (dano por tipo)
+        """
+        randint = (rng or random).randint
+        fallback_type = self.damage_type or default_type
+
+        all_rolls = []
+        term_results = []
+        by_type = {}
+        total_dice = 0
+        modifier = 0
+
+        previous_type = fallback_type
+        for term in self.terms:
+            if not term.is_dice:
+                # Constantes sem tipo pertencem ao termo anterior ("1d8[fogo]+3")
+                damage_type = term.damage_type or previous_type
+                subtotal = term.sign * term.value
+                modifier += subtotal
+                term_results.append({'expression': term.notation(), 'total': subtotal, 'damage_type': damage_type})
+            else:
+                damage_type = term.damage_type or fallback_type
+                count = term.count * 2 if crit else term.count
+                sides = term.sides
+                rolls = [randint(1, sides) for _ in range(count)]
+                if term.reroll_below:
+                    rolls = [r if r > term.reroll_below else randint(1, sides) for r in rolls]
+                if term.minimum:
+                    rolls = [r if r >= term.minimum else term.minimum for r in rolls]
+
+                dropped = []
+                if term.keep:
+                    mode, keep = term.keep
+                    keep = min(count, keep * 2 if crit else keep)
+                    ordered = sorted(rolls, reverse=(mode == 'h'))
+                    kept, dropped = ordered[:keep], ordered[keep:]
+                else:
+                    kept = rolls
+
+                subtotal = term.sign * sum(kept)
+                total_dice += subtotal
+                all_rolls.extend(kept)
+                term_results.append({
+                    'expression': term.notation(),
+                    'rolls': kept,
+                    'dropped': dropped,
+                    'total': subtotal,
+                    'damage_type': damage_type
+                })
+
+            previous_type = damage_type
+            key = damage_type or 'untyped'
+            by_type[key] = by_type.get(key, 0) + subtotal
+
+        return {
+            'expression': self.expression,
+            'rolls': all_rolls,
+            'total_dice': total_dice,
+            'modifier': modifier,
+            'total': max(0, total_dice + modifier),
+            'crit': crit,
+            'terms': term_results,
+            'by_type': {k: max(0, v) for k, v in by_type.items()}
+        }
+
+
+def _parse_term(match) -> DiceTerm:
+    """Construir um DiceTerm a partir de um match de _TERM_RE."""
+    sign = -1 if match.group('sign') == '-' else 1
+    damage_type = match.group('type').strip() if match.group('type') else None
+
+    if match.group('const') is not None:
+        return DiceTerm(sign=sign, count=0, sides=0, value=int(match.group('const')), damage_type=damage_type)
+
+    count = int(match.group('count')) if match.group('count') else 1
+    sides = 100 if match.group('sides') == '%' else int(match.group('sides'))
+    if not 1 <= count <= MAX_DICE:
+        raise DiceExpressionError(f'Número de dados inválido: {count}')
+    if not 1 <= sides <= MAX_SIDES:
+        raise DiceExpressionError(f'Número de lados inválido: {sides}')
+
+    keep = None
+    reroll_below = 0
+    minimum = 0
+    for mod, number in _MOD_RE.findall(match.group('mods') or ''):
+        number = int(number)
+        if mod in ('kh', 'k', 'kl'):
+            if not 1 <= number <= count:
+                raise DiceExpressionError(f'Não é possível manter {number} de {count} dados')
+            keep = ('l' if mod == 'kl' else 'h', number)
+        elif mod in ('r', 'r<='):
+            reroll_below = number
+        elif mod == 'r<':
+            reroll_below = number - 1
+        elif mod == 'mi':
+            minimum = number
+
+    if reroll_below >= sides:
+        raise DiceExpressionError('Reroll cobre todos os resultados do dado')
+    if minimum > sides:
+        raise DiceExpressionError(f'Mínimo {minimum} maior que o dado d{sides}')
+
+    return DiceTerm(
+        sign=sign, count=count, sides=sides, keep=keep,
+        reroll_below=max(0, reroll_below), minimum=minimum if minimum > 1 else 0,
+        damage_type=damage_type
+    )
+
+
+@lru_cache(maxsize=512)
+def compile_dice(expression: str) -> CompiledDice:
+    """
+    Compilar uma expressão de dados (com cache LRU).
+
+    Args:
+        expression: Expressão (ex: "2d6+1d4+3", "4d6kh3", "1d8+3 cortante")
+
+    Returns:
+        CompiledDice partilhado (imutável)
+
+    Raises:
+        DiceExpressionError: Se a expressão for inválida
+    """
+    text = (expression or '').strip().lower()
+
+    default_type = None
+    trailing = _TRAILING_TYPE_RE.match(text)
+    if trailing:
+        text = trailing.group('expr')
+        default_type = trailing.group('type').strip()
+        if default_type not in DAMAGE_TYPE_WORDS:
+            raise DiceExpressionError(f'Tipo de dano desconhecido: {default_type}')
+
+    text = text.replace(' ', '')
+    if not text:
+        raise DiceExpressionError('Expressão de dados vazia')
+
+    terms = []
+    pos = 0
+    while pos < len(text):
+        match = _TERM_RE.match(text, pos)
+        if not match or match.end() == pos or (terms and not match.group('sign')):
+            raise DiceExpressionError(f'Expressão de dados inválida: {expression}')
+        terms.append(_parse_term(match))
+        pos = match.end()
+
+    normalized = ''
+    for i, term in enumerate(terms):
+        if term.sign < 0:
+            normalized += '-'
+        elif i:
+            normalized += '+'
+        normalized += term.notation()
+    if default_type:
+        normalized += f' {default_type}'
+
+    return CompiledDice(normalized, tuple(terms), default_type)
+
+
+def roll_expression(expression: str, crit: bool = False, default_type: Optional[str] = None) -> Dict:
+    """Compilar (com cache) e avaliar uma expressão de dados."""
+    return compile_dice(expression).roll(crit=crit, default_type=default_type)
@@ -4,7 +4,10 @@ Serviço de Geração de Encontros
 Gera encontros balanceados usando o sistema de XP budgets do D&D 5ª Edição.
 """
 
+import bisect
 import random
+from functools import lru_cache, reduce
+from math import gcd
 from typing import List, Dict, Optional, Tuple
 
 
@@ -46,6 +49,56 @@ class EncounterGeneratorService:
         (15, 4.0)      # 15+ monstros
     ]
 
+    DIFFICULTIES = ['easy', 'medium', 'hard', 'deadly']
+    DIFFICULTY_BANDS = ['trivial', 'easy', 'medium', 'hard', 'deadly']
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _thresholds_for_levels(levels: Tuple[int, ...]) -> Tuple[int, int, int, int]:
+        """Somar os thresholds (easy, medium, hard, deadly) de um grupo numa só passagem."""
+        table = EncounterGeneratorService.XP_THRESHOLDS
+        easy = medium = hard = deadly = 0
+        for level in levels:
+            row = table[level]
+            easy += row['easy']
+            medium += row['medium']
+            hard += row['hard']
+            deadly += row['deadly']
+        return easy, medium, hard, deadly
+
+    def get_party_thresholds(self, party_levels: List[int]) -> Tuple[int, int, int, int]:
+        """
+        Obter os thresholds de XP do grupo, em cache por composição.
+
+        A chave é o tuplo ordenado dos níveis (limitados a 1-20), por isso
+        grupos com os mesmos níveis em ordem diferente partilham a entrada.
+
+        Returns:
+            Tuple (easy, medium, hard, deadly)
+        """
+        levels = tuple(sorted(max(1, min(20, level)) for level in party_levels))
+        return self._thresholds_for_levels(levels)
+
+    def classify(self, party_levels: List[int], adjusted_xp: int) -> Dict:
+        """
+        Obter os quatro thresholds do grupo e a dificuldade de um XP ajustado.
+
+        Args:
+            party_levels: Lista de níveis dos jogadores
+            adjusted_xp: XP ajustado do encontro
+
+        Returns:
+            Dicionário com 'thresholds' (easy/medium/hard/deadly) e 'difficulty'
+        """
+        if not party_levels:
+            return {'thresholds': dict.fromkeys(self.DIFFICULTIES, 0), 'difficulty': 'medium'}
+
+        thresholds = self.get_party_thresholds(party_levels)
+        return {
+            'thresholds': dict(zip(self.DIFFICULTIES, thresholds)),
+            'difficulty': self.DIFFICULTY_BANDS[bisect.bisect_right(thresholds, adjusted_xp)]
+        }
+
     def calculate_xp_budget(self, party_levels: List[int], difficulty: str) -> int:
         """
         Calcula o XP budget para o encontro baseado nos níveis do grupo.
@@ -60,16 +113,10 @@ class EncounterGeneratorService:
         if not party_levels:
             return 0
 
-        if difficulty not in ['easy', 'medium', 'hard', 'deadly']:
+        if difficulty not in self.DIFFICULTIES:
             difficulty = 'medium'
 
-        total_xp = 0
-        for level in party_levels:
-            # Limitar nível entre 1 e 20
-            level = max(1, min(20, level))
-            total_xp += self.XP_THRESHOLDS[level][difficulty]
-
-        return total_xp
+        return self.get_party_thresholds(party_levels)[self.DIFFICULTIES.index(difficulty)]
 
     def get_encounter_multiplier(self, num_monsters: int) -> float:
         """
@@ -92,12 +139,26 @@ class EncounterGeneratorService:
         # Se for 15+ monstros
         return 4.0
 
+    def _monster_entry(self, monster: Dict, quantity: int) -> Dict:
+        """Construir a entrada de um monstro selecionado para o encontro."""
+        return {
+            'id': monster['id'],
+            'nome': monster['nome'],
+            'xp': monster['xp'],
+            'cr': monster.get('cr', '0'),
+            'tipo': monster.get('tipo', 'Desconhecido'),
+            'ac': monster.get('ac', 10),
+            'hp_max': monster.get('hp_max', 10),
+            'quantity': quantity
+        }
+
     def _select_monsters(
         self,
         monster_pool: List[Dict],
         budget: int,
         max_monsters: int = 10,
-        min_monsters: int = 1
+        min_monsters: int = 1,
+        rng: Optional[random.Random] = None
     ) -> List[Dict]:
         """
         Seleciona monstros do pool usando algoritmo greedy randomizado.
@@ -107,6 +168,7 @@ class EncounterGeneratorService:
             budget: XP budget para o encontro
             max_monsters: Número máximo de monstros
             min_monsters: Número mínimo de monstros
+            rng: Gerador a usar (por defeito, o random global)
 
         Returns:
             Lista de monstros selecionados com quantidades
@@ -147,7 +209,7 @@ class EncounterGeneratorService:
                 break
 
             # Escolher aleatoriamente entre os candidatos
-            chosen = random.choice(candidates)
+            chosen = (rng or random).choice(candidates)
 
             # Verificar se já existe na lista
             existing = next((m for m in selected if m['id'] == chosen['id']), None)
@@ -155,16 +217,7 @@ class EncounterGeneratorService:
                 existing['quantity'] += 1
                 remaining_slots -= 1
             elif remaining_slots > 0:
-                selected.append({
-                    'id': chosen['id'],
-                    'nome': chosen['nome'],
-                    'xp': chosen['xp'],
-                    'cr': chosen.get('cr', '0'),
-                    'tipo': chosen.get('tipo', 'Desconhecido'),
-                    'ac': chosen.get('ac', 10),
-                    'hp_max': chosen.get('hp_max', 10),
-                    'quantity': 1
-                })
+                selected.append(self._monster_entry(chosen, 1))
                 remaining_slots -= 1
 
             # Recalcular budget restante
@@ -185,26 +238,148 @@ class EncounterGeneratorService:
             if existing:
                 existing['quantity'] += needed
             else:
-                selected.append({
-                    'id': cheapest['id'],
-                    'nome': cheapest['nome'],
-                    'xp': cheapest['xp'],
-                    'cr': cheapest.get('cr', '0'),
-                    'tipo': cheapest.get('tipo', 'Desconhecido'),
-                    'ac': cheapest.get('ac', 10),
-                    'hp_max': cheapest.get('hp_max', 10),
-                    'quantity': needed
-                })
+                selected.append(self._monster_entry(cheapest, needed))
 
         return selected
 
+    def solve_encounters(
+        self,
+        monster_pool: List[Dict],
+        budget: int,
+        max_monsters: int = 10,
+        min_monsters: int = 1,
+        top_k: int = 5,
+        seed: Optional[int] = None
+    ) -> List[List[Dict]]:
+        """
+        Solver exato: encontra as composições cujo XP ajustado fica mais perto do budget.
+
+        Programação dinâmica sobre (número de monstros, XP bruto): para cada
+        contagem c guarda-se o conjunto de somas de XP atingíveis como um
+        bitset (int), agrupando monstros pelo valor de XP. O custo depende do
+        número de valores de XP distintos, não do tamanho do pool.
+
+        Args:
+            monster_pool: Lista de monstros disponíveis
+            budget: XP budget para o encontro
+            max_monsters: Número máximo de monstros
+            min_monsters: Número mínimo de monstros
+            top_k: Número de encontros a devolver
+            seed: Semente para o desempate aleatório (None = aleatório)
+
+        Returns:
+            Lista (até top_k) de encontros, do mais próximo para o mais afastado
+            do budget; cada encontro tem o formato de _select_monsters()
+        """
+        if not monster_pool or budget <= 0 or max_monsters <= 0:
+            return []
+
+        rng = random.Random(seed)
+
+        # Mesmo filtro do algoritmo greedy: nada acima de 50% do budget
+        affordable = [m for m in monster_pool if 0 < m.get('xp', 0) <= budget * 0.5]
+        if not affordable:
+            cheapest = min(monster_pool, key=lambda m: m.get('xp', 0))
+            affordable = [cheapest] if cheapest.get('xp', 0) > 0 else []
+        if not affordable:
+            return []
+
+        by_xp = {}
+        for monster in affordable:
+            by_xp.setdefault(monster['xp'], []).append(monster)
+
+        # Trabalhar em unidades do máximo divisor comum para encolher os bitsets
+        unit = reduce(gcd, by_xp)
+        values = sorted(xp // unit for xp in by_xp)
+        max_monsters = max(max_monsters, min_monsters)
+        multipliers = [self.get_encounter_multiplier(c) for c in range(max_monsters + 1)]
+
+        # Limite de XP bruto por contagem (margem de 20%, como no greedy). Como o
+        # multiplicador não decresce com c, prefixos de uma solução válida
+        # respeitam sempre o limite das contagens anteriores.
+        limits = [int(budget * 1.2 / (multipliers[c] * unit)) for c in range(max_monsters + 1)]
+
+        reachable = [1]  # reachable[c]: bit s ligado se soma s atingível com c monstros
+        for c in range(1, max_monsters + 1):
+            previous = reachable[-1]
+            mask = (1 << (limits[c] + 1)) - 1
+            current = 0
+            for value in values:
+                current |= previous << value
+            current &= mask
+            reachable.append(current)
+            if not current:
+                break
+
+        # Candidatos (contagem, soma): para cada contagem só interessam as top_k
+        # somas atingíveis mais próximas do alvo, abaixo e acima dele
+        candidates = []
+        for c in range(max(1, min_monsters), len(reachable)):
+            target = int(budget / (multipliers[c] * unit))
+            for total in self._nearest_bits(reachable[c], target, top_k):
+                adjusted = total * unit * multipliers[c]
+                candidates.append((abs(adjusted - budget), rng.random(), c, total))
+        candidates.sort()
+
+        encounters = []
+        for _, _, count, total in candidates[:top_k]:
+            xp_counts = self._reconstruct_composition(reachable, values, count, total, rng)
+            selected = []
+            for value, quantity in xp_counts.items():
+                monster = rng.choice(by_xp[value * unit])
+                selected.append(self._monster_entry(monster, quantity))
+            selected.sort(key=lambda m: (-m['xp'], m['id']))
+            encounters.append(selected)
+
+        return encounters
+
+    @staticmethod
+    def _nearest_bits(bits: int, target: int, k: int) -> List[int]:
+        """Obter até k bits ligados <= target e até k bits ligados > target."""
+        found = []
+        below = bits & ((1 << (target + 1)) - 1)
+        while below and len(found) < k:
+            position = below.bit_length() - 1
+            found.append(position)
+            below ^= 1 << position
+
+        above = bits >> (target + 1)
+        offset = target + 1
+        for _ in range(k):
+            if not above:
+                break
+            step = (above & -above).bit_length() - 1
+            found.append(offset + step)
+            above >>= step + 1
+            offset += step + 1
+        return found
+
+    @staticmethod
+    def _reconstruct_composition(
+        reachable: List[int],
+        values: List[int],
+        count: int,
+        total: int,
+        rng: random.Random
+    ) -> Dict[int, int]:
+        """Recuperar uma composição {valor_xp: quantidade} a partir dos bitsets da DP."""
+        composition = {}
+        for c in range(count, 0, -1):
+            options = [v for v in values if v <= total and (reachable[c - 1] >> (total - v)) & 1]
+            value = rng.choice(options)
+            composition[value] = composition.get(value, 0) + 1
+            total -= value
+        return composition
+
     def generate_encounter(
         self,
         party_levels: List[int],
         difficulty: str,
         monster_pool: List[Dict],
         max_monsters: int = 10,
-        min_monsters: int = 1
+        min_monsters: int = 1,
+        mode: str = 'greedy',
+        seed: Optional[int] = None
     ) -> Dict:
         """
         Gera um encontro balanceado.
@@ -215,6 +390,8 @@ class EncounterGeneratorService:
             monster_pool: Pool de monstros disponíveis
             max_monsters: Número máximo de monstros
             min_monsters: Número mínimo de monstros
+            mode: 'greedy' (aleatório) ou 'exact' (solver exato)
+            seed: Semente para o desempate do solver exato
 
         Returns:
             Dicionário com informações do encontro gerado:
@@ -229,17 +406,36 @@ class EncounterGeneratorService:
                 'multiplier': float,
                 'num_monsters': int
             }
+
+        Raises:
+            ValueError: No modo 'exact', se nenhuma composição com pelo menos
+                min_monsters monstros cabe no budget
         """
         # Calcular budget
         xp_budget = self.calculate_xp_budget(party_levels, difficulty)
 
         # Selecionar monstros
-        selected_monsters = self._select_monsters(
-            monster_pool,
-            xp_budget,
-            max_monsters,
-            min_monsters
-        )
+        if mode == 'exact':
+            solutions = self.solve_encounters(
+                monster_pool,
+                xp_budget,
+                max_monsters,
+                min_monsters,
+                top_k=1,
+                seed=seed
+            )
+            if not solutions:
+                raise ValueError(
+                    f'Nenhuma combinação com pelo menos {min_monsters} monstro(s) cabe no XP budget'
+                )
+            selected_monsters = solutions[0]
+        else:
+            selected_monsters = self._select_monsters(
+                monster_pool,
+                xp_budget,
+                max_monsters,
+                min_monsters
+            )
 
         # Calcular XP total e ajustado
         total_xp = sum(m['xp'] * m['quantity'] for m in selected_monsters)
@@ -259,6 +455,94 @@ class EncounterGeneratorService:
             'num_monsters': num_monsters
         }
 
+    def generate_encounters_batch(
+        self,
+        party_levels: List[int],
+        difficulty: str,
+        monster_pool: List[Dict],
+        count: int = 20,
+        max_monsters: int = 10,
+        min_monsters: int = 1,
+        seed: Optional[int] = None
+    ) -> Dict:
+        """
+        Gera vários encontros candidatos para o mesmo grupo numa só chamada.
+
+        Junta as melhores soluções do solver exato com execuções do greedy,
+        remove composições repetidas e ordena pela distância ao budget. O
+        budget, os thresholds e a tabela de multiplicadores são calculados
+        uma única vez; cada candidato custa apenas somas e um bisect.
+
+        Args:
+            party_levels: Lista de níveis dos jogadores
+            difficulty: Dificuldade ('easy', 'medium', 'hard', 'deadly')
+            monster_pool: Pool de monstros disponíveis
+            count: Número de encontros pretendidos
+            max_monsters: Número máximo de monstros
+            min_monsters: Número mínimo de monstros
+            seed: Semente para resultados reprodutíveis
+
+        Returns:
+            Dicionário com o budget e a lista 'encounters', cada um com o
+            formato de generate_encounter() mais 'actual_difficulty'
+        """
+        xp_budget = self.calculate_xp_budget(party_levels, difficulty)
+        thresholds = self.get_party_thresholds(party_levels)
+        max_count = max(max_monsters, min_monsters)
+        multipliers = [self.get_encounter_multiplier(c) for c in range(max_count * 2 + 1)]
+
+        candidates = self.solve_encounters(
+            monster_pool, xp_budget, max_monsters, min_monsters, top_k=count, seed=seed
+        )
+
+        # Gerador próprio: semear o random global afetaria os outros pedidos
+        rng = random.Random(seed)
+        for _ in range(count):
+            candidates.append(self._select_monsters(monster_pool, xp_budget, max_monsters, min_monsters, rng=rng))
+
+        scored = {}
+        for selected in candidates:
+            if not selected:
+                continue
+            signature = tuple(sorted((m['id'], m['quantity']) for m in selected))
+            if signature in scored:
+                continue
+
+            total_xp = 0
+            num_monsters = 0
+            for m in selected:
+                total_xp += m['xp'] * m['quantity']
+                num_monsters += m['quantity']
+            multiplier = (multipliers[num_monsters] if num_monsters < len(multipliers)
+                          else self.get_encounter_multiplier(num_monsters))
+            adjusted_xp = int(total_xp * multiplier)
+
+            scored[signature] = {
+                'difficulty': difficulty,
+                'party_size': len(party_levels),
+                'party_levels': party_levels,
+                'xp_budget': xp_budget,
+                'monsters': selected,
+                'total_xp': total_xp,
+                'adjusted_xp': adjusted_xp,
+                'multiplier': multiplier,
+                'num_monsters': num_monsters,
+                'actual_difficulty': self.DIFFICULTY_BANDS[bisect.bisect_right(thresholds, adjusted_xp)]
+            }
+
+        encounters = sorted(
+            scored.values(),
+            key=lambda e: (abs(e['adjusted_xp'] - xp_budget), e['num_monsters'])
+        )[:count]
+
+        return {
+            'difficulty': difficulty,
+            'party_size': len(party_levels),
+            'party_levels': party_levels,
+            'xp_budget': xp_budget,
+            'encounters': encounters
+        }
+
     def get_difficulty_from_xp(
         self,
         party_levels: List[int],
@@ -274,24 +558,4 @@ class EncounterGeneratorService:
         Returns:
             Dificuldade estimada ('trivial', 'easy', 'medium', 'hard', 'deadly')
         """
-        if not party_levels:
-            return 'medium'
-
-        # Calcular thresholds para o grupo
-        thresholds = {
-            'easy': self.calculate_xp_budget(party_levels, 'easy'),
-            'medium': self.calculate_xp_budget(party_levels, 'medium'),
-            'hard': self.calculate_xp_budget(party_levels, 'hard'),
-            'deadly': self.calculate_xp_budget(party_levels, 'deadly')
-        }
-
-        if adjusted_xp < thresholds['easy']:
-            return 'trivial'
-        elif adjusted_xp < thresholds['medium']:
-            return 'easy'
-        elif adjusted_xp < thresholds['hard']:
-            return 'medium'
-        elif adjusted_xp < thresholds['deadly']:
-            return 'hard'
-        else:
-            return 'deadly'
+        return self.classify(party_levels, adjusted_xp)['difficulty']
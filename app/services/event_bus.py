@@ -0,0 +1,198 @@
+"""
+Bus de Eventos da Sessão (pub/sub em processo)
+
+Em vez de cada página fazer polling (log de combate, posições do mapa,
+estado do tempo), as rotas publicam pequenos eventos tipados por sessão e
+os clientes recebem-nos por Server-Sent Events (/sessao/<id>/eventos).
+
+Tipos de evento:
+- 'log': nova entrada no log de combate (CombatLog.to_dict)
+- 'participant': participantes/turno alterados (mesmo formato do PATCH de
+  estado: versao, participants com os campos alterados, ronda, turno, order;
+  ou a lista completa com replace=True quando o combate foi substituído)
+- 'entity': entidade do mapa movida/alterada/removida (com step_id; ou
+  recarregar=True quando as posicoes do passo foram reinicializadas)
+- 'time': estado completo dos sistemas de tempo
+- 'reset': o cliente perdeu eventos e deve recarregar tudo
+
+Cada sessão guarda os últimos BUFFER_SIZE eventos para o cliente retomar a
+partir do Last-Event-ID depois de uma desconexão. Os IDs incluem um
+identificador do arranque do processo: um ID de outro arranque (ou já fora
+do buffer) resulta num 'reset'.
+
+O bus vive na memória do processo: com vários processos, cada cliente só
+recebe os eventos publicados pelo processo em que está ligado.
+"""
+
+import queue
+import threading
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+
+
+@dataclass
+class SessionEvent:
+    """Evento publicado para uma sessão."""
+    id: str
+    type: str
+    data: Dict
+
+
+class Subscription:
+    """Fila de eventos de um cliente ligado a uma sessão."""
+
+    def __init__(self, bus: 'SessionEventBus', session_id: int):
+        self.bus = bus
+        self.session_id = session_id
+        self.queue: 'queue.Queue[SessionEvent]' = queue.Queue()
+
+    def get(self, timeout: float) -> Optional[SessionEvent]:
+        """Próximo evento, ou None se nada chegar dentro de timeout segundos."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class SessionEventBus:
+    """Pub/sub por sessão com buffer para retomar a partir do Last-Event-ID."""
+
+    BUFFER_SIZE = 256
+
+    def __init__(self, buffer_size: int = BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.boot = uuid.uuid4().hex[:8]
+        self.lock = threading.Lock()
+        self._seq = 0
+        self._buffers: Dict[int, deque] = {}
+        self._evicted: Dict[int, int] = {}  # Sequência do último evento que saiu do buffer
+        self._subscribers: Dict[int, List[Subscription]] = {}
+
+    def _parse_id(self, event_id: Optional[str]) -> Optional[int]:
+        """Número de sequência de um ID deste arranque (None se for de outro)."""
+        if not event_id:
+            return None
+        boot, _, seq = str(event_id).partition('-')
+        if boot != self.boot or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def last_event_id(self) -> str:
+        """ID do último evento publicado (para uma página retomar a partir dele)."""
+        with self.lock:
+            return f'{self.boot}-{self._seq}'
+
+    def publish(self, session_id: int, event_type: str, data: Dict) -> str:
+        """
+        Publicar um evento para todos os clientes da sessão.
+
+        Returns:
+            ID do evento
+        """
+        with self.lock:
+            self._seq += 1
+            evt = SessionEvent(id=f'{self.boot}-{self._seq}', type=event_type, data=data)
+            buffer = self._buffers.setdefault(session_id, deque(maxlen=self.buffer_size))
+            if len(buffer) == buffer.maxlen:
+                self._evicted[session_id] = self._parse_id(buffer[0].id)
+            buffer.append(evt)
+            subscribers = list(self._subscribers.get(session_id, ()))
+        for subscription in subscribers:
+            subscription.queue.put(evt)
+        return evt.id
+
+    def subscribe(self, session_id: int, last_event_id: Optional[str] = None) -> Subscription:
+        """
+        Ligar um cliente à sessão.
+
+        Args:
+            session_id: ID da sessão
+            last_event_id: Último evento recebido pelo cliente; os eventos
+                seguintes ainda no buffer são reenviados. Se já não for
+                possível retomar, o primeiro evento é um 'reset'.
+        """
+        subscription = Subscription(self, session_id)
+        with self.lock:
+            self._subscribers.setdefault(session_id, []).append(subscription)
+            if last_event_id:
+                seq = self._parse_id(last_event_id)
+                if seq is None or seq > self._seq or seq < self._evicted.get(session_id, 0):
+                    subscription.queue.put(SessionEvent(id=f'{self.boot}-{self._seq}', type='reset', data={}))
+                else:
+                    for evt in self._buffers.get(session_id, ()):
+                        if self._parse_id(evt.id) > seq:
+                            subscription.queue.put(evt)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self.lock:
+            subscribers = self._subscribers.get(subscription.session_id, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.session_id, None)
+
+
+def get_event_bus() -> SessionEventBus:
+    """Obter o SessionEventBus partilhado pela aplicação Flask atual."""
+    bus = current_app.extensions.get('session_event_bus')
+    if bus is None:
+        bus = current_app.extensions.setdefault('session_event_bus', SessionEventBus(
+            buffer_size=current_app.config.get('SSE_BUFFER_SIZE', SessionEventBus.BUFFER_SIZE)
+        ))
+    return bus
+
+
+def publish_event(session_id: int, event_type: str, data: Dict) -> Optional[str]:
+    """Publicar no bus da aplicação atual (sem efeito fora de um app context)."""
+    if not has_app_context():
+        return None
+    return get_event_bus().publish(session_id, event_type, data)
+
+
+def publish_combat_state(combat):
+    """Publicar o estado completo de um combate (depois de ser substituido/reconstruido)."""
+    return publish_event(combat.session_id, 'participant', {
+        'versao': combat.versao,
+        'participants': combat.get_participantes() if combat.activo else [],
+        'ronda': combat.ronda_atual,
+        'turno': combat.turno_atual,
+        'replace': True
+    })
+
+
+# --- Entradas do log de combate ---
+# As entradas são publicadas só depois do commit (nunca as de uma transação
+# revertida), seja qual for o caminho que as escreveu (rotas, patches,
+# escrita periódica do CombatStateStore).
+
+_PENDING_LOGS = 'session_event_bus_logs'
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_combat_logs(session, flush_context):
+    from app.models.combat_log import CombatLog
+    hidden = CombatLog.STATE_EVENT_TYPES + CombatLog.HISTORY_EVENT_TYPES
+    for obj in session.new:
+        if isinstance(obj, CombatLog) and obj.action_type not in hidden:
+            session.info.setdefault(_PENDING_LOGS, []).append((obj.session_id, obj.to_dict()))
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_combat_logs(session):
+    pending = session.info.pop(_PENDING_LOGS, None)
+    for session_id, log in pending or ():
+        publish_event(session_id, 'log', log)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_combat_logs(session):
+    session.info.pop(_PENDING_LOGS, None)
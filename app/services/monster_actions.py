@@ -0,0 +1,194 @@
+"""
+Compilador de Ações de Monstros
+
+Converte o texto das `acoes` de um monstro ("Ataque corpo a corpo com arma:
++5 para acertar, alcance 1,5m, um alvo. Acerto: 7 (1d8+3) de dano cortante
+mais 3 (1d6) de dano necrótico.") em perfis de ataque estruturados.
+
+É chamado uma vez por monstro quando a aventura é carregada; depois disso,
+resolver um ataque é uma consulta ao perfil em vez de parsing de texto.
+"""
+
+import copy
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+
+# Tipos de dano em português -> identificador usado no combate
+DAMAGE_TYPES = {
+    'perfurante': 'piercing',
+    'cortante': 'slashing',
+    'contundente': 'bludgeoning',
+    'fogo': 'fire',
+    'gelo': 'cold',
+    'frio': 'cold',
+    'elétrico': 'lightning',
+    'relâmpago': 'lightning',
+    'ácido': 'acid',
+    'veneno': 'poison',
+    'psíquico': 'psychic',
+    'necrótico': 'necrotic',
+    'radiante': 'radiant',
+    'trovão': 'thunder',
+    'energia': 'force'
+}
+
+ABILITIES = {
+    'força': 'forca',
+    'destreza': 'destreza',
+    'constituição': 'constituicao',
+    'inteligência': 'inteligencia',
+    'sabedoria': 'sabedoria',
+    'carisma': 'carisma'
+}
+
+_ATTACK_RE = re.compile(r'\+(\d+)\s+para acertar', re.IGNORECASE)
+_KIND_RE = re.compile(r'Ataque\s+(corpo a corpo ou à distância|corpo a corpo|à distância)', re.IGNORECASE)
+_REACH_RE = re.compile(r'alcance\s+([\d,./]+\s*m)(?:\s+ou\s+([\d,./]+\s*m))?', re.IGNORECASE)
+_DAMAGE_RE = re.compile(
+    r'(?:\d+\s*)?\(\s*(\d+d\d+(?:\s*[+-]\s*\d+)?)\s*\)\s*de\s+dano\s+(?:de\s+)?(\w+)',
+    re.IGNORECASE
+)
+_LOOSE_DICE_RE = re.compile(r'(\d+d\d+[+-]?\d*)')
+_SAVE_RE = re.compile(
+    r'(?:teste|salvaguarda)(?:\s+de\s+resistência)?\s+de\s+(\w+)\s+CD\s+(\d+)',
+    re.IGNORECASE
+)
+_HALF_RE = re.compile(r'metade do dano', re.IGNORECASE)
+
+
+def _damage_type(word: str) -> str:
+    """Converter um tipo de dano em português (ou inglês) para o identificador interno."""
+    word = word.lower()
+    return DAMAGE_TYPES.get(word, word if word in DAMAGE_TYPES.values() else 'slashing')
+
+
+def compile_action_text(text: str) -> Dict:
+    """
+    Compilar o texto de uma ação num perfil (com cache por texto).
+
+    Returns:
+        Dict com tipo ('ataque', 'salvaguarda' ou 'outro'), bonus,
+        damage_expression (notação do dice_engine, com tipos por termo),
+        damage_type (principal), damage (lista de componentes), alcance,
+        distancia, save_dc, save_ability e save_half. É uma cópia: quem
+        chama pode alterá-lo sem afetar a cache
+    """
+    return copy.deepcopy(_compile_action_text(text))
+
+
+@lru_cache(maxsize=1024)
+def _compile_action_text(text: str) -> Dict:
+    """Perfil partilhado pela cache (não alterar; usar compile_action_text)."""
+    profile = {
+        'tipo': 'outro',
+        'bonus': None,
+        'melee': False,
+        'ranged': False,
+        'alcance': None,
+        'distancia': None,
+        'damage': [],
+        'damage_expression': None,
+        'damage_type': None,
+        'save_dc': None,
+        'save_ability': None,
+        'save_half': False
+    }
+    if not text:
+        return profile
+
+    attack = _ATTACK_RE.search(text)
+    if attack:
+        profile['tipo'] = 'ataque'
+        profile['bonus'] = int(attack.group(1))
+
+        kind = _KIND_RE.search(text)
+        kind_text = kind.group(1).lower() if kind else ''
+        profile['melee'] = 'corpo a corpo' in kind_text
+        profile['ranged'] = 'distância' in kind_text
+
+        reach = _REACH_RE.search(text)
+        if reach:
+            first, second = reach.group(1).strip(), reach.group(2)
+            if profile['ranged'] and not profile['melee']:
+                profile['distancia'] = first
+            else:
+                profile['alcance'] = first
+                if second:
+                    profile['distancia'] = second.strip()
+
+    # Componentes de dano: "7 (1d8+3) de dano cortante mais 3 (1d6) de dano necrótico"
+    for expression, type_word in _DAMAGE_RE.findall(text):
+        profile['damage'].append({
+            'expression': expression.replace(' ', ''),
+            'damage_type': _damage_type(type_word)
+        })
+
+    if not profile['damage'] and attack:
+        loose = _LOOSE_DICE_RE.search(text)
+        if loose:
+            profile['damage'].append({'expression': loose.group(1), 'damage_type': 'slashing'})
+
+    save = _SAVE_RE.search(text)
+    if save:
+        profile['save_ability'] = ABILITIES.get(save.group(1).lower(), save.group(1).lower())
+        profile['save_dc'] = int(save.group(2))
+        profile['save_half'] = bool(_HALF_RE.search(text))
+        if profile['tipo'] == 'outro':
+            profile['tipo'] = 'salvaguarda'
+
+    if profile['damage']:
+        # Numa salvaguarda agregada a um ataque (ex: veneno), o dano base é o do acerto
+        components = profile['damage']
+        if attack and save and len(components) > 1:
+            components = components[:1]
+        profile['damage_expression'] = '+'.join(
+            _tag_expression(c['expression'], c['damage_type']) for c in components
+        )
+        profile['damage_type'] = components[0]['damage_type']
+
+    return profile
+
+
+def _tag_expression(expression: str, damage_type: str) -> str:
+    """Marcar o grupo de dados com o tipo de dano: "1d8+3" -> "1d8[slashing]+3"."""
+    match = re.match(r'(\d+d\d+)(.*)', expression)
+    if not match:
+        return expression
+    return f'{match.group(1)}[{damage_type}]{match.group(2)}'
+
+
+def compile_monster_actions(acoes: List[Dict]) -> List[Dict]:
+    """
+    Compilar todas as ações de um monstro em perfis.
+
+    Args:
+        acoes: Lista de {'nome', 'descricao'} do JSON da aventura
+
+    Returns:
+        Lista de perfis (um por ação, pela mesma ordem), cada um com 'nome'
+    """
+    profiles = []
+    for acao in acoes or []:
+        profile = compile_action_text(acao.get('descricao', ''))
+        profile['nome'] = acao.get('nome', '')
+        profiles.append(profile)
+    return profiles
+
+
+def attack_profiles(profiles: List[Dict]) -> List[Dict]:
+    """Filtrar só os perfis de ataque com dano (os que podem ser rolados)."""
+    return [p for p in profiles if p['tipo'] == 'ataque' and p['damage_expression']]
+
+
+def legacy_attack(profile: Optional[Dict]) -> Optional[Dict]:
+    """Converter um perfil para o formato de parse_attack_from_monster_action."""
+    if profile is None:
+        return None
+    first = profile['damage'][0] if profile['damage'] else {'expression': '1d6', 'damage_type': 'slashing'}
+    return {
+        'bonus': profile['bonus'] or 0,
+        'damage_expression': first['expression'],
+        'damage_type': first['damage_type']
+    }
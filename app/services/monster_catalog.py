@@ -0,0 +1,141 @@
+"""
+Catálogo Global de Monstros
+
+Índice de todos os monstros das aventuras instaladas, partilhado pelo
+gerador de encontros. É mantido por aventura: só as aventuras cujo hash
+de conteúdo mudou no manifesto são recarregadas.
+"""
+
+import bisect
+import threading
+from typing import Dict, List, Optional
+from flask import current_app
+from app.services.quest_loader import get_quest_loader
+
+
+class MonsterCatalog:
+    """Índice de monstros por id, CR, tipo e XP."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._quest_hashes = {}  # quest_id -> content_hash
+        self._quest_pools = {}  # quest_id -> [dict do monstro]
+        self._by_id = {}  # monster_id -> dict do monstro
+        self._by_cr = {}  # cr -> [monster_id]
+        self._by_type = {}  # tipo -> [monster_id]
+        self._xp_values = []  # XP ordenado (para bisect)
+        self._xp_monsters = []  # Monstros na mesma ordem de _xp_values
+
+    def refresh(self) -> bool:
+        """Sincronizar o catálogo com o manifesto de aventuras.
+
+        Só as aventuras novas ou com hash diferente são carregadas.
+
+        Returns:
+            True se o catálogo mudou
+        """
+        loader = get_quest_loader()
+        summaries = loader.get_quest_summaries()
+        current = {s.id: s.content_hash for s in summaries}
+
+        with self._lock:
+            changed_ids = [qid for qid, h in current.items() if self._quest_hashes.get(qid) != h]
+            removed_ids = [qid for qid in self._quest_hashes if qid not in current]
+        if not changed_ids and not removed_ids:
+            return False
+
+        pools = {}
+        for quest_id in changed_ids:
+            quest = loader.get_quest(quest_id)
+            pools[quest_id] = [dict(m.__dict__) for m in quest.monstros.values()] if quest else []
+
+        with self._lock:
+            for quest_id in removed_ids:
+                self._quest_hashes.pop(quest_id, None)
+                self._quest_pools.pop(quest_id, None)
+            for quest_id in changed_ids:
+                self._quest_hashes[quest_id] = current[quest_id]
+                self._quest_pools[quest_id] = pools[quest_id]
+            self._rebuild_indexes([s.id for s in summaries])
+        return True
+
+    def _rebuild_indexes(self, quest_order: List[str]):
+        """Reconstruir índices a partir dos pools por aventura (lock já adquirido)."""
+        # Evitar duplicados: a primeira aventura (ordem do manifesto) define o monstro
+        self._by_id = {}
+        for quest_id in quest_order:
+            for monster in self._quest_pools.get(quest_id, []):
+                self._by_id.setdefault(monster['id'], monster)
+
+        self._by_cr = {}
+        self._by_type = {}
+        for monster_id, monster in self._by_id.items():
+            self._by_cr.setdefault(str(monster.get('cr', '0')), []).append(monster_id)
+            self._by_type.setdefault(monster.get('tipo', 'Desconhecido'), []).append(monster_id)
+
+        ordered = sorted(self._by_id.values(), key=lambda m: (m.get('xp', 0), m['id']))
+        self._xp_monsters = ordered
+        self._xp_values = [m.get('xp', 0) for m in ordered]
+
+    def get(self, monster_id: str) -> Optional[Dict]:
+        """Obter um monstro pelo ID."""
+        self.refresh()
+        return self._by_id.get(monster_id)
+
+    def get_pool(self, quest_id: Optional[str] = None) -> List[Dict]:
+        """
+        Obter pool de monstros para o gerador de encontros.
+
+        Args:
+            quest_id: Aventura específica, ou None/'all' para todas
+
+        Returns:
+            Lista de dicts de monstros (partilhados, não alterar)
+        """
+        self.refresh()
+        with self._lock:
+            if quest_id and quest_id != 'all':
+                return list(self._quest_pools.get(quest_id, []))
+            return list(self._xp_monsters)
+
+    def by_cr(self, cr: str) -> List[Dict]:
+        """Obter monstros com um CR específico (ex: '1/4', '2')."""
+        self.refresh()
+        with self._lock:
+            return [self._by_id[m_id] for m_id in self._by_cr.get(str(cr), [])]
+
+    def by_type(self, tipo: str) -> List[Dict]:
+        """Obter monstros de um tipo (ex: 'Morto-vivo')."""
+        self.refresh()
+        with self._lock:
+            return [self._by_id[m_id] for m_id in self._by_type.get(tipo, [])]
+
+    def in_xp_range(self, min_xp: int = 0, max_xp: Optional[float] = None) -> List[Dict]:
+        """
+        Obter monstros com min_xp <= xp <= max_xp, ordenados por XP.
+
+        Ex: in_xp_range(max_xp=budget * 0.5) para monstros "acessíveis".
+        """
+        self.refresh()
+        with self._lock:
+            start = bisect.bisect_left(self._xp_values, min_xp)
+            end = len(self._xp_values) if max_xp is None else bisect.bisect_right(self._xp_values, max_xp)
+            return self._xp_monsters[start:end]
+
+    def stats(self) -> Dict:
+        """Obter contagens do catálogo."""
+        with self._lock:
+            return {
+                'quests': len(self._quest_hashes),
+                'monsters': len(self._by_id),
+                'crs': len(self._by_cr),
+                'types': len(self._by_type)
+            }
+
+
+def get_monster_catalog() -> MonsterCatalog:
+    """Obter o MonsterCatalog partilhado pela aplicação Flask atual."""
+    catalog = current_app.extensions.get('monster_catalog')
+    if catalog is None:
+        catalog = current_app.extensions.setdefault('monster_catalog', MonsterCatalog())
+    return catalog
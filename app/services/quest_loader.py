@@ -1,22 +1,77 @@
 """Serviço para carregar e gerir aventuras a partir de ficheiros JSON."""
 
+import hashlib
 import json
+import mmap
 import os
+import pickle
+import tempfile
+import threading
 from flask import current_app
-from app.models.quest import Quest, QuestStep, NPC
+from app.models.quest import Quest, QuestStep, QuestSummary, NPC
 from app.models.character import Monster
+from app.services.monster_actions import compile_monster_actions
 
 
 class QuestLoader:
-    """Carrega aventuras a partir de ficheiros JSON."""
+    """Carrega aventuras a partir de ficheiros JSON.
+
+    A cache é partilhada por toda a aplicação (ver get_quest_loader) e cada
+    entrada guarda o mtime e tamanho do ficheiro de origem, para que só o
+    ficheiro alterado seja relido.
+
+    Existem dois níveis persistidos em disco:
+    - manifesto JSON (QUESTS_MANIFEST) com o resumo de cada aventura;
+    - cache compilada (QUESTS_CACHE_FILE, em instance/) com as Quests já
+      construídas, validadas pelo hash do ficheiro de origem.
+
+    Uma aventura lida em get_quest() fica só em memória e marca as caches
+    como alteradas; os ficheiros alterados são reescritos (temporário +
+    rename, sob um lock próprio) uma vez por lote, no fim de
+    get_quest_summaries() (chamado pelas páginas de listagem),
+    get_all_quests() e compile_quests().
+    """
+
+    MANIFEST_VERSION = 1
+
+    # Incrementar sempre que os dataclasses de Quest/Monster mudarem
+    CACHE_SCHEMA_VERSION = 3
+    CACHE_MAGIC = b'DNDQUEST'
 
     def __init__(self):
-        self._quests_cache = {}
+        self._quests_cache = {}  # filepath -> (mtime_ns, tamanho, Quest)
+        self._manifest = None  # filename -> entrada do manifesto (dict)
+        self._compiled = None  # filename -> (content_hash, Quest)
+        self._dirty = False  # Há aventuras compiladas que ainda não estão na cache em disco
+        self._manifest_dirty = False  # Há entradas do manifesto que ainda não estão em disco
+        self._lock = threading.Lock()
+        self._persist_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.compiled_hits = 0
 
     def _get_quests_folder(self) -> str:
         """Obter pasta de aventuras."""
         return current_app.config.get('QUESTS_FOLDER', 'app/data/quests')
 
+    def _get_manifest_path(self) -> str:
+        """Obter caminho do manifesto de aventuras."""
+        manifest_path = current_app.config.get('QUESTS_MANIFEST')
+        if manifest_path:
+            return manifest_path
+        return self._get_quests_folder().rstrip(os.sep) + '.manifest.json'
+
+    def _get_cache_path(self) -> str:
+        """Obter caminho da cache compilada de aventuras."""
+        cache_path = current_app.config.get('QUESTS_CACHE_FILE')
+        if cache_path:
+            return cache_path
+        return os.path.join(current_app.instance_path, 'quests.cache')
+
+    def _get_quest_path(self, quest_id: str) -> str:
+        """Obter caminho do ficheiro JSON de uma aventura."""
+        return os.path.join(self._get_quests_folder(), f'{quest_id}.json')
+
     def get_all_quests(self) -> list:
         """Obter lista de todas as aventuras disponíveis."""
         quests = []
@@ -25,33 +80,263 @@ class QuestLoader:
         if not os.path.exists(quests_folder):
             return quests
 
-        for filename in os.listdir(quests_folder):
+        for filename in sorted(os.listdir(quests_folder)):
             if filename.endswith('.json'):
                 quest_id = filename[:-5]  # Remover .json
-                quest = self.get_quest(quest_id)
+                quest = self._load_quest(quest_id)
                 if quest:
                     quests.append(quest)
 
+        self._persist_caches()
         return quests
 
-    def get_quest(self, quest_id: str) -> Quest | None:
-        """Carregar uma aventura específica."""
-        if quest_id in self._quests_cache:
-            return self._quests_cache[quest_id]
+    def compile_quests(self) -> int:
+        """Compilar todas as aventuras para a cache binária em instance/.
+
+        Returns:
+            Número de aventuras na cache
+        """
+        with self._lock:
+            self._quests_cache.clear()
+            self._compiled = {}
+            self._dirty = True
+            self._manifest_dirty = True
+        return len(self.get_all_quests())
 
+    def get_quest_summaries(self) -> list:
+        """Obter o resumo de todas as aventuras a partir do manifesto.
+
+        Só os ficheiros novos ou alterados (mtime/tamanho) são lidos; as
+        Quests completas só são construídas em get_quest(). No fim, as
+        caches marcadas como alteradas (por aqui ou por get_quest()) são
+        escritas em disco.
+        """
         quests_folder = self._get_quests_folder()
-        filepath = os.path.join(quests_folder, f'{quest_id}.json')
+        if not os.path.exists(quests_folder):
+            return []
+
+        manifest = self._get_manifest()
+
+        updated = {}
+        filenames = sorted(f for f in os.listdir(quests_folder) if f.endswith('.json'))
+        for filename in filenames:
+            try:
+                stat = os.stat(os.path.join(quests_folder, filename))
+            except OSError:
+                continue
+            if self._manifest_entry_valid(manifest.get(filename), stat):
+                continue
+            with open(os.path.join(quests_folder, filename), 'rb') as f:
+                raw = f.read()
+            entry = self._build_manifest_entry(filename, stat, raw)
+            if entry:
+                updated[filename] = entry
+        removed = set(manifest) - set(filenames)
+
+        # Juntar ao manifesto partilhado (um get_quest() concorrente pode ter acrescentado entradas)
+        with self._lock:
+            if updated or removed:
+                current = self._manifest if self._manifest is not None else {}
+                current.update(updated)
+                for filename in removed:
+                    current.pop(filename, None)
+                self._manifest = current
+                self._manifest_dirty = True
+            manifest = dict(self._manifest or {})
+
+        self._persist_caches()
+        return [self._summary_from_entry(manifest[f]) for f in filenames if f in manifest]
+
+    def get_quest_summary(self, quest_id: str) -> QuestSummary | None:
+        """Obter o resumo de uma aventura pelo ID."""
+        return next((q for q in self.get_quest_summaries() if q.id == quest_id), None)
+
+    def _get_manifest(self) -> dict:
+        """Obter cópia do manifesto em memória (lido do disco na primeira vez)."""
+        with self._lock:
+            if self._manifest is None:
+                self._manifest = self._read_manifest()
+            return dict(self._manifest)
+
+    @staticmethod
+    def _manifest_entry_valid(entry: dict | None, stat) -> bool:
+        """Verificar se uma entrada do manifesto corresponde ao ficheiro atual."""
+        return bool(entry) and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size
+
+    def _build_manifest_entry(self, filename: str, stat, raw: bytes, data: dict | None = None) -> dict | None:
+        """Extrair a entrada do manifesto a partir do conteúdo de um ficheiro."""
+        if data is None:
+            try:
+                data = json.loads(raw.decode('utf-8'))
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                return None
 
-        if not os.path.exists(filepath):
+        return {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'content_hash': hashlib.sha256(raw).hexdigest(),
+            'id': data.get('id', filename[:-5]),
+            'titulo': data.get('titulo', 'Aventura sem nome'),
+            'descricao': data.get('descricao', ''),
+            'nivel_min': data.get('nivel_min', 1),
+            'nivel_max': data.get('nivel_max', 3),
+            'num_passos': len(data.get('passos', [])),
+            'num_npcs': len(data.get('npcs', [])),
+            'monster_ids': [m['id'] for m in data.get('monstros', []) if 'id' in m]
+        }
+
+    def _summary_from_entry(self, entry: dict) -> QuestSummary:
+        """Converter uma entrada do manifesto num QuestSummary."""
+        return QuestSummary(
+            id=entry['id'],
+            titulo=entry['titulo'],
+            descricao=entry['descricao'],
+            nivel_min=entry['nivel_min'],
+            nivel_max=entry['nivel_max'],
+            num_passos=entry['num_passos'],
+            num_npcs=entry['num_npcs'],
+            monster_ids=entry['monster_ids'],
+            content_hash=entry['content_hash']
+        )
+
+    def _read_manifest(self) -> dict:
+        """Ler o manifesto persistido (vazio se não existir ou for de outra versão)."""
+        try:
+            with open(self._get_manifest_path(), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+        if data.get('version') != self.MANIFEST_VERSION:
+            return {}
+        return data.get('quests', {})
+
+    def _write_manifest(self, manifest: dict):
+        """Guardar o manifesto de forma atómica."""
+        payload = json.dumps({'version': self.MANIFEST_VERSION, 'quests': manifest},
+                             ensure_ascii=False).encode('utf-8')
+        self._atomic_write(self._get_manifest_path(), payload)
+
+    def _read_compiled(self) -> dict:
+        """Ler a cache compilada com uma única leitura (memory-mapped).
+
+        Devolve um dicionário vazio se o ficheiro não existir, estiver
+        corrompido ou tiver sido gerado com outro schema.
+        """
+        header_size = len(self.CACHE_MAGIC) + 4
+        try:
+            with open(self._get_cache_path(), 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if (mm[:len(self.CACHE_MAGIC)] != self.CACHE_MAGIC or
+                            int.from_bytes(mm[len(self.CACHE_MAGIC):header_size], 'little')
+                            != self.CACHE_SCHEMA_VERSION):
+                        return {}
+                    return pickle.loads(mm[header_size:])
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return {}
+
+    def _persist_caches(self):
+        """Guardar de forma atómica o manifesto e/ou a cache compilada que tenham alterações."""
+        with self._persist_lock:
+            with self._lock:
+                if not (self._dirty or self._manifest_dirty):
+                    return
+                manifest = dict(self._manifest or {}) if self._manifest_dirty else None
+                compiled = dict(self._compiled or {}) if self._dirty else None
+                self._dirty = False
+                self._manifest_dirty = False
+            if manifest is not None:
+                self._write_manifest(manifest)
+            if compiled is not None:
+                payload = (self.CACHE_MAGIC +
+                           self.CACHE_SCHEMA_VERSION.to_bytes(4, 'little') +
+                           pickle.dumps(compiled, protocol=pickle.HIGHEST_PROTOCOL))
+                self._atomic_write(self._get_cache_path(), payload)
+
+    @staticmethod
+    def _atomic_write(path: str, payload: bytes):
+        """Escrever um ficheiro via ficheiro temporário (único) + rename."""
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError:
+            # Manifesto e cache são opcionais; sem permissão de escrita ficam em memória
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get_quest(self, quest_id: str) -> Quest | None:
+        """Carregar uma aventura específica (relida apenas se o ficheiro mudou).
+
+        Não escreve em disco: a aventura entra nos ficheiros de cache no
+        próximo get_quest_summaries()/get_all_quests()/compile_quests().
+        """
+        return self._load_quest(quest_id)
+
+    def _load_quest(self, quest_id: str) -> Quest | None:
+        """Carregar uma aventura sem persistir as caches em disco.
+
+        Ordem: cache em memória (mtime/tamanho) -> cache compilada (hash do
+        manifesto) -> parse do JSON. Uma aventura lida do JSON marca as
+        caches para o próximo _persist_caches().
+        """
+        filepath = self._get_quest_path(quest_id)
+        filename = os.path.basename(filepath)
+
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            with self._lock:
+                self._quests_cache.pop(filepath, None)
             return None
 
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._quests_cache.get(filepath)
+            if cached and cached[:2] == signature:
+                self.hits += 1
+                return cached[2]
+            self.misses += 1
+            if self._compiled is None:
+                self._compiled = self._read_compiled()
+            compiled = self._compiled.get(filename)
 
+        manifest = self._get_manifest()
+        entry = manifest.get(filename)
+        if compiled and self._manifest_entry_valid(entry, stat) and compiled[0] == entry['content_hash']:
+            quest = compiled[1]
+            with self._lock:
+                self.compiled_hits += 1
+                self._quests_cache[filepath] = (signature[0], signature[1], quest)
+            return quest
+
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+        data = json.loads(raw.decode('utf-8'))
         quest = self._parse_quest(quest_id, data)
-        self._quests_cache[quest_id] = quest
+
+        entry = self._build_manifest_entry(filename, stat, raw, data)
+        with self._lock:
+            self._quests_cache[filepath] = (signature[0], signature[1], quest)
+            self._compiled[filename] = (entry['content_hash'], quest)
+            self._manifest = self._manifest or {}
+            self._manifest[filename] = entry
+            self._dirty = True
+            self._manifest_dirty = True
         return quest
 
+    def get_stats(self) -> dict:
+        """Obter contadores da cache (hits, misses, entradas)."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'compiled_hits': self.compiled_hits,
+                'cached': len(self._quests_cache)
+            }
+
     def _parse_quest(self, quest_id: str, data: dict) -> Quest:
         """Converter dados JSON numa Quest."""
         # Parse NPCs
@@ -90,6 +375,7 @@ class QuestLoader:
                 cr=monster_data.get('cr', '1/4'),
                 xp=monster_data.get('xp', 50),
                 acoes=monster_data.get('acoes', []),
+                perfis_ataque=compile_monster_actions(monster_data.get('acoes', [])),
                 resistencias=monster_data.get('resistencias', []),
                 imunidades=monster_data.get('imunidades', []),
                 vulnerabilidades=monster_data.get('vulnerabilidades', []),
@@ -132,6 +418,17 @@ class QuestLoader:
 
     def reload_quest(self, quest_id: str) -> Quest | None:
         """Forçar recarregamento de uma aventura."""
-        if quest_id in self._quests_cache:
-            del self._quests_cache[quest_id]
+        filepath = self._get_quest_path(quest_id)
+        with self._lock:
+            self._quests_cache.pop(filepath, None)
+            if self._compiled:
+                self._compiled.pop(os.path.basename(filepath), None)
         return self.get_quest(quest_id)
+
+
+def get_quest_loader() -> QuestLoader:
+    """Obter o QuestLoader partilhado pela aplicação Flask atual."""
+    loader = current_app.extensions.get('quest_loader')
+    if loader is None:
+        loader = current_app.extensions.setdefault('quest_loader', QuestLoader())
+    return loader
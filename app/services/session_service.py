@@ -5,6 +5,9 @@ import os
 from flask import current_app
 from app import db
 from app.models.session import GameSession, SessionPlayer, SessionCombat, SavedCharacter
+from app.services.combat_state_store import get_combat_state_store
+from app.services.combat_event_service import CombatEventService
+from app.services.event_bus import publish_combat_state
 
 
 class SessionService:
@@ -182,16 +185,21 @@ class SessionService:
         if not player:
             return None
 
-        condicoes = player.get_condicoes()
-        if condition in condicoes:
-            condicoes.remove(condition)
+        if player.tem_condicao(condition):
+            player.remove_condicao(condition)
         else:
-            condicoes.append(condition)
+            player.add_condicao(condition)
 
-        player.set_condicoes(condicoes)
         db.session.commit()
         return player
 
+    def get_players_with_condition(self, session_id, *conditions):
+        """Jogadores da sessao com alguma das condicoes (filtrado em SQL pela mascara)."""
+        return SessionPlayer.query.filter(
+            SessionPlayer.session_id == session_id,
+            SessionPlayer.com_condicao(*conditions)
+        ).all()
+
     def remove_player(self, player_id):
         """Remover um jogador de uma sessao."""
         player = self.get_player(player_id)
@@ -208,6 +216,7 @@ class SessionService:
 
     def start_combat(self, session_id, participants, quest_step_id=None):
         """Iniciar um combate numa sessao."""
+        get_combat_state_store().flush(session_id, evict=True)
         combat = self.get_session_combat(session_id)
 
         if not combat:
@@ -219,12 +228,18 @@ class SessionService:
         combat.turno_atual = 0
         combat.quest_step_id = quest_step_id
         combat.set_participantes(participants)
+        if combat.id is not None:
+            combat.reset_action_economy()  # Combate novo; os spell slots mantem-se
+        CombatEventService.record_restore(combat, base=True)
 
         db.session.commit()
+        publish_combat_state(combat)
         return combat
 
     def end_combat(self, session_id):
         """Terminar um combate e sincronizar estado dos jogadores."""
+        # Escrever o estado em memoria (write-behind) antes de sincronizar
+        get_combat_state_store().flush(session_id, evict=True)
         combat = self.get_session_combat(session_id)
         if not combat or not combat.activo:
             return None
@@ -244,6 +259,7 @@ class SessionService:
 
         combat.activo = False
         db.session.commit()
+        publish_combat_state(combat)
         return combat
 
     # ===== SISTEMA DE XP =====
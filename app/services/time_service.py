@@ -107,11 +107,12 @@ class TimeTrackingService:
 
     # ===== 2. RONDAS DE COMBATE (6 SEGUNDOS) =====
 
-    def start_combat_round_timer(self, session_id: int):
+    def start_combat_round_timer(self, session_id: int, commit: bool = True):
         """Iniciar timer da ronda de combate.
 
         Args:
             session_id: ID da sessao de jogo
+            commit: Se False, fica na transacao atual (ex.: passagem de turno)
 
         Returns:
             True se iniciado, False caso contrario
@@ -126,21 +127,24 @@ class TimeTrackingService:
         if combat.ronda_atual == 1 and not combat.tempo_inicio_combate:
             combat.tempo_inicio_combate = datetime.utcnow()
 
-        db.session.commit()
+        if commit:
+            db.session.commit()
         return True
 
-    def end_combat_round(self, session_id: int):
+    def end_combat_round(self, session_id: int, commit: bool = True):
         """Finalizar ronda de combate e acumular tempo.
 
         Args:
             session_id: ID da sessao de jogo
+            commit: Se False, fica na transacao atual (ex.: passagem de turno)
         """
         combat = SessionCombat.query.filter_by(session_id=session_id).first()
         if combat and combat.tempo_ronda_inicio:
             elapsed = (datetime.utcnow() - combat.tempo_ronda_inicio).total_seconds()
             combat.duracao_total_segundos += int(elapsed)
             combat.tempo_ronda_inicio = None
-            db.session.commit()
+            if commit:
+                db.session.commit()
 
     def get_combat_time(self, session_id: int) -> dict:
         """Calcular tempo de combate (rounds e tempo real).
@@ -158,7 +162,8 @@ class TimeTrackingService:
                 "game_seconds": 0,
                 "game_formatted": "0s",
                 "real_seconds": 0,
-                "real_formatted": "0m 0s"
+                "real_formatted": "0m 0s",
+                "real_running": False
             }
 
         # Tempo no jogo (6 segundos por ronda)
@@ -178,7 +183,8 @@ class TimeTrackingService:
             "game_seconds": game_seconds,
             "game_formatted": f"{game_seconds}s ({game_seconds // 60}m {game_seconds % 60}s)",
             "real_seconds": real_seconds,
-            "real_formatted": f"{real_minutes}m {real_secs}s"
+            "real_formatted": f"{real_minutes}m {real_secs}s",
+            "real_running": bool(combat.tempo_inicio_combate)
         }
 
     # ===== 3. TURNOS DE EXPLORACAO (10 MINUTOS) =====
@@ -8,7 +8,8 @@
 window.combatState = {
     participants: [],
     currentTurn: 0,
-    round: 1
+    round: 1,
+    version: 0
 };
 
 // Lista de condições disponíveis
@@ -39,6 +40,12 @@ async function loadCombat() {
  */
 function loadSessionParticipants(participants) {
     combatState.participants = participants || [];
+    if (window.initialCombat) {
+        combatState.round = window.initialCombat.ronda || 1;
+        combatState.currentTurn = window.initialCombat.turno || 0;
+        combatState.version = window.initialCombat.versao || 0;
+        updateRoundCounter();
+    }
     renderInitiativeList();
 
     if (participants.length > 0) {
@@ -47,26 +54,153 @@ function loadSessionParticipants(participants) {
 }
 
 /**
- * Sincroniza o estado do combate com a sessao no servidor.
+ * Envia alteracoes parciais do combate para a sessao no servidor.
+ * Se outro separador alterou o combate entretanto, recarrega o estado do servidor.
+ * @param {Array} operations - Operacoes (set_hp, add_condition, remove_condition, reorder, set_turn); o turno passa-se com advanceSessionTurn
  */
-async function syncSessionCombat() {
+async function patchSessionCombat(operations) {
+    return sendSessionCombat('/estado', 'PATCH', { versao: combatState.version, operations });
+}
+
+/**
+ * Passa o turno no servidor (repoe a action economy de quem comeca o turno e,
+ * na mudanca de ronda, acumula o tempo da ronda) e aplica a ronda/turno devolvidos.
+ */
+async function advanceSessionTurn() {
+    return sendSessionCombat('/proximo-turno', 'POST', { versao: combatState.version });
+}
+
+async function sendSessionCombat(path, method, body) {
     if (!window.sessionMode || !window.sessionId) return;
 
     try {
-        await fetch('/combate/sessao/' + window.sessionId + '/atualizar', {
-            method: 'POST',
+        const response = await fetch('/combate/sessao/' + window.sessionId + path, {
+            method,
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                participants: combatState.participants,
-                ronda: combatState.round,
-                turno: combatState.currentTurn
-            })
+            body: JSON.stringify(body)
         });
+        const data = await response.json();
+
+        if (response.status === 409) {
+            combatState.participants = data.participants || [];
+            combatState.round = data.ronda;
+            combatState.currentTurn = data.turno;
+            combatState.version = data.versao;
+            updateRoundCounter();
+            renderInitiativeList();
+            showNotification('O combate foi alterado noutra janela. Estado recarregado.', 'warning');
+            return;
+        }
+        if (!response.ok) {
+            showNotification(data.erro || 'Erro ao guardar combate.', 'danger');
+            return;
+        }
+
+        combatState.version = data.versao;
+        if (data.ronda !== undefined) {
+            combatState.round = data.ronda;
+            combatState.currentTurn = data.turno;
+            updateRoundCounter();
+        }
+        if (data.participants && data.participants.length > 0) {
+            // Alteracoes feitas pelo servidor (ex: condicoes que expiraram)
+            data.participants.forEach(changes => {
+                const participant = combatState.participants.find(p => String(p.id) === String(changes.id));
+                if (participant) {
+                    Object.assign(participant, changes);
+                }
+            });
+            renderInitiativeList();
+        }
+        notifyConditionExpirations(data);
     } catch (error) {
         console.error('Erro ao sincronizar combate com sessao:', error);
     }
 }
 
+/**
+ * Avisa das condicoes que expiraram e das salvaguardas que podem ser repetidas
+ */
+function notifyConditionExpirations(data) {
+    (data.expirados || []).forEach(e => {
+        showNotification(e.nome + ' já não está ' + e.condicao + '.', 'info');
+    });
+    (data.salvaguardas || []).forEach(s => {
+        const detalhe = [s.atributo ? s.atributo.toUpperCase() : null, s.cd ? 'CD ' + s.cd : null].filter(Boolean).join(' ');
+        showNotification(s.nome + ' pode repetir a salvaguarda contra ' + s.condicao + (detalhe ? ' (' + detalhe + ')' : '') + '.', 'warning');
+    });
+}
+
+/**
+ * Desfaz (ou refaz) a ultima alteracao de estado do combate no servidor.
+ * @param {boolean} undo - true para desfazer, false para refazer
+ */
+async function undoRedoCombat(undo) {
+    if (!window.sessionMode || !window.sessionId) return;
+
+    try {
+        const response = await fetch('/combate/sessao/' + window.sessionId + (undo ? '/desfazer' : '/refazer'), {
+            method: 'POST'
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            showNotification(data.erro || 'Erro ao desfazer.', 'warning');
+            return;
+        }
+
+        combatState.participants = data.participants;
+        combatState.round = data.ronda;
+        combatState.currentTurn = data.turno;
+        combatState.version = data.versao;
+        updateRoundCounter();
+        renderInitiativeList();
+        refreshCombatLog();
+    } catch (error) {
+        console.error('Erro ao desfazer/refazer:', error);
+    }
+}
+
+/**
+ * Aplica um evento 'participant' recebido do servidor (outra janela, ecra dos jogadores).
+ * Eventos de versoes ja conhecidas (incluindo os das nossas proprias alteracoes) sao ignorados.
+ * @param {Object} data - versao, participants (campos alterados ou lista completa com replace), ronda, turno, order
+ */
+function applyParticipantEvent(data) {
+    if (data.replace) {
+        if (data.versao < combatState.version) return;
+        combatState.participants = data.participants || [];
+    } else {
+        if (data.versao <= combatState.version) return;
+        (data.participants || []).forEach(changes => {
+            const participant = combatState.participants.find(p => String(p.id) === String(changes.id));
+            if (participant) {
+                Object.assign(participant, changes);
+            }
+        });
+        if (data.order) {
+            const byId = {};
+            combatState.participants.forEach(p => { byId[String(p.id)] = p; });
+            combatState.participants = data.order.map(id => byId[String(id)]).filter(Boolean);
+        }
+    }
+
+    if (data.ronda !== undefined) {
+        combatState.round = data.ronda;
+        combatState.currentTurn = data.turno;
+        updateRoundCounter();
+    }
+    combatState.version = data.versao;
+    renderInitiativeList();
+}
+
+function undoCombat() {
+    undoRedoCombat(true);
+}
+
+function redoCombat() {
+    undoRedoCombat(false);
+}
+
 async function addParticipant() {
     const nome = document.getElementById('participantName').value;
     const iniciativa = parseInt(document.getElementById('participantInit').value) || 10;
@@ -183,9 +317,12 @@ async function applyDamage(isHealing) {
                 break;
             }
         }
+        const target = combatState.participants.find(p => String(p.id) === String(targetId));
         renderInitiativeList();
         bootstrap.Modal.getInstance(document.getElementById('damageModal')).hide();
-        syncSessionCombat();
+        if (target) {
+            patchSessionCombat([{ op: 'set_hp', id: target.id, hp_atual: target.hp_atual }]);
+        }
 
         const msg = isHealing ? '+' + amount + ' HP curado!' : '-' + amount + ' HP de dano!';
         showNotification(msg, isHealing ? 'success' : 'danger');
@@ -233,20 +370,29 @@ async function applyDamage(isHealing) {
 async function toggleCondition(id, condition) {
     // Em modo de sessao, aplicar localmente e sincronizar
     if (window.sessionMode) {
+        let operation = null;
         for (let p of combatState.participants) {
             if (String(p.id) === String(id)) {
                 if (!p.condicoes) p.condicoes = [];
                 const idx = p.condicoes.indexOf(condition);
                 if (idx >= 0) {
                     p.condicoes.splice(idx, 1);
+                    operation = { op: 'remove_condition', id: p.id, condition };
                 } else {
+                    // Duracao opcional em rondas (vazio = ate ser removida)
+                    const rondas = prompt('Duração de ' + condition + ' em rondas (vazio = até remover):', '');
+                    if (rondas === null) return;
                     p.condicoes.push(condition);
+                    operation = { op: 'add_condition', id: p.id, condition };
+                    if (parseInt(rondas) > 0) {
+                        operation.expira = { tipo: 'ronda', rondas: parseInt(rondas) };
+                    }
                 }
                 break;
             }
         }
         renderInitiativeList();
-        syncSessionCombat();
+        if (operation) patchSessionCombat([operation]);
         return;
     }
 
@@ -295,13 +441,16 @@ function nextTurn() {
 
     // Sincronizar com sessao se em modo de sessao
     if (window.sessionMode) {
-        syncSessionCombat();
+        advanceSessionTurn();
     }
 }
 
 function sortByInitiative() {
     combatState.participants.sort((a, b) => b.iniciativa - a.iniciativa);
     renderInitiativeList();
+    if (window.sessionMode) {
+        patchSessionCombat([{ op: 'reorder', order: combatState.participants.map(p => p.id) }]);
+    }
     showNotification('Lista ordenada por iniciativa.', 'info');
 }
 
@@ -412,6 +561,15 @@ function createParticipantCard(p, index) {
             const condBadge = document.createElement('span');
             condBadge.className = 'badge bg-warning text-dark condition-badge me-1';
             condBadge.textContent = c + ' ×';
+            const efeito = (p.efeitos || []).find(e => e.condicao === c);
+            if (efeito) {
+                condBadge.title = efeito.tipo === 'salvaguarda'
+                    ? 'Até passar a salvaguarda'
+                    : efeito.tipo === 'turno_fonte'
+                        ? 'Até ao fim do turno de ' + ((combatState.participants.find(x => String(x.id) === String(efeito.fonte)) || {}).nome || efeito.fonte) + ' (ronda ' + efeito.ronda + ')'
+                        : 'Até ao fim da ronda ' + efeito.ronda;
+                condBadge.textContent = c + ' ⏳ ×';
+            }
             condBadge.style.cursor = 'pointer';
             condBadge.addEventListener('click', () => toggleCondition(p.id, c));
             conditionsDiv.appendChild(condBadge);
@@ -635,25 +793,92 @@ function updateConditionHighlights() {
 // Combat Log System
 // ============================================
 
+// Entradas mostradas no log (mais recente primeiro)
+let combatLogEntries = [];
+let combatLogHasOlder = false;
+let combatLogLoadingOlder = false;
+const COMBAT_LOG_LIMIT = 50;
+
+async function fetchCombatLog(params) {
+    const query = new URLSearchParams(Object.assign({ limit: COMBAT_LOG_LIMIT }, params));
+    const response = await fetch(`/combate/sessao/${window.sessionId}/log?${query}`);
+    return response.json();
+}
+
 async function refreshCombatLog() {
     if (!window.sessionMode || !window.sessionId) return;
 
     try {
-        const response = await fetch(`/combate/sessao/${window.sessionId}/log?limit=50`);
-        const data = await response.json();
+        const data = await fetchCombatLog({});
 
         if (data.logs) {
-            renderCombatLog(data.logs);
+            combatLogEntries = data.logs;
+            combatLogHasOlder = data.has_more;
+            renderCombatLog(combatLogEntries);
         }
     } catch (error) {
         console.error('Erro ao carregar combat log:', error);
     }
 }
 
-function renderCombatLog(logs) {
+/**
+ * Pede ao servidor so as entradas novas (desde a mais recente que ja temos).
+ */
+async function pollCombatLog() {
+    if (!window.sessionMode || !window.sessionId) return;
+    if (combatLogEntries.length === 0) {
+        return refreshCombatLog();
+    }
+
+    try {
+        let data;
+        do {
+            data = await fetchCombatLog({ since_id: combatLogEntries[0].id });
+            (data.logs || []).slice().reverse().forEach(log => combatLogEntries.unshift(log));
+        } while (data.has_more);
+        renderCombatLog(combatLogEntries);
+    } catch (error) {
+        console.error('Erro ao carregar combat log:', error);
+    }
+}
+
+/**
+ * Carrega a pagina anterior do log (ao chegar ao fim da lista).
+ */
+async function loadOlderCombatLog() {
+    if (!combatLogHasOlder || combatLogLoadingOlder || combatLogEntries.length === 0) return;
+
+    combatLogLoadingOlder = true;
+    try {
+        const oldest = combatLogEntries[combatLogEntries.length - 1].id;
+        const data = await fetchCombatLog({ before_id: oldest });
+        combatLogEntries = combatLogEntries.concat(data.logs || []);
+        combatLogHasOlder = data.has_more;
+        renderCombatLog(combatLogEntries, false);
+    } catch (error) {
+        console.error('Erro ao carregar combat log:', error);
+    } finally {
+        combatLogLoadingOlder = false;
+    }
+}
+
+/**
+ * Acrescenta ao log uma entrada recebida por evento 'log' do servidor.
+ * @param {Object} log - Entrada do combat log
+ */
+function appendCombatLogEntry(log) {
+    if (combatLogEntries.some(entry => entry.id === log.id)) return;
+
+    combatLogEntries.unshift(log);
+    combatLogEntries.sort((a, b) => b.id - a.id);
+    renderCombatLog(combatLogEntries);
+}
+
+function renderCombatLog(logs, scrollToTop = true) {
     const container = document.getElementById('combat-log-container');
     if (!container) return;
 
+    const scrollTop = container.scrollTop;
     clearElement(container);
 
     if (logs.length === 0) {
@@ -693,8 +918,8 @@ function renderCombatLog(logs) {
         container.appendChild(logEntry);
     });
 
-    // Scroll para o topo (mais recente)
-    container.scrollTop = 0;
+    // Scroll para o topo (mais recente), ou manter a posicao ao carregar entradas antigas
+    container.scrollTop = scrollToTop ? 0 : scrollTop;
 }
 
 async function clearCombatLogUI() {
@@ -710,7 +935,9 @@ async function clearCombatLogUI() {
 
         const data = await response.json();
         if (data.success) {
-            renderCombatLog([]);
+            combatLogEntries = [];
+            combatLogHasOlder = false;
+            renderCombatLog(combatLogEntries);
             showNotification(`${data.deleted} entradas removidas`, 'info');
         }
     } catch (error) {
@@ -758,10 +985,100 @@ function openAttackRollModal(actorId, actorNome) {
     document.getElementById('attackDisadvantage').checked = false;
     document.getElementById('attackResult').classList.add('d-none');
     document.getElementById('attackDamageButton').classList.add('d-none');
+    document.getElementById('attackDamagePreview').value = '';
+    document.getElementById('attackDamagePreview').dataset.damageType = '';
+    document.getElementById('attackOdds').textContent = '';
+    populateAttackProfiles(actorId);
 
     new bootstrap.Modal(document.getElementById('attackRollModal')).show();
 }
 
+/**
+ * Preenche o selector de ataques com os perfis compilados do monstro (se existirem)
+ */
+function populateAttackProfiles(actorId) {
+    const group = document.getElementById('attackProfileGroup');
+    const select = document.getElementById('attackProfile');
+    clearElement(select);
+
+    const actor = combatState.participants.find(p => String(p.id) === String(actorId));
+    const profiles = (actor && actor.monster_id && window.monsterProfiles)
+        ? (window.monsterProfiles[actor.monster_id] || []).filter(p => p.tipo === 'ataque' && p.damage_expression)
+        : [];
+
+    if (profiles.length === 0) {
+        group.classList.add('d-none');
+        return;
+    }
+
+    profiles.forEach((profile, index) => {
+        const option = document.createElement('option');
+        option.value = index;
+        option.textContent = `${profile.nome} (+${profile.bonus}, ${profile.damage.map(d => d.expression).join(' + ')})`;
+        option.dataset.bonus = profile.bonus;
+        option.dataset.damage = profile.damage_expression;
+        option.dataset.damageType = profile.damage_type;
+        select.appendChild(option);
+    });
+
+    group.classList.remove('d-none');
+    applyAttackProfile();
+}
+
+function applyAttackProfile() {
+    const select = document.getElementById('attackProfile');
+    const option = select.options[select.selectedIndex];
+    if (!option) return;
+
+    document.getElementById('attackBonus').value = option.dataset.bonus;
+    const damageInput = document.getElementById('attackDamagePreview');
+    damageInput.value = option.dataset.damage;
+    damageInput.dataset.damageType = option.dataset.damageType;
+    updateAttackOdds();
+}
+
+/**
+ * Mostra a probabilidade exata de acerto/crítico e o dano esperado do ataque
+ */
+async function updateAttackOdds() {
+    const oddsDiv = document.getElementById('attackOdds');
+    const targetSelect = document.getElementById('attackTargetId');
+    if (!oddsDiv || !targetSelect.value) {
+        if (oddsDiv) oddsDiv.textContent = '';
+        return;
+    }
+
+    const diceExpression = document.getElementById('attackDamagePreview').value.trim();
+
+    try {
+        const response = await fetch('/combate/probabilidades', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                bonus: parseInt(document.getElementById('attackBonus').value) || 0,
+                target_ac: parseInt(document.getElementById('attackTargetAC').value) || 10,
+                advantage: document.getElementById('attackAdvantage').checked,
+                disadvantage: document.getElementById('attackDisadvantage').checked,
+                dice_expression: diceExpression || null
+            })
+        });
+
+        const odds = await response.json();
+        if (!response.ok) {
+            oddsDiv.textContent = odds.erro || '';
+            return;
+        }
+
+        let text = `Acerto: ${Math.round(odds.hit * 100)}% | Crítico: ${Math.round(odds.crit * 100)}%`;
+        if (odds.expected_damage !== undefined) {
+            text += ` | Dano esperado: ${odds.expected_damage.toFixed(1)}`;
+        }
+        oddsDiv.textContent = text;
+    } catch (error) {
+        console.error('Erro ao calcular probabilidades:', error);
+    }
+}
+
 // Atualizar AC quando alvo é selecionado
 document.addEventListener('DOMContentLoaded', function() {
     const targetSelect = document.getElementById('attackTargetId');
@@ -771,6 +1088,14 @@ document.addEventListener('DOMContentLoaded', function() {
             if (selectedOption.dataset.ac) {
                 document.getElementById('attackTargetAC').value = selectedOption.dataset.ac;
             }
+            updateAttackOdds();
+        });
+
+        ['attackBonus', 'attackDamagePreview'].forEach(id => {
+            document.getElementById(id).addEventListener('change', updateAttackOdds);
+        });
+        ['attackAdvantage', 'attackDisadvantage'].forEach(id => {
+            document.getElementById(id).addEventListener('change', updateAttackOdds);
         });
     }
 });
@@ -894,6 +1219,118 @@ function goToDamageFromAttack() {
     openDamageRollModal(actorId, actorNome, targetOption.value, targetOption.dataset.nome, isCrit);
 }
 
+// ============================================
+// Bulk Attack System
+// ============================================
+
+function openBulkAttackModal() {
+    if (!window.sessionMode) {
+        showNotification('Ataques em grupo só funcionam em modo de sessão', 'warning');
+        return;
+    }
+
+    const targetSelect = document.getElementById('bulkAttackTarget');
+    clearElement(targetSelect);
+
+    combatState.participants.forEach(p => {
+        if (p.hp_atual > 0) {
+            const option = document.createElement('option');
+            option.value = p.id;
+            option.textContent = `${p.nome} (AC ${p.ac})`;
+            targetSelect.appendChild(option);
+        }
+    });
+
+    document.getElementById('bulkAttackAdvantage').checked = false;
+    document.getElementById('bulkAttackResult').classList.add('d-none');
+    renderBulkAttackers();
+
+    new bootstrap.Modal(document.getElementById('bulkAttackModal')).show();
+}
+
+function renderBulkAttackers() {
+    const container = document.getElementById('bulkAttackers');
+    const targetId = document.getElementById('bulkAttackTarget').value;
+    clearElement(container);
+
+    combatState.participants.forEach(p => {
+        if (String(p.id) === String(targetId) || p.hp_atual <= 0) return;
+
+        const wrapper = document.createElement('div');
+        wrapper.className = 'form-check';
+
+        const checkbox = document.createElement('input');
+        checkbox.className = 'form-check-input bulk-attacker';
+        checkbox.type = 'checkbox';
+        checkbox.value = p.id;
+        checkbox.dataset.nome = p.nome;
+        checkbox.checked = p.tipo === 'monstro';
+
+        const label = document.createElement('label');
+        label.className = 'form-check-label';
+        label.textContent = p.nome;
+
+        wrapper.appendChild(checkbox);
+        wrapper.appendChild(label);
+        container.appendChild(wrapper);
+    });
+}
+
+async function performBulkAttack() {
+    if (!window.sessionMode || !window.sessionId) return;
+
+    const targetId = document.getElementById('bulkAttackTarget').value;
+    const bonus = parseInt(document.getElementById('bulkAttackBonus').value) || 0;
+    const diceExpression = document.getElementById('bulkAttackDamage').value.trim();
+    const advantage = document.getElementById('bulkAttackAdvantage').checked;
+
+    const attacks = Array.from(document.querySelectorAll('.bulk-attacker:checked')).map(cb => ({
+        actor_id: cb.value,
+        actor_nome: cb.dataset.nome,
+        target_id: targetId,
+        bonus: bonus,
+        advantage: advantage,
+        dice_expression: diceExpression || null
+    }));
+
+    if (!targetId || attacks.length === 0) {
+        showNotification('Seleciona um alvo e pelo menos um atacante', 'warning');
+        return;
+    }
+
+    try {
+        const response = await fetch(`/combate/sessao/${window.sessionId}/ataques-em-massa`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ attacks: attacks })
+        });
+
+        const result = await response.json();
+        if (!response.ok) {
+            showNotification(result.erro || 'Erro nos ataques em grupo', 'danger');
+            return;
+        }
+
+        // Atualizar HP localmente com o estado devolvido
+        result.participants.forEach(updated => {
+            const participant = combatState.participants.find(p => String(p.id) === String(updated.id));
+            if (participant) participant.hp_atual = updated.hp_atual;
+        });
+        combatState.version = result.versao;
+
+        const resultDiv = document.getElementById('bulkAttackResult');
+        resultDiv.textContent = `${result.hits} acerto(s), ${result.misses} falha(s) — ${result.total_damage} de dano total`;
+        resultDiv.classList.remove('d-none');
+
+        renderInitiativeList();
+        refreshCombatLog();
+
+    } catch (error) {
+        console.error('Erro nos ataques em grupo:', error);
+        showNotification('Erro nos ataques em grupo', 'danger');
+    }
+}
+
 // ============================================
 // Damage Roll System (Advanced)
 // ============================================
@@ -909,8 +1346,9 @@ function openDamageRollModal(actorId, actorNome, targetId, targetNome, isCrit) {
     document.getElementById('damageRollTargetId').value = targetId;
     document.getElementById('damageRollTargetNome').value = targetNome;
 
-    document.getElementById('damageExpression').value = '1d6';
-    document.getElementById('damageType').value = 'slashing';
+    const attackDamage = document.getElementById('attackDamagePreview');
+    document.getElementById('damageExpression').value = (attackDamage && attackDamage.value.trim()) || '1d6';
+    document.getElementById('damageType').value = (attackDamage && attackDamage.dataset.damageType) || 'slashing';
     document.getElementById('damageCrit').checked = isCrit || false;
     document.getElementById('damageResistance').checked = false;
     document.getElementById('damageImmunity').checked = false;
@@ -953,6 +1391,10 @@ async function performDamageRoll() {
         });
 
         const result = await response.json();
+        if (!response.ok) {
+            showNotification(result.erro || 'Erro ao aplicar dano', 'danger');
+            return;
+        }
         displayDamageResult(result);
         renderInitiativeList();
         refreshCombatLog();
@@ -962,6 +1404,9 @@ async function performDamageRoll() {
         if (targetParticipant) {
             targetParticipant.hp_atual = result.target_hp_atual;
         }
+        if (result.versao !== null && result.versao !== undefined) {
+            combatState.version = result.versao;
+        }
 
         // Adicionar a XP calc se matou o monstro
         if (result.target_hp_atual === 0) {
@@ -1141,7 +1586,25 @@ document.addEventListener('DOMContentLoaded', function() {
     if (window.sessionMode && window.sessionId) {
         refreshCombatLog();
 
-        // Auto-refresh combat log every 10 seconds
-        setInterval(refreshCombatLog, 10000);
+        if (typeof SessionEvents !== 'undefined' && SessionEvents.isSupported()) {
+            // Alteracoes empurradas pelo servidor (SSE) em vez de polling
+            SessionEvents.forSession(window.sessionId)
+                .on('log', appendCombatLogEntry)
+                .on('participant', applyParticipantEvent)
+                .on('reset', () => window.location.reload());
+        } else {
+            // Auto-refresh combat log every 10 seconds (so entradas novas)
+            setInterval(pollCombatLog, 10000);
+        }
+
+        // Carregar entradas antigas ao chegar ao fim do log
+        const logContainer = document.getElementById('combat-log-container');
+        if (logContainer) {
+            logContainer.addEventListener('scroll', () => {
+                if (logContainer.scrollTop + logContainer.clientHeight >= logContainer.scrollHeight - 20) {
+                    loadOlderCombatLog();
+                }
+            });
+        }
     }
 });
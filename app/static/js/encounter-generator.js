@@ -73,6 +73,8 @@ async function generateEncounter() {
         const difficulty = document.getElementById('difficulty').value;
         const questId = document.getElementById('quest-filter').value;
         const maxMonsters = parseInt(document.getElementById('max-monsters').value) || 10;
+        const modeSelect = document.getElementById('generation-mode');
+        const mode = modeSelect ? modeSelect.value : 'greedy';
 
         // Validar
         if (!partyLevels || partyLevels.length === 0) {
@@ -93,7 +95,8 @@ async function generateEncounter() {
                 difficulty: difficulty,
                 quest_id: questId,
                 max_monsters: maxMonsters,
-                min_monsters: 1
+                min_monsters: 1,
+                mode: mode
             })
         });
 
@@ -136,6 +139,54 @@ function displayEncounter(encounter) {
 
     // Renderizar lista de monstros
     renderMonstersList(encounter.monsters);
+
+    // Simulação anterior já não se aplica
+    document.getElementById('simulation-result').style.display = 'none';
+}
+
+/**
+ * Simula o encontro atual (Monte Carlo) para estimar a letalidade
+ */
+async function simulateEncounter() {
+    if (!currentEncounter) {
+        showNotification('Nenhum encontro gerado para simular', 'warning');
+        return;
+    }
+
+    try {
+        showNotification('A simular combates...', 'info');
+
+        const sessionId = document.getElementById('session-id').value;
+        const response = await fetch('/gerador-encontros/simular', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({
+                session_id: sessionId ? parseInt(sessionId) : null,
+                party_levels: currentEncounter.party_levels,
+                monsters: currentEncounter.monsters,
+                iterations: 10000
+            })
+        });
+
+        if (!response.ok) {
+            const error = await response.json();
+            throw new Error(error.error || 'Erro ao simular encontro');
+        }
+
+        const result = await response.json();
+
+        document.getElementById('sim-iterations').textContent = result.iterations;
+        document.getElementById('sim-win').textContent = `${Math.round(result.win_probability * 100)}%`;
+        document.getElementById('sim-rounds').textContent = result.expected_rounds;
+        document.getElementById('sim-downs').textContent = result.expected_downs;
+        document.getElementById('sim-party-dpr').textContent = result.party_damage_per_round;
+        document.getElementById('sim-monster-dpr').textContent = result.monster_damage_per_round;
+        document.getElementById('simulation-result').style.display = 'block';
+
+    } catch (error) {
+        console.error('Erro ao simular encontro:', error);
+        showNotification(`Erro: ${error.message}`, 'danger');
+    }
 }
 
 /**
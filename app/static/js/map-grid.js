@@ -152,6 +152,29 @@ class MapGrid {
         this.render();
     }
 
+    /**
+     * Aplicar evento 'entity' recebido do servidor (SSE)
+     * @returns {boolean} false se for preciso recarregar todas as posicoes
+     */
+    applyEntityEvent(data) {
+        if (data.recarregar) {
+            return false;
+        }
+        if (data.removido) {
+            this.removeEntity(data.entity_id);
+            return true;
+        }
+
+        const updates = Object.assign({}, data);
+        delete updates.step_id;
+        if (this.entities.some(e => e.entity_id === data.entity_id)) {
+            this.updateEntity(data.entity_id, updates);
+        } else if (data.grid_x !== undefined) {
+            this.addEntity(updates);
+        }
+        return true;
+    }
+
     /**
      * Definir filtro de visibilidade
      */
@@ -0,0 +1,98 @@
+/**
+ * SessionEvents - Eventos da sessao em tempo real (Server-Sent Events)
+ *
+ * Uma so ligacao por pagina a /sessao/<id>/eventos, partilhada pelo
+ * rastreador de combate, mapa tactico e TimeTracker. O servidor empurra
+ * pequenos eventos tipados em vez de cada componente fazer polling:
+ *
+ * - 'log': nova entrada no log de combate
+ * - 'participant': participantes/turno alterados (campos alterados, ou
+ *   lista completa com replace=true)
+ * - 'entity': entidade do mapa movida/alterada/removida
+ * - 'time': estado completo dos sistemas de tempo
+ * - 'reset': eventos perdidos (servidor reiniciado, desligado muito tempo);
+ *   recarregar o estado completo
+ *
+ * O EventSource volta a ligar-se sozinho e envia o Last-Event-ID; o servidor
+ * reenvia os eventos em falta. Na primeira ligacao, window.sessionEventsSince
+ * (ID do ultimo evento quando a pagina foi gerada) evita perder eventos
+ * publicados entre gerar a pagina e abrir a ligacao.
+ */
+
+class SessionEvents {
+    constructor(sessionId, since) {
+        this.sessionId = sessionId;
+        this.since = since || null;
+        this.source = null;
+        this.handlers = {};
+    }
+
+    /**
+     * Ligacao partilhada para uma sessao (criada na primeira chamada)
+     */
+    static forSession(sessionId) {
+        SessionEvents.instances = SessionEvents.instances || {};
+        if (!SessionEvents.instances[sessionId]) {
+            SessionEvents.instances[sessionId] = new SessionEvents(sessionId, window.sessionEventsSince);
+        }
+        return SessionEvents.instances[sessionId];
+    }
+
+    /**
+     * Verificar se o browser suporta Server-Sent Events
+     */
+    static isSupported() {
+        return typeof window.EventSource !== 'undefined';
+    }
+
+    /**
+     * Registar handler para um tipo de evento (abre a ligacao se preciso)
+     */
+    on(type, handler) {
+        if (!this.handlers[type]) {
+            this.handlers[type] = [];
+            if (this.source) {
+                this.listen(type);
+            }
+        }
+        this.handlers[type].push(handler);
+        this.connect();
+        return this;
+    }
+
+    connect() {
+        if (this.source || !SessionEvents.isSupported()) {
+            return;
+        }
+
+        let url = `/sessao/${this.sessionId}/eventos`;
+        if (this.since) {
+            url += `?desde=${encodeURIComponent(this.since)}`;
+        }
+        this.source = new EventSource(url);
+        Object.keys(this.handlers).forEach(type => this.listen(type));
+    }
+
+    listen(type) {
+        this.source.addEventListener(type, (event) => {
+            let data = {};
+            try {
+                data = event.data ? JSON.parse(event.data) : {};
+            } catch (error) {
+                console.error('Evento da sessao invalido:', error);
+                return;
+            }
+            (this.handlers[type] || []).forEach(handler => handler(data));
+        });
+    }
+
+    /**
+     * Fechar a ligacao
+     */
+    close() {
+        if (this.source) {
+            this.source.close();
+            this.source = null;
+        }
+    }
+}
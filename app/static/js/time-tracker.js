@@ -7,7 +7,9 @@
  * 3. Turnos de Exploracao: 10 minutos por turno
  * 4. Tempo no Jogo: Hora do dia, dias decorridos, descansos
  *
- * Auto-actualiza a cada segundo quando o cronometro esta activo.
+ * Auto-actualiza a cada segundo quando o cronometro esta activo. Com
+ * SessionEvents (SSE) disponivel, o estado chega por eventos 'time' e os
+ * cronometros avancam localmente, sem pedidos ao servidor a cada segundo.
  */
 
 class TimeTracker {
@@ -25,6 +27,8 @@ class TimeTracker {
         // Estado do tracker
         this.isRunning = false;
         this.updateTimer = null;
+        this.receivedAt = null;  // Quando lastData chegou (para avancar localmente)
+        this.liveEvents = typeof SessionEvents !== 'undefined' && SessionEvents.isSupported();
 
         // Elementos DOM (podem ser configurados depois)
         this.elements = {
@@ -38,6 +42,24 @@ class TimeTracker {
         // Cache dos ultimos dados
         this.lastData = null;
 
+        // Estado empurrado pelo servidor (alteracoes feitas noutras janelas)
+        if (this.liveEvents) {
+            SessionEvents.forSession(sessionId)
+                .on('time', (data) => {
+                    this.applyStatus(data);
+                    if (data.session_running && this.options.autoUpdate) {
+                        this.startAutoUpdate();
+                    }
+                })
+                .on('participant', (data) => {
+                    // Ronda de combate mudou (tempo de combate)
+                    if (data.ronda !== undefined || data.replace) {
+                        this.update();
+                    }
+                })
+                .on('reset', () => this.update());
+        }
+
         // Iniciar auto-update se configurado
         if (this.options.autoUpdate) {
             this.startAutoUpdate();
@@ -133,16 +155,7 @@ class TimeTracker {
             }
 
             const data = await response.json();
-            this.lastData = data;
-            this.isRunning = data.session_running;
-
-            // Actualizar elementos DOM se configurados
-            this.updateDOM(data);
-
-            // Callback personalizado
-            if (this.options.onUpdate) {
-                this.options.onUpdate(data);
-            }
+            this.applyStatus(data);
 
             return data;
         } catch (error) {
@@ -154,6 +167,50 @@ class TimeTracker {
         }
     }
 
+    /**
+     * Guardar e mostrar um estado do tempo (de update() ou de um evento 'time')
+     */
+    applyStatus(data) {
+        this.lastData = data;
+        this.receivedAt = Date.now();
+        this.isRunning = data.session_running;
+
+        // Actualizar elementos DOM se configurados
+        this.updateDOM(data);
+
+        // Callback personalizado
+        if (this.options.onUpdate) {
+            this.options.onUpdate(data);
+        }
+    }
+
+    /**
+     * Avancar localmente os cronometros a partir do ultimo estado recebido
+     */
+    tick() {
+        if (!this.lastData) {
+            return;
+        }
+
+        const elapsed = Math.floor((Date.now() - this.receivedAt) / 1000);
+        const data = JSON.parse(JSON.stringify(this.lastData));
+
+        if (data.session_running) {
+            const total = data.session_duration.total_seconds + elapsed;
+            data.session_duration.total_seconds = total;
+            data.session_duration.hours = Math.floor(total / 3600);
+            data.session_duration.minutes = Math.floor((total % 3600) / 60);
+            data.session_duration.formatted = `${data.session_duration.hours}h ${data.session_duration.minutes}m`;
+        }
+        if (data.combat_time.real_running) {
+            const real = data.combat_time.real_seconds + elapsed;
+            data.combat_time.real_seconds = real;
+            data.combat_time.real_formatted = `${Math.floor(real / 60)}m ${real % 60}s`;
+        }
+
+        this.updateDOM(data);
+    }
+
     /**
      * Actualizar elementos DOM com dados de tempo
      */
@@ -320,7 +377,11 @@ class TimeTracker {
         }
 
         this.updateTimer = setInterval(() => {
-            this.update();
+            if (this.liveEvents) {
+                this.tick();
+            } else {
+                this.update();
+            }
         }, this.options.updateInterval);
     }
 
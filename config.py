@@ -12,6 +12,20 @@ class Config:
 
     # Pasta de dados de aventuras
     QUESTS_FOLDER = os.path.join(basedir, 'app', 'data', 'quests')
+    # Manifesto de aventuras (índice leve ao lado da pasta de aventuras)
+    QUESTS_MANIFEST = os.path.join(basedir, 'app', 'data', 'quests.manifest.json')
+    # Cache compilada de aventuras (Quests já processadas, invalidada por hash)
+    QUESTS_CACHE_FILE = os.path.join(basedir, 'instance', 'quests.cache')
+
+    # Estado de combate em memória com escrita periódica para SQLite (write-behind)
+    COMBAT_WRITE_BEHIND = os.environ.get('COMBAT_WRITE_BEHIND', '').lower() in ('1', 'true', 'sim')
+    COMBAT_FLUSH_INTERVAL = float(os.environ.get('COMBAT_FLUSH_INTERVAL', 2.0))
+    # Journal das alterações ainda não escritas (recuperado se o processo morrer)
+    COMBAT_JOURNAL_FOLDER = os.path.join(basedir, 'instance', 'combat_journal')
+
+    # Eventos da sessão por Server-Sent Events (/sessao/<id>/eventos)
+    SSE_BUFFER_SIZE = 256  # Eventos guardados por sessão para retomar (Last-Event-ID)
+    SSE_HEARTBEAT_SECONDS = 15  # Comentario enviado para manter a ligacao aberta
 
     # Configurações de idioma
     BABEL_DEFAULT_LOCALE = 'pt_PT'
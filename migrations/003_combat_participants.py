@@ -0,0 +1,208 @@
+"""
+Migração: Tabela combat_participants
+
+Este script:
+1. Cria a tabela combat_participants (uma linha por participante do combate)
+   com índice por (combat_id, participant_id)
+2. Copia os participantes do blob session_combats.participantes_json para a
+   nova tabela e esvazia o blob
+
+Com uma linha por participante, aplicar dano passa a ser um UPDATE de uma só
+linha em vez de reescrever o JSON de todo o combate.
+
+Como executar:
+    python migrations/003_combat_participants.py
+"""
+
+import sqlite3
+import json
+import os
+
+# Caminho para a base de dados
+DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'instance', 'app.db')
+
+# Campos com coluna própria; o resto vai para dados_json
+CAMPOS = ('id', 'nome', 'tipo', 'hp_atual', 'hp_max', 'ac', 'iniciativa', 'condicoes')
+
+
+def _int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def migrate():
+    """Executa a migração."""
+    if not os.path.exists(DB_PATH):
+        print(f"❌ Base de dados não encontrada: {DB_PATH}")
+        print("   Execute a aplicação primeiro para criar a base de dados.")
+        return False
+
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+
+        print("\n=== 1. Criar tabela combat_participants ===")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='combat_participants'")
+        if cursor.fetchone():
+            print("✓ Tabela combat_participants já existe")
+        else:
+            cursor.execute("""
+                CREATE TABLE combat_participants (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    combat_id INTEGER NOT NULL,
+                    participant_id VARCHAR(100) NOT NULL,
+                    ordem INTEGER DEFAULT 0,
+                    nome VARCHAR(200) DEFAULT '',
+                    tipo VARCHAR(50) DEFAULT 'monstro',
+                    hp_atual INTEGER DEFAULT 0,
+                    hp_max INTEGER DEFAULT 0,
+                    ac INTEGER DEFAULT 10,
+                    iniciativa INTEGER DEFAULT 0,
+                    condicoes_json TEXT DEFAULT '[]',
+                    dados_json TEXT DEFAULT '{}',
+                    FOREIGN KEY (combat_id) REFERENCES session_combats(id) ON DELETE CASCADE
+                )
+            """)
+            print("✓ Tabela combat_participants criada com sucesso!")
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS ix_combat_participants_combat_participant
+            ON combat_participants (combat_id, participant_id)
+        """)
+        print("✓ Índice ix_combat_participants_combat_participant criado")
+
+        print("\n=== 2. Copiar participantes de participantes_json ===")
+
+        cursor.execute("SELECT id, participantes_json FROM session_combats")
+        combates = cursor.fetchall()
+        migrados = 0
+
+        for combat_id, blob in combates:
+            try:
+                participantes = json.loads(blob or '[]')
+            except (json.JSONDecodeError, TypeError):
+                print(f"⚠️  Combate {combat_id}: JSON inválido, ignorado")
+                continue
+            if not participantes:
+                continue
+
+            cursor.execute("SELECT COUNT(*) FROM combat_participants WHERE combat_id = ?", (combat_id,))
+            if cursor.fetchone()[0]:
+                print(f"✓ Combate {combat_id} já migrado")
+                continue
+
+            for ordem, p in enumerate(participantes):
+                extra = {k: v for k, v in p.items() if k not in CAMPOS}
+                cursor.execute("""
+                    INSERT INTO combat_participants
+                        (combat_id, participant_id, ordem, nome, tipo, hp_atual, hp_max,
+                         ac, iniciativa, condicoes_json, dados_json)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    combat_id,
+                    str(p.get('id', '')),
+                    ordem,
+                    p.get('nome') or '',
+                    p.get('tipo') or 'monstro',
+                    _int(p.get('hp_atual')),
+                    _int(p.get('hp_max')),
+                    _int(p.get('ac'), 10),
+                    _int(p.get('iniciativa')),
+                    json.dumps(p.get('condicoes') or [], ensure_ascii=False),
+                    json.dumps(extra, ensure_ascii=False)
+                ))
+
+            cursor.execute("UPDATE session_combats SET participantes_json = '[]' WHERE id = ?", (combat_id,))
+            migrados += 1
+            print(f"✓ Combate {combat_id}: {len(participantes)} participante(s) copiado(s)")
+
+        conn.commit()
+
+        # Verificar resultado final
+        print("\n=== Verificação Final ===")
+        cursor.execute("SELECT COUNT(*) FROM combat_participants")
+        print(f"Combates migrados: {migrados}")
+        print(f"Linhas em combat_participants: {cursor.fetchone()[0]}")
+
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao executar migração: {e}")
+        return False
+
+
+def rollback():
+    """Reverte a migração (volta a guardar os participantes no blob JSON)."""
+    print("⚠️  AVISO: Rollback de combat_participants")
+    print("   Os participantes voltam para session_combats.participantes_json")
+
+    response = input("Tens a certeza? (yes/no): ")
+    if response.lower() != 'yes':
+        print("Rollback cancelado")
+        return False
+
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT combat_id, participant_id, nome, tipo, hp_atual, hp_max, ac,
+                   iniciativa, condicoes_json, dados_json
+            FROM combat_participants
+            ORDER BY combat_id, ordem
+        """)
+        por_combate = {}
+        for row in cursor.fetchall():
+            combat_id, participant_id, nome, tipo, hp_atual, hp_max, ac, iniciativa, condicoes, dados = row
+            participante = json.loads(dados or '{}')
+            participante.update({
+                'id': participant_id,
+                'nome': nome,
+                'tipo': tipo,
+                'hp_atual': hp_atual,
+                'hp_max': hp_max,
+                'ac': ac,
+                'iniciativa': iniciativa,
+                'condicoes': json.loads(condicoes or '[]')
+            })
+            por_combate.setdefault(combat_id, []).append(participante)
+
+        for combat_id, participantes in por_combate.items():
+            cursor.execute(
+                "UPDATE session_combats SET participantes_json = ? WHERE id = ?",
+                (json.dumps(participantes, ensure_ascii=False), combat_id)
+            )
+        print(f"✓ {len(por_combate)} combate(s) repostos no blob JSON")
+
+        cursor.execute("DROP TABLE IF EXISTS combat_participants")
+        print("✓ Tabela combat_participants apagada")
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao executar rollback: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("MIGRAÇÃO 003: Tabela combat_participants")
+    print("=" * 60)
+    print()
+
+    success = migrate()
+
+    print()
+    if success:
+        print("✓ Migração concluída com sucesso!")
+    else:
+        print("❌ Migração falhou.")
+
+    print()
+    print("=" * 60)
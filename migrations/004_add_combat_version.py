@@ -0,0 +1,85 @@
+"""
+Migração: Adicionar campo versao à tabela session_combats
+
+Este script adiciona o campo versao à tabela session_combats. A versão é
+incrementada a cada alteração do combate e permite rejeitar patches feitos
+sobre um estado desatualizado (ex: dois separadores abertos).
+
+Como executar:
+    python migrations/004_add_combat_version.py
+"""
+
+import sqlite3
+import os
+
+# Caminho para a base de dados
+DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'instance', 'app.db')
+
+
+def migrate():
+    """Executa a migração."""
+    if not os.path.exists(DB_PATH):
+        print(f"❌ Base de dados não encontrada: {DB_PATH}")
+        print("   Execute a aplicação primeiro para criar a base de dados.")
+        return False
+
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+
+        # Verificar se a coluna já existe
+        cursor.execute("PRAGMA table_info(session_combats)")
+        columns = [column[1] for column in cursor.fetchall()]
+
+        if 'versao' in columns:
+            print("✓ Campo versao já existe na tabela session_combats")
+            conn.close()
+            return True
+
+        # Adicionar a coluna
+        print("Adicionando campo versao à tabela session_combats...")
+        cursor.execute("""
+            ALTER TABLE session_combats
+            ADD COLUMN versao INTEGER NOT NULL DEFAULT 0
+        """)
+
+        conn.commit()
+        print("✓ Campo versao adicionado com sucesso!")
+
+        # Verificar
+        cursor.execute("PRAGMA table_info(session_combats)")
+        columns = [column[1] for column in cursor.fetchall()]
+        print(f"  Colunas da tabela: {', '.join(columns)}")
+
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao executar migração: {e}")
+        return False
+
+
+def rollback():
+    """Reverte a migração (remove o campo versao)."""
+    print("⚠️  AVISO: SQLite não suporta DROP COLUMN diretamente.")
+    print("   Para reverter, seria necessário recriar a tabela.")
+    print("   Não recomendado a menos que seja absolutamente necessário.")
+    return False
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("MIGRAÇÃO 004: Adicionar campo versao a session_combats")
+    print("=" * 60)
+    print()
+
+    success = migrate()
+
+    print()
+    if success:
+        print("✓ Migração concluída com sucesso!")
+    else:
+        print("❌ Migração falhou.")
+
+    print()
+    print("=" * 60)
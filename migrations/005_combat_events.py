@@ -0,0 +1,183 @@
+"""
+Migração: Eventos de combate e snapshots
+
+Este script:
+1. Cria a tabela combat_snapshots (estado completo depois de um evento)
+2. Cria o índice ix_combat_logs_combat_action em combat_logs (combat_id, action_type)
+3. Regista um evento base ('state' com 'restore') para cada combate existente,
+   com o estado atual, para o histórico poder ser reconstruído a partir dele
+
+Como executar:
+    python migrations/005_combat_events.py
+"""
+
+import sqlite3
+import json
+import os
+
+# Caminho para a base de dados
+DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'instance', 'app.db')
+
+# Campos com coluna própria em combat_participants
+CAMPOS = ('participant_id', 'nome', 'tipo', 'hp_atual', 'hp_max', 'ac', 'iniciativa', 'condicoes_json', 'dados_json')
+
+
+def _participantes(cursor, combat_id, blob):
+    """Participantes atuais de um combate (tabela combat_participants ou blob legado)."""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='combat_participants'")
+    if cursor.fetchone():
+        cursor.execute(f"""
+            SELECT {', '.join(CAMPOS)} FROM combat_participants
+            WHERE combat_id = ? ORDER BY ordem
+        """, (combat_id,))
+        rows = cursor.fetchall()
+        if rows:
+            participantes = []
+            for participant_id, nome, tipo, hp_atual, hp_max, ac, iniciativa, condicoes, dados in rows:
+                participante = json.loads(dados or '{}')
+                participante.update({
+                    'id': participant_id,
+                    'nome': nome,
+                    'tipo': tipo,
+                    'hp_atual': hp_atual,
+                    'hp_max': hp_max,
+                    'ac': ac,
+                    'iniciativa': iniciativa,
+                    'condicoes': json.loads(condicoes or '[]')
+                })
+                participantes.append(participante)
+            return participantes
+    try:
+        return json.loads(blob or '[]')
+    except (json.JSONDecodeError, TypeError):
+        return []
+
+
+def migrate():
+    """Executa a migração."""
+    if not os.path.exists(DB_PATH):
+        print(f"❌ Base de dados não encontrada: {DB_PATH}")
+        print("   Execute a aplicação primeiro para criar a base de dados.")
+        return False
+
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+
+        print("\n=== 1. Criar tabela combat_snapshots ===")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='combat_snapshots'")
+        if cursor.fetchone():
+            print("✓ Tabela combat_snapshots já existe")
+        else:
+            cursor.execute("""
+                CREATE TABLE combat_snapshots (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    combat_id INTEGER NOT NULL,
+                    event_id INTEGER NOT NULL,
+                    ronda INTEGER DEFAULT 1,
+                    turno INTEGER DEFAULT 0,
+                    participantes_json TEXT NOT NULL DEFAULT '[]',
+                    criado_em DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cursor.execute("CREATE INDEX ix_combat_snapshots_combat_id ON combat_snapshots (combat_id)")
+            print("✓ Tabela combat_snapshots criada com sucesso!")
+
+        print("\n=== 2. Índice de eventos em combat_logs ===")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS ix_combat_logs_combat_action
+            ON combat_logs (combat_id, action_type)
+        """)
+        print("✓ Índice ix_combat_logs_combat_action criado")
+
+        print("\n=== 3. Eventos base dos combates existentes ===")
+        cursor.execute("SELECT id, session_id, ronda_atual, turno_atual, participantes_json FROM session_combats")
+        criados = 0
+        for combat_id, session_id, ronda, turno, blob in cursor.fetchall():
+            cursor.execute(
+                "SELECT 1 FROM combat_logs WHERE combat_id = ? AND action_type = 'state' LIMIT 1",
+                (combat_id,)
+            )
+            if cursor.fetchone():
+                continue
+
+            details = {
+                'operations': [{
+                    'op': 'restore',
+                    'participants': _participantes(cursor, combat_id, blob),
+                    'ronda': ronda or 1,
+                    'turno': turno or 0
+                }],
+                'base': True
+            }
+            cursor.execute("""
+                INSERT INTO combat_logs
+                    (session_id, combat_id, timestamp, ronda, turno, actor_id, actor_nome, action_type, details_json, message)
+                VALUES (?, ?, CURRENT_TIMESTAMP, ?, ?, 'sistema', 'Sistema', 'state', ?, 'Estado do combate atualizado')
+            """, (session_id, combat_id, ronda or 1, turno or 0, json.dumps(details, ensure_ascii=False)))
+            criados += 1
+            print(f"✓ Combate {combat_id}: evento base criado")
+
+        conn.commit()
+
+        # Verificar resultado final
+        print("\n=== Verificação Final ===")
+        print(f"Eventos base criados: {criados}")
+
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao executar migração: {e}")
+        return False
+
+
+def rollback():
+    """Reverte a migração."""
+    print("⚠️  AVISO: Rollback de eventos de combate")
+    print("   Isto irá APAGAR os snapshots e os eventos de estado!")
+
+    response = input("Tens a certeza? (yes/no): ")
+    if response.lower() != 'yes':
+        print("Rollback cancelado")
+        return False
+
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+
+        cursor.execute("DROP TABLE IF EXISTS combat_snapshots")
+        print("✓ Tabela combat_snapshots apagada")
+
+        cursor.execute("DELETE FROM combat_logs WHERE action_type IN ('state', 'undo', 'redo')")
+        print(f"✓ {cursor.rowcount} evento(s) de estado apagado(s)")
+
+        cursor.execute("DROP INDEX IF EXISTS ix_combat_logs_combat_action")
+        print("✓ Índice ix_combat_logs_combat_action apagado")
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao executar rollback: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("MIGRAÇÃO 005: Eventos de combate e snapshots")
+    print("=" * 60)
+    print()
+
+    success = migrate()
+
+    print()
+    if success:
+        print("✓ Migração concluída com sucesso!")
+    else:
+        print("❌ Migração falhou.")
+
+    print()
+    print("=" * 60)
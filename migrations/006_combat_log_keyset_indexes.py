@@ -0,0 +1,90 @@
+"""
+Migração: Índices para paginação do combat log por ID
+
+Este script cria os índices usados pela paginação keyset do combat log
+(?since_id= / ?before_id=): cada página é uma leitura do índice a partir
+do cursor em vez de ordenar todas as entradas da sessão.
+
+1. ix_combat_logs_session_id em combat_logs (session_id, id)
+2. ix_combat_logs_session_combat_id em combat_logs (session_id, combat_id, id)
+
+Como executar:
+    python migrations/006_combat_log_keyset_indexes.py
+"""
+
+import sqlite3
+import os
+
+# Caminho para a base de dados
+DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'instance', 'app.db')
+
+INDICES = {
+    'ix_combat_logs_session_id': '(session_id, id)',
+    'ix_combat_logs_session_combat_id': '(session_id, combat_id, id)',
+}
+
+
+def migrate():
+    """Executa a migração."""
+    if not os.path.exists(DB_PATH):
+        print(f"❌ Base de dados não encontrada: {DB_PATH}")
+        print("   Execute a aplicação primeiro para criar a base de dados.")
+        return False
+
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+
+        for nome, colunas in INDICES.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {nome} ON combat_logs {colunas}")
+            print(f"✓ Índice {nome} {colunas} criado")
+
+        conn.commit()
+
+        # Verificar
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='combat_logs'")
+        print(f"  Índices da tabela: {', '.join(row[0] for row in cursor.fetchall())}")
+
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao executar migração: {e}")
+        return False
+
+
+def rollback():
+    """Reverte a migração (remove os índices)."""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+
+        for nome in INDICES:
+            cursor.execute(f"DROP INDEX IF EXISTS {nome}")
+            print(f"✓ Índice {nome} apagado")
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao executar rollback: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("MIGRAÇÃO 006: Índices de paginação do combat log")
+    print("=" * 60)
+    print()
+
+    success = migrate()
+
+    print()
+    if success:
+        print("✓ Migração concluída com sucesso!")
+    else:
+        print("❌ Migração falhou.")
+
+    print()
+    print("=" * 60)
@@ -0,0 +1,86 @@
+"""
+Migração: Adicionar campo efeitos_json à tabela session_combats
+
+Este script adiciona o campo efeitos_json à tabela session_combats: a fila
+de expiração das condições com duração (chave ronda/turno). A duração de
+cada condição fica nos campos extra do participante; a fila é só um índice
+e, enquanto for NULL, é reconstruída a partir deles.
+
+Como executar:
+    python migrations/007_add_condition_schedule.py
+"""
+
+import sqlite3
+import os
+
+# Caminho para a base de dados
+DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'instance', 'app.db')
+
+
+def migrate():
+    """Executa a migração."""
+    if not os.path.exists(DB_PATH):
+        print(f"❌ Base de dados não encontrada: {DB_PATH}")
+        print("   Execute a aplicação primeiro para criar a base de dados.")
+        return False
+
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+
+        # Verificar se a coluna já existe
+        cursor.execute("PRAGMA table_info(session_combats)")
+        columns = [column[1] for column in cursor.fetchall()]
+
+        if 'efeitos_json' in columns:
+            print("✓ Campo efeitos_json já existe na tabela session_combats")
+            conn.close()
+            return True
+
+        # Adicionar a coluna
+        print("Adicionando campo efeitos_json à tabela session_combats...")
+        cursor.execute("""
+            ALTER TABLE session_combats
+            ADD COLUMN efeitos_json TEXT
+        """)
+
+        conn.commit()
+        print("✓ Campo efeitos_json adicionado com sucesso!")
+
+        # Verificar
+        cursor.execute("PRAGMA table_info(session_combats)")
+        columns = [column[1] for column in cursor.fetchall()]
+        print(f"  Colunas da tabela: {', '.join(columns)}")
+
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao executar migração: {e}")
+        return False
+
+
+def rollback():
+    """Reverte a migração (remove o campo efeitos_json)."""
+    print("⚠️  AVISO: SQLite não suporta DROP COLUMN diretamente.")
+    print("   Para reverter, seria necessário recriar a tabela.")
+    print("   Não recomendado a menos que seja absolutamente necessário.")
+    return False
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("MIGRAÇÃO 007: Adicionar campo efeitos_json a session_combats")
+    print("=" * 60)
+    print()
+
+    success = migrate()
+
+    print()
+    if success:
+        print("✓ Migração concluída com sucesso!")
+    else:
+        print("❌ Migração falhou.")
+
+    print()
+    print("=" * 60)
@@ -0,0 +1,161 @@
+"""
+Migração: Condições como máscara de bits
+
+Este script:
+1. Adiciona o campo condicoes_mask (INTEGER) a session_players e combat_participants
+2. Preenche-o a partir das listas JSON (session_players.condicoes,
+   combat_participants.condicoes_json); cada condição do CONDICOES_5E é um
+   bit, pela ordem do registo
+
+As colunas JSON ficam na base de dados mas deixam de ser usadas (o rollback
+volta a preenchê-las a partir da máscara). Condições que não existem no
+CONDICOES_5E não têm bit: ficam de fora da máscara e a migração lista as
+linhas afetadas (tabela, id e nomes) para correção manual.
+
+Como executar:
+    python migrations/008_condition_bitmask.py
+"""
+
+import sqlite3
+import json
+import os
+import unicodedata
+
+# Caminho para a base de dados
+DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'instance', 'app.db')
+
+# Ordem das condições no CONDICOES_5E (bit 0, 1, 2, ...)
+CONDICOES = (
+    'agarrado', 'amedrontado', 'atordoado', 'cego', 'enfeiticado',
+    'envenenado', 'exausto', 'incapacitado', 'inconsciente', 'invisivel',
+    'paralisado', 'petrificado', 'propenso', 'restringido', 'surdo', 'concentrando'
+)
+BITS = {chave: 1 << i for i, chave in enumerate(CONDICOES)}
+
+# Tabela: coluna JSON antiga
+TABELAS = {
+    'session_players': 'condicoes',
+    'combat_participants': 'condicoes_json',
+}
+
+
+def _mascara(valor):
+    """Máscara de uma lista JSON de condições e lista dos nomes sem bit."""
+    try:
+        nomes = json.loads(valor or '[]')
+    except (json.JSONDecodeError, TypeError):
+        return 0, [str(valor)]
+    if not isinstance(nomes, list):
+        return 0, [str(valor)]
+    mascara = 0
+    desconhecidas = []
+    for nome in nomes:
+        chave = unicodedata.normalize('NFKD', str(nome)).encode('ascii', 'ignore').decode()
+        bit = BITS.get(chave.strip().lower().replace(' ', '_'))
+        if bit is None:
+            desconhecidas.append(str(nome))
+        else:
+            mascara |= bit
+    return mascara, desconhecidas
+
+
+def _colunas(cursor, tabela):
+    cursor.execute(f"PRAGMA table_info({tabela})")
+    return [column[1] for column in cursor.fetchall()]
+
+
+def migrate():
+    """Executa a migração."""
+    if not os.path.exists(DB_PATH):
+        print(f"❌ Base de dados não encontrada: {DB_PATH}")
+        print("   Execute a aplicação primeiro para criar a base de dados.")
+        return False
+
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+
+        for tabela, coluna_json in TABELAS.items():
+            print(f"\n=== {tabela} ===")
+            colunas = _colunas(cursor, tabela)
+            if not colunas:
+                print(f"✓ Tabela {tabela} não existe (nada a fazer)")
+                continue
+
+            if 'condicoes_mask' in colunas:
+                print(f"✓ Campo condicoes_mask já existe na tabela {tabela}")
+                continue
+
+            cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN condicoes_mask INTEGER NOT NULL DEFAULT 0")
+            print("✓ Campo condicoes_mask adicionado")
+
+            if coluna_json in colunas:
+                cursor.execute(f"SELECT id, {coluna_json} FROM {tabela}")
+                atualizadas = 0
+                por_mapear = []
+                for row_id, valor in cursor.fetchall():
+                    mascara, desconhecidas = _mascara(valor)
+                    if mascara:
+                        cursor.execute(f"UPDATE {tabela} SET condicoes_mask = ? WHERE id = ?", (mascara, row_id))
+                        atualizadas += 1
+                    if desconhecidas:
+                        por_mapear.append((row_id, desconhecidas))
+                print(f"✓ {atualizadas} linha(s) com condições convertidas")
+                if por_mapear:
+                    print(f"⚠️  {len(por_mapear)} linha(s) com condições sem bit (ficam de fora da máscara):")
+                    for row_id, desconhecidas in por_mapear:
+                        print(f"   {tabela} id={row_id}: {', '.join(desconhecidas)}")
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao executar migração: {e}")
+        return False
+
+
+def rollback():
+    """Reverte a migração (volta a preencher as colunas JSON a partir da máscara)."""
+    print("⚠️  AVISO: SQLite não suporta DROP COLUMN em todas as versões.")
+    print("   O campo condicoes_mask fica; as colunas JSON são atualizadas a partir dele.")
+
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+
+        for tabela, coluna_json in TABELAS.items():
+            colunas = _colunas(cursor, tabela)
+            if 'condicoes_mask' not in colunas or coluna_json not in colunas:
+                continue
+            cursor.execute(f"SELECT id, condicoes_mask FROM {tabela}")
+            for row_id, mascara in cursor.fetchall():
+                condicoes = [chave for chave, bit in BITS.items() if (mascara or 0) & bit]
+                cursor.execute(f"UPDATE {tabela} SET {coluna_json} = ? WHERE id = ?", (json.dumps(condicoes), row_id))
+            print(f"✓ {tabela}.{coluna_json} atualizado")
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao executar rollback: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("MIGRAÇÃO 008: Condições como máscara de bits")
+    print("=" * 60)
+    print()
+
+    success = migrate()
+
+    print()
+    if success:
+        print("✓ Migração concluída com sucesso!")
+    else:
+        print("❌ Migração falhou.")
+
+    print()
+    print("=" * 60)
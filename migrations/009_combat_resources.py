@@ -0,0 +1,142 @@
+"""
+Migração: Tabela combat_resources (action economy e spell slots)
+
+Este script:
+1. Cria a tabela combat_resources: uma linha por combate, participante e
+   recurso (action, bonus_action, reaction, movement, slot_1 ... slot_9),
+   com maximo e usados
+2. Copia o estado guardado nos campos JSON action_economy_json e
+   spell_slots_json de session_combats (migração 002) para a tabela
+
+Os campos JSON ficam na base de dados mas deixam de ser usados.
+
+Como executar:
+    python migrations/009_combat_resources.py
+"""
+
+import sqlite3
+import json
+import os
+
+# Caminho para a base de dados
+DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'instance', 'app.db')
+
+ACTION_ECONOMY = ('action', 'bonus_action', 'reaction', 'movement')
+
+
+def _carregar(valor):
+    try:
+        dados = json.loads(valor or '{}')
+    except (json.JSONDecodeError, TypeError):
+        return {}
+    return dados if isinstance(dados, dict) else {}
+
+
+def migrate():
+    """Executa a migração."""
+    if not os.path.exists(DB_PATH):
+        print(f"❌ Base de dados não encontrada: {DB_PATH}")
+        print("   Execute a aplicação primeiro para criar a base de dados.")
+        return False
+
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+
+        print("\n=== 1. Criar tabela combat_resources ===")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='combat_resources'")
+        if cursor.fetchone():
+            print("✓ Tabela combat_resources já existe")
+            conn.close()
+            return True
+
+        cursor.execute("""
+            CREATE TABLE combat_resources (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                combat_id INTEGER NOT NULL,
+                participant_id VARCHAR(100) NOT NULL,
+                recurso VARCHAR(20) NOT NULL,
+                maximo INTEGER NOT NULL DEFAULT 1,
+                usados INTEGER NOT NULL DEFAULT 0,
+                FOREIGN KEY (combat_id) REFERENCES session_combats(id),
+                CONSTRAINT uq_combat_resources_participant_recurso UNIQUE (combat_id, participant_id, recurso)
+            )
+        """)
+        print("✓ Tabela combat_resources criada com sucesso!")
+
+        print("\n=== 2. Copiar action economy e spell slots ===")
+
+        cursor.execute("PRAGMA table_info(session_combats)")
+        colunas = [column[1] for column in cursor.fetchall()]
+        if 'action_economy_json' not in colunas or 'spell_slots_json' not in colunas:
+            print("✓ Sem campos JSON para copiar")
+        else:
+            cursor.execute("SELECT id, action_economy_json, spell_slots_json FROM session_combats")
+            linhas = []
+            for combat_id, economy_json, slots_json in cursor.fetchall():
+                for participant_id, acoes in _carregar(economy_json).items():
+                    for recurso in ACTION_ECONOMY:
+                        usada = bool(acoes.get(recurso)) if isinstance(acoes, dict) else False
+                        linhas.append((combat_id, str(participant_id), recurso, 1, int(usada)))
+                for participant_id, niveis in _carregar(slots_json).items():
+                    for nivel, slot in (niveis.items() if isinstance(niveis, dict) else []):
+                        if str(nivel).isdigit() and isinstance(slot, dict):
+                            linhas.append((combat_id, str(participant_id), f'slot_{int(nivel)}',
+                                           int(slot.get('max', 0)), int(slot.get('used', 0))))
+
+            cursor.executemany("""
+                INSERT INTO combat_resources (combat_id, participant_id, recurso, maximo, usados)
+                VALUES (?, ?, ?, ?, ?)
+            """, linhas)
+            print(f"✓ {len(linhas)} recurso(s) copiado(s)")
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao executar migração: {e}")
+        return False
+
+
+def rollback():
+    """Reverte a migração."""
+    print("⚠️  AVISO: Rollback de combat_resources")
+    print("   Isto irá APAGAR a tabela combat_resources (os campos JSON não são atualizados)!")
+
+    response = input("Tens a certeza? (yes/no): ")
+    if response.lower() != 'yes':
+        print("Rollback cancelado")
+        return False
+
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute("DROP TABLE IF EXISTS combat_resources")
+        print("✓ Tabela combat_resources apagada")
+        conn.commit()
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao executar rollback: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("MIGRAÇÃO 009: Tabela combat_resources")
+    print("=" * 60)
+    print()
+
+    success = migrate()
+
+    print()
+    if success:
+        print("✓ Migração concluída com sucesso!")
+    else:
+        print("❌ Migração falhou.")
+
+    print()
+    print("=" * 60)
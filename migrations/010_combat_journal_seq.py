@@ -0,0 +1,76 @@
+"""
+Migração: Sequência do journal de combate
+
+Este script:
+1. Adiciona o campo journal_seq (INTEGER) a session_combats: a última
+   entrada do journal do write-behind (CombatStateStore) já escrita na base
+   de dados, para que uma entrada nunca seja reaplicada depois de um crash
+
+Journals antigos (sem 'seq') são ignorados ao reaplicar; escreva os
+combates em memória (terminar o processo normalmente) antes de atualizar.
+
+Como executar:
+    python migrations/010_combat_journal_seq.py
+"""
+
+import sqlite3
+import os
+
+# Caminho para a base de dados
+DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'instance', 'app.db')
+
+
+def migrate():
+    """Executa a migração."""
+    if not os.path.exists(DB_PATH):
+        print(f"❌ Base de dados não encontrada: {DB_PATH}")
+        print("   Execute a aplicação primeiro para criar a base de dados.")
+        return False
+
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+
+        print("\n=== Adicionar journal_seq a session_combats ===")
+
+        cursor.execute("PRAGMA table_info(session_combats)")
+        colunas = [column[1] for column in cursor.fetchall()]
+
+        if 'journal_seq' in colunas:
+            print("✓ Campo journal_seq já existe")
+        else:
+            cursor.execute("ALTER TABLE session_combats ADD COLUMN journal_seq INTEGER NOT NULL DEFAULT 0")
+            print("✓ Campo journal_seq adicionado")
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao executar migração: {e}")
+        return False
+
+
+def rollback():
+    """Reverte a migração."""
+    print("⚠️  AVISO: SQLite não suporta DROP COLUMN em todas as versões.")
+    print("   O campo journal_seq fica na tabela mas deixa de ser usado.")
+    return True
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("MIGRAÇÃO 010: Sequência do journal de combate")
+    print("=" * 60)
+    print()
+
+    success = migrate()
+
+    print()
+    if success:
+        print("✓ Migração concluída com sucesso!")
+    else:
+        print("❌ Migração falhou.")
+
+    print()
+    print("=" * 60)
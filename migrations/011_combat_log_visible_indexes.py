@@ -0,0 +1,111 @@
+"""
+Migração: Índices parciais para a paginação do combat log
+
+Os eventos de estado ('state', um por alteração) e de desfazer/refazer
+partilhavam os índices de paginação com as entradas visíveis, e cada página
+tinha de saltar por cima deles. Este script troca os índices da migração 006
+por índices parciais só com as entradas visíveis:
+
+1. ix_combat_logs_visible_session_id em combat_logs (session_id, id)
+2. ix_combat_logs_visible_session_combat_id em combat_logs (session_id, combat_id, id)
+
+(ambos com WHERE action_type NOT IN ('state', 'undo', 'redo'), o mesmo
+predicado que o CombatLogService usa nas queries do log)
+
+Como executar:
+    python migrations/011_combat_log_visible_indexes.py
+"""
+
+import sqlite3
+import os
+
+# Caminho para a base de dados
+DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'instance', 'app.db')
+
+# Tem de ser igual a VISIBLE_LOG_CONDITION (app/models/combat_log.py)
+PREDICADO = "action_type NOT IN ('state', 'undo', 'redo')"
+
+INDICES = {
+    'ix_combat_logs_visible_session_id': '(session_id, id)',
+    'ix_combat_logs_visible_session_combat_id': '(session_id, combat_id, id)',
+}
+
+# Índices da migração 006, substituídos pelos parciais
+INDICES_ANTIGOS = {
+    'ix_combat_logs_session_id': '(session_id, id)',
+    'ix_combat_logs_session_combat_id': '(session_id, combat_id, id)',
+}
+
+
+def migrate():
+    """Executa a migração."""
+    if not os.path.exists(DB_PATH):
+        print(f"❌ Base de dados não encontrada: {DB_PATH}")
+        print("   Execute a aplicação primeiro para criar a base de dados.")
+        return False
+
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+
+        for nome, colunas in INDICES.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {nome} ON combat_logs {colunas} WHERE {PREDICADO}")
+            print(f"✓ Índice parcial {nome} {colunas} criado")
+
+        for nome in INDICES_ANTIGOS:
+            cursor.execute(f"DROP INDEX IF EXISTS {nome}")
+            print(f"✓ Índice {nome} apagado")
+
+        conn.commit()
+
+        # Verificar
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='combat_logs'")
+        print(f"  Índices da tabela: {', '.join(row[0] for row in cursor.fetchall())}")
+
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao executar migração: {e}")
+        return False
+
+
+def rollback():
+    """Reverte a migração (repõe os índices da migração 006)."""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+
+        for nome, colunas in INDICES_ANTIGOS.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {nome} ON combat_logs {colunas}")
+            print(f"✓ Índice {nome} {colunas} criado")
+
+        for nome in INDICES:
+            cursor.execute(f"DROP INDEX IF EXISTS {nome}")
+            print(f"✓ Índice {nome} apagado")
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao executar rollback: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("MIGRAÇÃO 011: Índices parciais do combat log")
+    print("=" * 60)
+    print()
+
+    success = migrate()
+
+    print()
+    if success:
+        print("✓ Migração concluída com sucesso!")
+    else:
+        print("❌ Migração falhou.")
+
+    print()
+    print("=" * 60)
@@ -0,0 +1,70 @@
+"""
+Fixtures partilhadas pelos testes.
+
+Cada teste usa uma aplicação criada com create_app() sobre uma base de dados
+SQLite temporária; manifesto e cache de aventuras e o journal de combate
+também ficam em tmp_path, por isso nada em instance/ é tocado.
+"""
+
+import pytest
+
+import config
+from app import create_app, db
+from app.models import GameSession
+from app.services.session_service import SessionService
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Fábrica de aplicações; os argumentos substituem valores do config.Config."""
+    apps = []
+
+    def _make_app(**overrides):
+        settings = {
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}",
+            'QUESTS_MANIFEST': str(tmp_path / 'quests.manifest.json'),
+            'QUESTS_CACHE_FILE': str(tmp_path / 'quests.cache'),
+            'COMBAT_JOURNAL_FOLDER': str(tmp_path / 'combat_journal'),
+            'COMBAT_WRITE_BEHIND': False,
+        }
+        settings.update(overrides)
+        for key, value in settings.items():
+            monkeypatch.setattr(config.Config, key, value, raising=False)
+        app = create_app()
+        apps.append(app)
+        return app
+
+    yield _make_app
+
+    for app in apps:
+        store = app.extensions.get('combat_state_store')
+        if store is not None:
+            store.shutdown()
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def start_combat(app):
+    """Criar uma sessão com um combate ativo; devolve o ID da sessão."""
+    def _start_combat(participants):
+        with app.app_context():
+            session = GameSession(nome='Teste')
+            db.session.add(session)
+            db.session.commit()
+            SessionService().start_combat(session.id, participants)
+            return session.id
+    return _start_combat
+
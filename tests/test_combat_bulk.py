@@ -0,0 +1,76 @@
+"""Testes dos ataques e salvaguardas em massa."""
+
+import random
+
+import pytest
+
+from app.services.combat_roll_service import CombatRollService
+
+
+PARTICIPANTES = [
+    {'id': f'g{i}', 'nome': f'Goblin {i}', 'tipo': 'monstro', 'hp_atual': 7, 'hp_max': 7, 'ac': 15, 'iniciativa': 10, 'condicoes': []}
+    for i in range(3)
+]
+
+
+@pytest.fixture
+def session_id(start_combat):
+    return start_combat(PARTICIPANTES)
+
+
+def test_lote_igual_a_ataques_individuais(monkeypatch):
+    ataques = [{'bonus': 4, 'target_ac': 13, 'advantage': i == 1, 'disadvantage': i == 2} for i in range(3)]
+
+    monkeypatch.setattr(random, 'randint', random.Random(7).randint)
+    lote = [r['attack'] for r in CombatRollService.roll_attacks_batch(ataques)]
+
+    # O lote gera sempre dois d20 por ataque; o ataque individual só gera o segundo se precisar
+    rolls = random.Random(7)
+    individuais = []
+    for ataque in ataques:
+        roll1, roll2 = rolls.randint(1, 20), rolls.randint(1, 20)
+        d20s = iter([roll1, roll2])
+        monkeypatch.setattr(random, 'randint', lambda a, b: next(d20s))
+        individuais.append(CombatRollService.roll_attack(
+            ataque['bonus'], ataque['target_ac'], ataque['advantage'], ataque['disadvantage']
+        ))
+
+    assert lote == individuais
+
+
+def test_ataques_em_massa_aplicam_dano(client, session_id):
+    response = client.post(f'/combate/sessao/{session_id}/ataques-em-massa', json={'attacks': [
+        {'actor_id': 'p1', 'actor_nome': 'P1', 'target_id': f'g{i}', 'bonus': '4', 'dice_expression': '1d6+2'}
+        for i in range(3)
+    ]})
+    assert response.status_code == 200, response.get_json()
+    resultado = response.get_json()
+
+    hp = {p['id']: p['hp_atual'] for p in resultado['participants']}
+    for i, r in enumerate(resultado['results']):
+        assert r['attack']['bonus'] == 4
+        assert r['attack']['target_ac'] == 15
+        dano = r['damage']['final_damage'] if r['damage'] else 0
+        assert hp[f'g{i}'] == max(0, 7 - dano)
+
+
+@pytest.mark.parametrize('rota, payload', [
+    ('ataques-em-massa', {'attacks': [{'target_id': 'g0', 'bonus': 'muito'}]}),
+    ('ataques-em-massa', {'attacks': [{'target_id': 'g0', 'target_ac': [15]}]}),
+    ('salvaguardas-em-massa', {'dc': 14, 'targets': [{'target_id': 'g0', 'save_bonus': 'x'}]}),
+])
+def test_valores_invalidos(client, session_id, rota, payload):
+    response = client.post(f'/combate/sessao/{session_id}/{rota}', json=payload)
+    assert response.status_code == 400
+    assert 'erro' in response.get_json()
+
+
+@pytest.mark.parametrize('rota, payload', [
+    ('ataques-em-massa', {'attacks': [{'actor_id': 'p1', 'target_id': 'g0', 'bonus': 30, 'dice_expression': '1d6'}]}),
+    ('salvaguardas-em-massa', {'dc': 30, 'dice_expression': '8d6', 'targets': [{'target_id': 'g0'}]}),
+])
+def test_combate_terminado_nao_recebe_dano(client, session_id, rota, payload):
+    client.post(f'/combate/sessao/{session_id}/terminar')
+
+    response = client.post(f'/combate/sessao/{session_id}/{rota}', json=payload)
+    assert response.status_code == 404
@@ -0,0 +1,94 @@
+"""Testes de desfazer/refazer (eventos do CombatLog) e dos snapshots de reconstrução."""
+
+import pytest
+
+from app.models import CombatSnapshot, SessionCombat
+from app.services.combat_event_service import CombatEventService
+
+
+PARTICIPANTES = [
+    {'id': 'player_1', 'nome': 'A', 'tipo': 'jogador', 'hp_atual': 20, 'hp_max': 20, 'ac': 15, 'iniciativa': 12, 'condicoes': []},
+    {'id': 'monster_goblin_0', 'nome': 'Goblin', 'tipo': 'monstro', 'hp_atual': 30, 'hp_max': 30, 'ac': 15, 'iniciativa': 14, 'condicoes': []},
+]
+
+
+@pytest.fixture
+def combate(app, client, start_combat):
+    """Combate com uma função para alterar o HP do jogador por PATCH."""
+    session_id = start_combat(PARTICIPANTES)
+
+    def set_hp(hp):
+        with app.app_context():
+            versao = SessionCombat.query.filter_by(session_id=session_id).first().versao
+        response = client.patch(f'/combate/sessao/{session_id}/estado', json={
+            'versao': versao, 'operations': [{'op': 'set_hp', 'id': 'player_1', 'hp_atual': hp}]
+        })
+        assert response.status_code == 200, response.get_json()
+
+    return session_id, set_hp
+
+
+def _hp(response):
+    return {p['id']: p['hp_atual'] for p in response.get_json()['participants']}['player_1']
+
+
+def test_desfazer_e_refazer(client, combate):
+    session_id, set_hp = combate
+    set_hp(15)
+    set_hp(10)
+
+    response = client.post(f'/combate/sessao/{session_id}/desfazer')
+    assert response.status_code == 200
+    assert _hp(response) == 15
+
+    response = client.post(f'/combate/sessao/{session_id}/desfazer')
+    assert _hp(response) == 20
+
+    response = client.post(f'/combate/sessao/{session_id}/refazer')
+    assert response.status_code == 200
+    assert _hp(response) == 15
+
+
+def test_inicio_do_combate_nao_pode_ser_desfeito(client, combate):
+    session_id, set_hp = combate
+    set_hp(15)
+
+    assert client.post(f'/combate/sessao/{session_id}/desfazer').status_code == 200
+    response = client.post(f'/combate/sessao/{session_id}/desfazer')
+    assert response.status_code == 400
+    assert 'erro' in response.get_json()
+
+
+def test_refazer_bloqueado_por_alteracao_nova(client, combate):
+    session_id, set_hp = combate
+    set_hp(15)
+    client.post(f'/combate/sessao/{session_id}/desfazer')
+    set_hp(12)
+
+    assert client.post(f'/combate/sessao/{session_id}/refazer').status_code == 400
+
+
+def test_snapshot_criado_so_ao_desfazer(app, client, combate, monkeypatch):
+    monkeypatch.setattr(CombatEventService, 'SNAPSHOT_INTERVAL', 3)
+    session_id, set_hp = combate
+    for hp in range(10, 16):
+        set_hp(hp)
+
+    assert client.get(f'/combate/sessao/{session_id}/historico').status_code == 200
+    with app.app_context():
+        assert CombatSnapshot.query.count() == 0
+
+    response = client.post(f'/combate/sessao/{session_id}/desfazer')
+    assert _hp(response) == 14
+    with app.app_context():
+        assert CombatSnapshot.query.count() == 1
+        combat = SessionCombat.query.filter_by(session_id=session_id).first()
+
+        result = CombatEventService().rebuild(combat.id)
+        assert result['replayed'] < CombatEventService.SNAPSHOT_INTERVAL
+        assert result['state'].get_participante('player_1').hp_atual == 14
+
+    # Desfazer para antes do snapshot continua a reconstruir a partir do início
+    for _ in range(4):
+        response = client.post(f'/combate/sessao/{session_id}/desfazer')
+    assert _hp(response) == 10
@@ -0,0 +1,89 @@
+"""Testes da unidade de trabalho do CombatLogService (logs e estado num só commit)."""
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import CombatLog, GameSession
+from app.models.combat_log import VISIBLE_LOG_CONDITION
+from app.services.combat_log_service import CombatLogService
+
+
+@pytest.fixture
+def session_id(app):
+    with app.app_context():
+        session = GameSession(nome='Teste')
+        db.session.add(session)
+        db.session.commit()
+        return session.id
+
+
+def _log(session_id, message):
+    CombatLogService.log_custom(session_id=session_id, actor_id='p1', actor_nome='P1', message=message)
+
+
+def test_unidade_de_trabalho_faz_um_so_commit(app, session_id):
+    with app.app_context():
+        commits = []
+
+        def contar_commit(session):
+            commits.append(session)
+
+        event.listen(db.session(), 'after_commit', contar_commit)
+        try:
+            with CombatLogService.unit_of_work():
+                db.session.get(GameSession, session_id).notas = 'alterada'
+                for i in range(3):
+                    _log(session_id, f'log {i}')
+                with CombatLogService.unit_of_work():
+                    _log(session_id, 'aninhado')
+                assert commits == []
+        finally:
+            event.remove(db.session(), 'after_commit', contar_commit)
+
+        assert len(commits) == 1
+        assert CombatLog.query.count() == 4
+        assert db.session.get(GameSession, session_id).notas == 'alterada'
+
+
+def test_excecao_nao_escreve_nada(app, session_id):
+    with app.app_context():
+        with pytest.raises(RuntimeError):
+            with CombatLogService.unit_of_work():
+                db.session.get(GameSession, session_id).notas = 'alterada'
+                _log(session_id, 'log')
+                raise RuntimeError('falha')
+
+        assert CombatLog.query.count() == 0
+        assert db.session.get(GameSession, session_id).notas == ''
+
+
+def test_fora_da_unidade_cada_log_faz_commit(app, session_id):
+    with app.app_context():
+        _log(session_id, 'log')
+        db.session.rollback()
+        assert CombatLog.query.count() == 1
+
+
+def test_paginacao_so_com_entradas_visiveis(app, session_id):
+    with app.app_context():
+        with CombatLogService.unit_of_work():
+            for i in range(6):
+                _log(session_id, f'log {i}')
+                CombatLogService.log_state(session_id=session_id, operations=[], combat_id=1)
+                db.session.add(CombatLog(session_id=session_id, combat_id=1, actor_id='sistema', actor_nome='Sistema',
+                                         action_type='undo', message='Desfeito'))
+
+        pagina = CombatLogService.get_combat_logs(session_id, limit=4)
+        assert [log.message for log in pagina] == ['log 5', 'log 4', 'log 3', 'log 2']
+        anterior = CombatLogService.get_combat_logs(session_id, limit=4, before_id=pagina[-1].id)
+        assert [log.message for log in anterior] == ['log 1', 'log 0']
+        seguintes = CombatLogService.get_combat_logs(session_id, limit=4, since_id=anterior[0].id)
+        assert [log.message for log in seguintes] == ['log 5', 'log 4', 'log 3', 'log 2']
+
+        # Os eventos de estado ficam fora do índice usado pela paginação
+        query = CombatLog.query.filter_by(session_id=session_id).filter(db.text(VISIBLE_LOG_CONDITION)) \
+            .filter(CombatLog.id < 100).order_by(CombatLog.id.desc()).limit(4)
+        sql = str(query.statement.compile(compile_kwargs={'literal_binds': True}))
+        plano = ' '.join(row[-1] for row in db.session.execute(db.text('EXPLAIN QUERY PLAN ' + sql)))
+        assert 'ix_combat_logs_visible_session_id' in plano
@@ -0,0 +1,70 @@
+"""Testes dos participantes de combate guardados como linhas (combat_participants)."""
+
+import json
+
+from app import db
+from app.models import CombatParticipant, GameSession, SessionCombat
+
+
+PARTICIPANTES = [
+    {'id': 'player_1', 'nome': 'A', 'tipo': 'jogador', 'hp_atual': 20, 'hp_max': 20, 'ac': 15, 'iniciativa': 12,
+     'condicoes': ['cego'], 'classe': 'Guerreiro'},
+    {'id': 'monster_goblin_0', 'nome': 'Goblin', 'tipo': 'monstro', 'hp_atual': 7, 'hp_max': 7, 'ac': 15, 'iniciativa': 14,
+     'condicoes': [], 'xp': 50},
+]
+
+
+def _novo_combate():
+    session = GameSession(nome='Teste')
+    db.session.add(session)
+    db.session.commit()
+    combat = SessionCombat(session_id=session.id, activo=True)
+    db.session.add(combat)
+    db.session.commit()
+    return combat
+
+
+def test_lista_de_participantes_ida_e_volta(app):
+    with app.app_context():
+        combat = _novo_combate()
+        combat.set_participantes(PARTICIPANTES)
+        db.session.commit()
+
+        db.session.expire_all()
+        participantes = db.session.get(SessionCombat, combat.id).get_participantes()
+        assert [p['id'] for p in participantes] == ['player_1', 'monster_goblin_0']
+        assert participantes[0]['classe'] == 'Guerreiro'
+        assert participantes[0]['condicoes'] == ['cego']
+        assert participantes[1]['xp'] == 50
+
+
+def test_linhas_atualizadas_no_lugar(app):
+    with app.app_context():
+        combat = _novo_combate()
+        combat.set_participantes(PARTICIPANTES)
+        db.session.commit()
+        ids = {p.participant_id: p.id for p in combat.participantes}
+
+        alterados = [dict(PARTICIPANTES[1], hp_atual=3), dict(PARTICIPANTES[0])]
+        combat.set_participantes(alterados)
+        db.session.commit()
+
+        linhas = CombatParticipant.query.filter_by(combat_id=combat.id).order_by(CombatParticipant.ordem).all()
+        assert [(p.participant_id, p.ordem, p.hp_atual) for p in linhas] == [('monster_goblin_0', 0, 3), ('player_1', 1, 20)]
+        assert {p.participant_id: p.id for p in linhas} == ids
+
+        combat.set_participantes(alterados[:1])
+        db.session.commit()
+        assert CombatParticipant.query.filter_by(combat_id=combat.id).count() == 1
+
+
+def test_blob_legado_convertido_em_linhas(app):
+    with app.app_context():
+        combat = _novo_combate()
+        combat.participantes_json = json.dumps(PARTICIPANTES)
+        db.session.commit()
+
+        assert [p['id'] for p in combat.get_participantes()] == ['player_1', 'monster_goblin_0']
+        assert combat.get_participante('monster_goblin_0').hp_atual == 7
+        db.session.commit()
+        assert CombatParticipant.query.filter_by(combat_id=combat.id).count() == 2
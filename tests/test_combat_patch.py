@@ -0,0 +1,102 @@
+"""Testes do PATCH de estado de combate (versões e atomicidade)."""
+
+from app.models import SessionCombat
+
+
+PARTICIPANTES = [
+    {'id': 'player_1', 'nome': 'A', 'tipo': 'jogador', 'hp_atual': 20, 'hp_max': 20, 'ac': 15, 'iniciativa': 12, 'condicoes': []},
+    {'id': 'monster_goblin_0', 'nome': 'Goblin', 'tipo': 'monstro', 'hp_atual': 7, 'hp_max': 7, 'ac': 15, 'iniciativa': 14, 'condicoes': []},
+]
+
+
+def _versao(app, session_id):
+    with app.app_context():
+        return SessionCombat.query.filter_by(session_id=session_id).first().versao
+
+
+def _participantes(app, session_id):
+    with app.app_context():
+        combat = SessionCombat.query.filter_by(session_id=session_id).first()
+        return {p['id']: p for p in combat.get_participantes()}
+
+
+def test_patch_incrementa_versao(app, client, start_combat):
+    session_id = start_combat(PARTICIPANTES)
+    versao = _versao(app, session_id)
+
+    response = client.patch(f'/combate/sessao/{session_id}/estado', json={
+        'versao': versao,
+        'operations': [
+            {'op': 'set_hp', 'id': 'player_1', 'hp_atual': 12},
+            {'op': 'add_condition', 'id': 'monster_goblin_0', 'condition': 'Cego'},
+        ]
+    })
+
+    assert response.status_code == 200
+    assert response.get_json()['versao'] == versao + 1
+    participantes = _participantes(app, session_id)
+    assert participantes['player_1']['hp_atual'] == 12
+    assert participantes['monster_goblin_0']['condicoes'] == ['cego']
+
+
+def test_patch_com_versao_antiga_da_conflito(app, client, start_combat):
+    session_id = start_combat(PARTICIPANTES)
+    versao = _versao(app, session_id)
+    url = f'/combate/sessao/{session_id}/estado'
+    client.patch(url, json={'versao': versao, 'operations': [{'op': 'set_hp', 'id': 'player_1', 'hp_atual': 12}]})
+
+    response = client.patch(url, json={'versao': versao, 'operations': [{'op': 'set_hp', 'id': 'player_1', 'hp_atual': 1}]})
+
+    assert response.status_code == 409
+    data = response.get_json()
+    assert data['versao'] == versao + 1
+    assert {p['id']: p['hp_atual'] for p in data['participants']}['player_1'] == 12
+    assert _participantes(app, session_id)['player_1']['hp_atual'] == 12
+
+
+def test_patch_invalido_nao_aplica_nada(app, client, start_combat):
+    session_id = start_combat(PARTICIPANTES)
+    versao = _versao(app, session_id)
+
+    response = client.patch(f'/combate/sessao/{session_id}/estado', json={
+        'versao': versao,
+        'operations': [{'op': 'set_hp', 'id': 'player_1', 'hp_atual': 1}, {'op': 'bogus'}]
+    })
+
+    assert response.status_code == 400
+    assert 'erro' in response.get_json()
+    assert _versao(app, session_id) == versao
+    assert _participantes(app, session_id)['player_1']['hp_atual'] == 20
+
+
+def test_patch_rejeita_next_turn(app, client, start_combat):
+    session_id = start_combat(PARTICIPANTES)
+
+    response = client.patch(f'/combate/sessao/{session_id}/estado', json={
+        'versao': _versao(app, session_id),
+        'operations': [{'op': 'next_turn'}]
+    })
+
+    assert response.status_code == 400
+
+
+def test_atualizar_exige_versao_atual(app, client, start_combat):
+    session_id = start_combat(PARTICIPANTES)
+    versao = _versao(app, session_id)
+    url = f'/combate/sessao/{session_id}/atualizar'
+    alterados = [dict(PARTICIPANTES[0], hp_atual=5), PARTICIPANTES[1]]
+
+    assert client.post(url, json={'participants': alterados}).status_code == 409
+    assert client.post(url, json={'versao': versao - 1, 'participants': alterados}).status_code == 409
+    assert _participantes(app, session_id)['player_1']['hp_atual'] == 20
+
+    response = client.post(url, json={'versao': versao, 'participants': alterados})
+    assert response.status_code == 200
+    assert response.get_json()['versao'] == versao + 1
+    assert _participantes(app, session_id)['player_1']['hp_atual'] == 5
+
+    # Um PATCH feito sobre a versão anterior já não apaga a substituição
+    response = client.patch(f'/combate/sessao/{session_id}/estado', json={
+        'versao': versao, 'operations': [{'op': 'set_hp', 'id': 'player_1', 'hp_atual': 1}]
+    })
+    assert response.status_code == 409
@@ -0,0 +1,70 @@
+"""Testes das distribuições exatas (PMF) comparadas com enumeração das faces."""
+
+from fractions import Fraction
+from itertools import product
+
+import pytest
+
+from app.services.combat_probability_service import CombatProbabilityService
+from app.services.dice_engine import DiceExpressionError
+
+
+def _pmf_forca_bruta(faces_por_dado, combinar):
+    """Distribuição por enumeração de todas as faces (dados com a mesma probabilidade por face)."""
+    pmf = {}
+    for rolls in product(*faces_por_dado):
+        p = Fraction(1)
+        for faces in faces_por_dado:
+            p *= Fraction(1, len(faces))
+        total = combinar(rolls)
+        pmf[total] = pmf.get(total, 0) + p
+    return pmf
+
+
+def _assert_pmf(expression, esperado, crit=False):
+    pmf = CombatProbabilityService.dice_pmf(expression, crit=crit)
+    assert set(pmf) == set(esperado)
+    for total, p in esperado.items():
+        assert pmf[total] == pytest.approx(float(p))
+
+
+def test_pmf_soma_simples():
+    esperado = _pmf_forca_bruta([range(1, 7)] * 2, lambda r: sum(r) + 1)
+    _assert_pmf('2d6+1', esperado)
+
+
+def test_pmf_manter_maiores():
+    esperado = _pmf_forca_bruta([range(1, 7)] * 4, lambda r: sum(sorted(r)[1:]))
+    _assert_pmf('4d6kh3', esperado)
+
+
+def test_pmf_reroll_uma_vez():
+    # Cada dado: primeiro roll e roll de substituição (usado só se o primeiro for <= 2)
+    esperado = _pmf_forca_bruta(
+        [range(1, 7)] * 4,
+        lambda r: (r[0] if r[0] > 2 else r[1]) + (r[2] if r[2] > 2 else r[3])
+    )
+    _assert_pmf('2d6r2', esperado)
+
+
+def test_pmf_minimo_e_total_nunca_negativo():
+    _assert_pmf('1d4mi2', {2: Fraction(1, 2), 3: Fraction(1, 4), 4: Fraction(1, 4)})
+    _assert_pmf('1d4-3', {0: Fraction(3, 4), 1: Fraction(1, 4)})
+
+
+def test_pmf_critico_dobra_dados():
+    assert CombatProbabilityService.dice_pmf('1d6+2', crit=True) == CombatProbabilityService.dice_pmf('2d6+2')
+
+
+def test_pmf_limite_de_suporte():
+    with pytest.raises(DiceExpressionError):
+        CombatProbabilityService.dice_pmf('1000d1000')
+
+
+def test_probabilidades_de_ataque():
+    odds = CombatProbabilityService.attack_probabilities(5, 15)
+    assert odds['hit'] == pytest.approx(0.55)
+    assert odds['crit'] == pytest.approx(0.05)
+
+    assert CombatProbabilityService.attack_probabilities(30, 10)['hit'] == pytest.approx(0.95)
+    assert CombatProbabilityService.attack_probabilities(-10, 30)['hit'] == pytest.approx(0.05)
@@ -0,0 +1,78 @@
+"""Testes dos recursos de combate (action economy e spell slots) com UPDATE condicional."""
+
+import pytest
+
+from app import db
+from app.models import CombatResource, SessionCombat
+
+
+PARTICIPANTES = [
+    {'id': f'p{i}', 'nome': f'P{i}', 'tipo': 'jogador', 'hp_atual': 10, 'hp_max': 10, 'ac': 12, 'iniciativa': 1, 'condicoes': []}
+    for i in range(2)
+]
+
+
+@pytest.fixture
+def session_id(start_combat):
+    return start_combat(PARTICIPANTES)
+
+
+def _combat(session_id):
+    return SessionCombat.query.filter_by(session_id=session_id).first()
+
+
+def test_spell_slots_nunca_passam_do_maximo(app, session_id):
+    with app.app_context():
+        combat = _combat(session_id)
+        combat.initialize_spell_slots('p0', {1: 2, 3: 1})
+        db.session.commit()
+
+        assert [combat.use_spell_slot('p0', 1) for _ in range(4)] == [True, True, False, False]
+        assert combat.use_spell_slot('p0', 2) is False  # Nível sem slots
+        db.session.commit()
+        assert combat.get_spell_slots()['p0']['1'] == {'max': 2, 'used': 2}
+
+        assert [combat.restore_spell_slot('p0', 1) for _ in range(3)] == [True, True, False]
+        db.session.commit()
+        assert combat.get_spell_slots()['p0']['1'] == {'max': 2, 'used': 0}
+
+
+def test_decremento_ignora_estado_em_memoria_desatualizado(app, session_id):
+    with app.app_context():
+        combat = _combat(session_id)
+        combat.initialize_spell_slots('p0', {3: 1})
+        db.session.commit()
+        recurso = combat.recursos.filter_by(participant_id='p0', recurso=CombatResource.slot(3)).one()
+        assert recurso.usados == 0
+
+        # O UPDATE é avaliado na base de dados, não sobre a linha já carregada
+        assert combat.use_spell_slot('p0', 3) is True
+        assert combat.use_spell_slot('p0', 3) is False
+        db.session.commit()
+        db.session.refresh(recurso)
+        assert recurso.usados == 1
+
+
+def test_rota_magia_sem_slots(client, app, session_id):
+    with app.app_context():
+        _combat(session_id).initialize_spell_slots('p0', {3: 1})
+        db.session.commit()
+    url = f'/combate/sessao/{session_id}/magia'
+    payload = {'participant_id': 'p0', 'spell_level': 3, 'actor_id': 'p0', 'actor_nome': 'P0'}
+
+    assert client.post(url, json=payload).status_code == 200
+    response = client.post(url, json=payload)
+    assert response.status_code == 400
+    assert 'erro' in response.get_json()
+
+
+def test_acao_usada_uma_vez_por_turno(client, session_id):
+    url = f'/combate/sessao/{session_id}/action-economy'
+
+    assert client.post(url, json={'participant_id': 'p1', 'action_type': 'action'}).status_code == 200
+    assert client.post(url, json={'participant_id': 'p1', 'action_type': 'action'}).status_code == 400
+    assert client.post(url, json={'participant_id': 'p1', 'action_type': 'dance'}).status_code == 400
+
+    # O turno de p1 começa: a action economy dele é reposta
+    client.post(f'/combate/sessao/{session_id}/proximo-turno', json={})
+    assert client.post(url, json={'participant_id': 'p1', 'action_type': 'action'}).status_code == 200
@@ -0,0 +1,27 @@
+"""Testes da validação do simulador de encontros (POST /gerador-encontros/simular)."""
+
+import pytest
+
+from app.services.combat_simulator import MAX_COMBATANTS
+
+
+MONSTRO = {'id': 'goblin-teste', 'nome': 'Goblin', 'hp_max': 7, 'ac': 15, 'cr': '1/4', 'xp': 50}
+
+
+def _simular(client, quantity, **extra):
+    return client.post('/gerador-encontros/simular', json=dict(
+        party_levels=[1, 1], monsters=[dict(MONSTRO, quantity=quantity)], iterations=50, seed=1, **extra
+    ))
+
+
+def test_simulacao_valida(client):
+    response = _simular(client, 2)
+    assert response.status_code == 200
+    assert response.get_json()['num_monsters'] == 2
+
+
+@pytest.mark.parametrize('quantity', [0, -1, '3', 1.5, True, None, MAX_COMBATANTS])
+def test_quantidade_invalida(client, quantity):
+    response = _simular(client, quantity)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,139 @@
+"""Testes do estado de combate em memória (write-behind) e da recuperação do journal."""
+
+import json
+import os
+
+import pytest
+
+from app import db
+from app.models import GameSession, SessionCombat
+from app.services.combat_patch_service import CombatPatchError
+from app.services.combat_state_store import CombatStateStore
+from app.services.session_service import SessionService
+
+
+PARTICIPANTES = [
+    {'id': 'player_1', 'nome': 'A', 'tipo': 'jogador', 'hp_atual': 20, 'hp_max': 20, 'ac': 15, 'iniciativa': 12, 'condicoes': []},
+    {'id': 'monster_goblin_0', 'nome': 'Goblin', 'tipo': 'monstro', 'hp_atual': 7, 'hp_max': 7, 'ac': 15, 'iniciativa': 14, 'condicoes': []},
+]
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(COMBAT_WRITE_BEHIND=True, COMBAT_FLUSH_INTERVAL=3600)
+
+
+@pytest.fixture
+def session_id(app):
+    with app.app_context():
+        session = GameSession(nome='Teste')
+        db.session.add(session)
+        db.session.commit()
+        SessionService().start_combat(session.id, PARTICIPANTES)
+        return session.id
+
+
+def _combat(session_id):
+    db.session.expire_all()
+    return SessionCombat.query.filter_by(session_id=session_id).first()
+
+
+def _journal(app, session_id):
+    return os.path.join(app.config['COMBAT_JOURNAL_FOLDER'], f'{session_id}.jsonl')
+
+
+def _patch(client, session_id, versao, operations):
+    response = client.patch(f'/combate/sessao/{session_id}/estado', json={'versao': versao, 'operations': operations})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['versao']
+
+
+def test_alteracoes_ficam_no_journal_ate_ao_flush(app, client, session_id):
+    with app.app_context():
+        versao = _combat(session_id).versao
+    _patch(client, session_id, versao, [{'op': 'set_hp', 'id': 'player_1', 'hp_atual': 5}])
+
+    with app.app_context():
+        assert {p['id']: p['hp_atual'] for p in _combat(session_id).get_participantes()}['player_1'] == 20
+        assert os.path.exists(_journal(app, session_id))
+
+        assert app.extensions['combat_state_store'].flush(session_id) == 1
+        assert {p['id']: p['hp_atual'] for p in _combat(session_id).get_participantes()}['player_1'] == 5
+        assert not os.path.exists(_journal(app, session_id))
+
+
+def test_journal_reaplicado_depois_de_crash(app, client, session_id):
+    with app.app_context():
+        versao = _combat(session_id).versao
+    versao = _patch(client, session_id, versao, [{'op': 'set_hp', 'id': 'player_1', 'hp_atual': 5}])
+    versao = _patch(client, session_id, versao, [{'op': 'add_condition', 'id': 'monster_goblin_0', 'condition': 'cego'}])
+
+    # Processo morto: o estado em memória perde-se, só o journal fica
+    app.extensions['combat_state_store']._states.clear()
+    with open(_journal(app, session_id), 'a', encoding='utf-8') as f:
+        f.write('{"seq": 99, "operations": [{"op"')
+
+    with app.app_context():
+        store = CombatStateStore(enabled=True, journal_folder=app.config['COMBAT_JOURNAL_FOLDER'])
+        assert store.recover() == 1
+
+        combat = _combat(session_id)
+        participantes = {p['id']: p for p in combat.get_participantes()}
+        assert participantes['player_1']['hp_atual'] == 5
+        assert participantes['monster_goblin_0']['condicoes'] == ['cego']
+        assert combat.versao == versao
+        assert combat.journal_seq == 2
+        assert not os.path.exists(_journal(app, session_id))
+
+
+def test_entradas_ja_escritas_nao_sao_reaplicadas(app, client, session_id):
+    with app.app_context():
+        versao = _combat(session_id).versao
+    _patch(client, session_id, versao, [{'op': 'set_hp', 'id': 'player_1', 'hp_atual': 5}])
+
+    with app.app_context():
+        store = app.extensions['combat_state_store']
+        store.flush(session_id, evict=True)
+        combat = _combat(session_id)
+
+        # Processo morto entre o commit do flush e apagar o journal
+        with open(_journal(app, session_id), 'w', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'seq': combat.journal_seq,
+                'versao': combat.versao,
+                'operations': [{'op': 'set_hp', 'id': 'player_1', 'hp_atual': 1}],
+                'logs': []
+            }) + '\n')
+
+        state = CombatStateStore(enabled=True, journal_folder=app.config['COMBAT_JOURNAL_FOLDER']).load(session_id)
+        assert state.get_participante('player_1').hp_atual == 5
+        assert not state.dirty
+
+
+def test_turno_nao_passa_pelo_store(app, session_id):
+    with app.app_context():
+        store = app.extensions['combat_state_store']
+        with pytest.raises(CombatPatchError):
+            store.record(session_id, [{'op': 'next_turn'}])
+        assert not store.load(session_id).dirty
+
+
+def test_record_atomico_sem_copiar_o_estado_todo(app, session_id):
+    with app.app_context():
+        store = app.extensions['combat_state_store']
+        antes = store.load(session_id)
+        goblin = antes.get_participante('monster_goblin_0')
+
+        with pytest.raises(CombatPatchError):
+            store.record(session_id, [
+                {'op': 'set_hp', 'id': 'player_1', 'hp_atual': 5},
+                {'op': 'add_condition', 'id': 'player_1', 'condition': 'voando'},
+            ])
+        assert store.load(session_id) is antes
+        assert antes.get_participante('player_1').hp_atual == 20
+
+        store.record(session_id, [{'op': 'set_hp', 'id': 'player_1', 'hp_atual': 5}])
+        depois = store.load(session_id)
+        assert depois.get_participante('player_1').hp_atual == 5
+        assert antes.get_participante('player_1').hp_atual == 20
+        assert depois.get_participante('monster_goblin_0') is goblin
@@ -0,0 +1,91 @@
+"""Testes da expiração de condições ao passar os turnos (ConditionScheduler)."""
+
+import pytest
+
+from app.models import SessionCombat
+
+
+PARTICIPANTES = [
+    {'id': f'p{i}', 'nome': f'P{i}', 'tipo': 'jogador', 'hp_atual': 10, 'hp_max': 10, 'ac': 12, 'iniciativa': 10 - i, 'condicoes': []}
+    for i in range(3)
+]
+
+
+@pytest.fixture
+def combate(app, client, start_combat):
+    """Combate com três jogadores (p0, p1, p2 por esta ordem) e funções para PATCH e passar o turno."""
+    session_id = start_combat(PARTICIPANTES)
+    url = f'/combate/sessao/{session_id}'
+
+    def versao():
+        with app.app_context():
+            return SessionCombat.query.filter_by(session_id=session_id).first().versao
+
+    def patch(operations):
+        response = client.patch(url + '/estado', json={'versao': versao(), 'operations': operations})
+        assert response.status_code == 200, response.get_json()
+
+    def proximo_turno():
+        response = client.post(url + '/proximo-turno', json={'versao': versao()})
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()
+
+    def condicoes():
+        with app.app_context():
+            combat = SessionCombat.query.filter_by(session_id=session_id).first()
+            return {p['id']: p['condicoes'] for p in combat.get_participantes()}
+
+    return patch, proximo_turno, condicoes
+
+
+def test_expiracao_por_ordem(combate):
+    patch, proximo_turno, condicoes = combate
+    # Ronda 1, turno de p0
+    patch([
+        {'op': 'add_condition', 'id': 'p1', 'condition': 'atordoado', 'expira': {'tipo': 'turno_fonte', 'fonte': 'p0'}},
+        {'op': 'add_condition', 'id': 'p2', 'condition': 'envenenado', 'expira': {'tipo': 'ronda', 'rondas': 1}},
+        {'op': 'add_condition', 'id': 'p0', 'condition': 'cego', 'expira': {'tipo': 'ronda', 'rondas': 1}},
+        {'op': 'add_condition', 'id': 'p2', 'condition': 'propenso'},
+    ])
+
+    # Fim do turno de p0 na ronda 1: a duração "turno_fonte" só acaba no próximo turno dele
+    assert proximo_turno()['expirados'] == []
+    assert proximo_turno()['expirados'] == []
+
+    # Fim da ronda 1: as durações de ronda acabam pela ordem em que foram dadas
+    resultado = proximo_turno()
+    assert (resultado['ronda'], resultado['turno']) == (2, 0)
+    assert [(e['id'], e['condicao']) for e in resultado['expirados']] == [('p2', 'envenenado'), ('p0', 'cego')]
+
+    # Fim do turno seguinte de p0
+    resultado = proximo_turno()
+    assert [(e['id'], e['condicao']) for e in resultado['expirados']] == [('p1', 'atordoado')]
+    assert condicoes() == {'p0': [], 'p1': [], 'p2': ['propenso']}
+
+
+def test_salvaguarda_lembrada_no_fim_do_turno(combate):
+    patch, proximo_turno, condicoes = combate
+    patch([{'op': 'add_condition', 'id': 'p0', 'condition': 'paralisado',
+            'expira': {'tipo': 'salvaguarda', 'atributo': 'wis', 'cd': 14}}])
+
+    # Dada no turno do próprio p0: é lembrada no fim do próximo turno dele (ronda 2), e em cada um a seguir
+    lembretes = []
+    for _ in range(7):
+        resultado = proximo_turno()
+        assert resultado['expirados'] == []
+        lembretes.append([(s['id'], s['condicao'], s['cd']) for s in resultado['salvaguardas']])
+
+    lembrete = [('p0', 'paralisado', 14)]
+    assert lembretes == [[], [], [], lembrete, [], [], lembrete]
+    assert condicoes()['p0'] == ['paralisado']
+
+
+def test_condicao_readicionada_sem_duracao_nao_expira(combate):
+    patch, proximo_turno, condicoes = combate
+    patch([{'op': 'add_condition', 'id': 'p1', 'condition': 'cego', 'expira': {'tipo': 'ronda', 'rondas': 1}}])
+    patch([{'op': 'remove_condition', 'id': 'p1', 'condition': 'cego'},
+           {'op': 'add_condition', 'id': 'p1', 'condition': 'cego'}])
+
+    for _ in range(4):
+        assert proximo_turno()['expirados'] == []
+    assert condicoes()['p1'] == ['cego']
@@ -0,0 +1,73 @@
+"""Testes das condições como máscara de bits do CONDICOES_5E."""
+
+import pytest
+
+from app import db
+from app.models import CONDICOES_5E, GameSession, SessionPlayer
+from app.models.combat import chave_condicao, condicoes_da_mascara, mascara_condicoes
+from app.services.session_service import SessionService
+
+
+def test_mascara_ida_e_volta():
+    chaves = list(CONDICOES_5E)
+    for mascara in range(1 << len(chaves)):
+        assert mascara_condicoes(condicoes_da_mascara(mascara)) == mascara
+
+    assert condicoes_da_mascara(mascara_condicoes(['cego', 'agarrado'])) == ['agarrado', 'cego']
+
+
+@pytest.mark.parametrize('nome, chave', [
+    ('Enfeitiçado', 'enfeiticado'),
+    (' CEGO ', 'cego'),
+    ('Invisível', 'invisivel'),
+    ('voando', None),
+    ('', None),
+])
+def test_chave_condicao(nome, chave):
+    assert chave_condicao(nome) == chave
+
+
+def test_condicao_desconhecida_e_rejeitada():
+    player = SessionPlayer(condicoes_mask=0)
+    player.add_condicao('Cego')
+
+    with pytest.raises(ValueError):
+        player.add_condicao('voando')
+    with pytest.raises(ValueError):
+        player.set_condicoes(['atordoado', 'voando'])
+
+    assert player.get_condicoes() == ['cego']
+
+
+def test_filtro_sql_por_condicao(app):
+    with app.app_context():
+        session = GameSession(nome='Teste')
+        db.session.add(session)
+        db.session.commit()
+        for i, condicoes in enumerate([['atordoado'], ['cego', 'envenenado'], []]):
+            player = SessionPlayer(session_id=session.id, nome_jogador=f'J{i}', character_data='{}', hp_atual=10, hp_max=10)
+            player.set_condicoes(condicoes)
+            db.session.add(player)
+        db.session.commit()
+
+        service = SessionService()
+        assert [p.nome_jogador for p in service.get_players_with_condition(session.id, 'atordoado')] == ['J0']
+        assert sorted(p.nome_jogador for p in service.get_players_with_condition(session.id, 'cego', 'atordoado')) == ['J0', 'J1']
+
+
+def test_atualizar_com_condicao_desconhecida(app, client, start_combat):
+    participantes = [{'id': 'p0', 'nome': 'P0', 'tipo': 'jogador', 'hp_atual': 10, 'hp_max': 10, 'ac': 12,
+                      'iniciativa': 10, 'condicoes': ['cego']}]
+    session_id = start_combat(participantes)
+
+    with app.app_context():
+        versao = SessionService().get_session_combat(session_id).versao
+
+    alterados = [dict(participantes[0], hp_atual=3, condicoes=['cego', 'voando'])]
+    response = client.post(f'/combate/sessao/{session_id}/atualizar', json={'versao': versao, 'participants': alterados})
+    assert response.status_code == 400
+    assert 'erro' in response.get_json()
+
+    with app.app_context():
+        combat = SessionService().get_session_combat(session_id)
+        assert [(p['hp_atual'], p['condicoes']) for p in combat.get_participantes()] == [(10, ['cego'])]
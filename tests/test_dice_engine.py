@@ -0,0 +1,35 @@
+"""Testes do motor de dados: parse, normalização e limites dos rolls."""
+
+import random
+
+import pytest
+
+from app.services.dice_engine import DiceExpressionError, compile_dice
+
+
+@pytest.mark.parametrize('expression, normalizada', [
+    ('2d6 + 3', '2d6+3'),
+    ('1d8+3 cortante', '1d8+3 cortante'),
+    ('4d6k3', '4d6kh3'),
+    ('2d6r<3', '2d6r2'),
+    ('1d8[fogo]+2d6[frio]-1', '1d8[fogo]+2d6[frio]-1'),
+])
+def test_compile_normaliza(expression, normalizada):
+    assert compile_dice(expression).expression == normalizada
+
+
+@pytest.mark.parametrize('expression', [
+    '', 'abc', '2d6++3', '1001d6', '1d1001', '3d6kh4', '1d6r6', '1d8 gelo (velocidade -3m)', '1d8+3 desconhecido'
+])
+def test_compile_rejeita_invalidas(expression):
+    with pytest.raises(DiceExpressionError):
+        compile_dice(expression)
+
+
+def test_roll_respeita_limites():
+    compiled = compile_dice('4d6kh3+2')
+    rng = random.Random(3)
+    for _ in range(500):
+        result = compiled.roll(rng=rng)
+        assert 5 <= result['total'] <= 20
+        assert len(result['rolls']) == 3
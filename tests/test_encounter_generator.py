@@ -0,0 +1,85 @@
+"""Testes do gerador de encontros: solver exato comparado com força bruta."""
+
+from itertools import combinations_with_replacement
+
+import pytest
+
+from app.services.encounter_generator import EncounterGeneratorService
+
+
+POOL = [
+    {'id': f'm{i}', 'nome': f'Monstro {i}', 'xp': xp, 'cr': '1'}
+    for i, xp in enumerate([25, 50, 50, 100, 200, 450, 700, 1100, 1800])
+]
+
+
+def _melhor_distancia(service, pool, budget, max_monsters, min_monsters):
+    """Força bruta: todas as composições de valores de XP com as regras do solver."""
+    affordable = [m for m in pool if 0 < m['xp'] <= budget * 0.5]
+    if not affordable:
+        affordable = [min(pool, key=lambda m: m['xp'])]
+    values = sorted({m['xp'] for m in affordable})
+
+    melhor = None
+    for count in range(max(1, min_monsters), max(max_monsters, min_monsters) + 1):
+        multiplier = service.get_encounter_multiplier(count)
+        for combination in combinations_with_replacement(values, count):
+            total = sum(combination)
+            if total * multiplier > budget * 1.2:
+                continue
+            distancia = abs(total * multiplier - budget)
+            if melhor is None or distancia < melhor:
+                melhor = distancia
+    return melhor
+
+
+def _ajustado(service, encounter):
+    count = sum(m['quantity'] for m in encounter)
+    return sum(m['xp'] * m['quantity'] for m in encounter) * service.get_encounter_multiplier(count), count
+
+
+@pytest.mark.parametrize('levels, difficulty, max_monsters, min_monsters', [
+    ([1, 1, 1, 1], 'easy', 6, 1),
+    ([3, 3, 3, 3], 'hard', 8, 1),
+    ([3, 3, 3, 3], 'medium', 8, 4),
+    ([5, 5, 5, 5, 5], 'deadly', 6, 2),
+])
+def test_solver_exato_igual_a_forca_bruta(levels, difficulty, max_monsters, min_monsters):
+    service = EncounterGeneratorService()
+    budget = service.calculate_xp_budget(levels, difficulty)
+
+    encounters = service.solve_encounters(POOL, budget, max_monsters, min_monsters, top_k=5, seed=1)
+
+    assert encounters
+    adjusted, _ = _ajustado(service, encounters[0])
+    assert abs(adjusted - budget) == pytest.approx(
+        _melhor_distancia(service, POOL, budget, max_monsters, min_monsters)
+    )
+    for encounter in encounters:
+        adjusted, count = _ajustado(service, encounter)
+        assert min_monsters <= count <= max(max_monsters, min_monsters)
+        assert adjusted <= budget * 1.2
+
+
+def test_solver_exato_reprodutivel_com_seed():
+    service = EncounterGeneratorService()
+    budget = service.calculate_xp_budget([3, 3, 3, 3], 'hard')
+
+    assert (service.solve_encounters(POOL, budget, 8, 1, top_k=5, seed=7) ==
+            service.solve_encounters(POOL, budget, 8, 1, top_k=5, seed=7))
+
+
+def test_modo_exato_sem_minimo_possivel():
+    service = EncounterGeneratorService()
+
+    with pytest.raises(ValueError):
+        service.generate_encounter([1], 'easy', POOL, max_monsters=10, min_monsters=8, mode='exact')
+
+
+def test_rota_gerar_rejeita_minimo_impossivel(client):
+    response = client.post('/gerador-encontros/gerar', json={
+        'party_levels': [1], 'difficulty': 'easy', 'mode': 'exact', 'min_monsters': 8
+    })
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
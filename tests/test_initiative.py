@@ -0,0 +1,109 @@
+"""Testes da ordem de iniciativa: desempates, lotes de iniciativa e reforços a meio do combate."""
+
+import random
+
+import pytest
+
+from app import db
+from app.models import SessionCombat
+from app.services.combat_roll_service import CombatRollService
+
+
+PARTICIPANTES = [
+    {'id': f'p{i}', 'nome': f'P{i}', 'tipo': 'jogador', 'hp_atual': 10, 'hp_max': 10, 'ac': 12,
+     'iniciativa': iniciativa, 'destreza_mod': 0, 'condicoes': []}
+    for i, iniciativa in enumerate([20, 15, 10, 5])
+]
+
+
+def _reforco(participant_id, iniciativa, destreza_mod):
+    return {'id': participant_id, 'nome': participant_id.upper(), 'tipo': 'monstro', 'hp_atual': 7, 'hp_max': 7,
+            'ac': 13, 'iniciativa': iniciativa, 'destreza_mod': destreza_mod, 'condicoes': []}
+
+
+@pytest.fixture
+def session_id(app, start_combat):
+    session_id = start_combat(PARTICIPANTES)
+    with app.app_context():
+        combat = SessionCombat.query.filter_by(session_id=session_id).first()
+        combat.turno_atual = 2  # Turno de p2
+        db.session.commit()
+    return session_id
+
+
+def _ordem(session_id):
+    combat = SessionCombat.query.filter_by(session_id=session_id).first()
+    return combat, [p.participant_id for p in combat.participantes]
+
+
+@pytest.mark.parametrize('destreza_mod, posicao', [
+    (1, 1),   # Empate na iniciativa com p1, Destreza maior: antes dele
+    (0, 2),   # Empate total: depois de quem já estava no combate
+    (-1, 2),  # Destreza menor: depois de p1
+])
+def test_desempate_por_destreza(app, session_id, destreza_mod, posicao):
+    with app.app_context():
+        combat, _ = _ordem(session_id)
+        combat.inserir_por_iniciativa(_reforco('r1', 15, destreza_mod))
+        db.session.commit()
+
+        combat, ordem = _ordem(session_id)
+        assert ordem.index('r1') == posicao
+        assert [p.ordem for p in combat.participantes] == list(range(5))
+
+
+def test_turno_acompanha_participante_ativo(app, session_id):
+    with app.app_context():
+        combat, _ = _ordem(session_id)
+        combat.inserir_por_iniciativa(_reforco('r1', 12, 3))
+        combat.inserir_por_iniciativa(_reforco('r2', 1, 0))
+        db.session.commit()
+
+        combat, ordem = _ordem(session_id)
+        assert ordem == ['p0', 'p1', 'r1', 'p2', 'p3', 'r2']
+        assert combat.participantes[combat.turno_atual].participant_id == 'p2'
+
+        chaves = [p.chave_iniciativa() for p in combat.participantes]
+        assert chaves == sorted(chaves)
+
+
+def test_iniciativa_em_lote_ordenada_e_por_grupo(monkeypatch):
+    monkeypatch.setattr(random, 'randint', random.Random(5).randint)
+    participantes = [
+        {'id': f'm{i}', 'monster_id': 'goblin' if i < 3 else 'orc', 'destreza_mod': i} for i in range(5)
+    ]
+
+    resultado = CombatRollService.roll_initiative_batch(participantes, group=True)
+
+    chaves = [CombatRollService.initiative_key(p) for p in resultado]
+    assert chaves == sorted(chaves)
+    # Com iniciativa de grupo, o mesmo d20 para todos os goblins
+    assert len({p['iniciativa'] - p['destreza_mod'] for p in resultado if p['monster_id'] == 'goblin'}) == 1
+
+
+
+@pytest.mark.parametrize('reordenada, esperada', [
+    # O mestre pôs p3 (iniciativa 5) a jogar primeiro
+    (['p3', 'p0', 'p1', 'p2'], ['p3', 'p0', 'p1', 'r1', 'p2']),
+    # O mestre atrasou p0 (iniciativa 20) para o fim
+    (['p1', 'p2', 'p3', 'p0'], ['p1', 'r1', 'p2', 'p3', 'p0']),
+])
+def test_reforco_depois_de_reordenar(app, client, session_id, reordenada, esperada):
+    with app.app_context():
+        combat, _ = _ordem(session_id)
+        versao = combat.versao
+    response = client.patch(f'/combate/sessao/{session_id}/estado', json={
+        'versao': versao, 'operations': [{'op': 'reorder', 'order': reordenada}]
+    })
+    assert response.status_code == 200, response.get_json()
+
+    with app.app_context():
+        combat, _ = _ordem(session_id)
+        ativo = combat.participantes[combat.turno_atual].participant_id
+        combat.inserir_por_iniciativa(_reforco('r1', 12, 0))
+        db.session.commit()
+
+        combat, ordem = _ordem(session_id)
+        assert ordem == esperada
+        assert [p.ordem for p in combat.participantes] == list(range(5))
+        assert combat.participantes[combat.turno_atual].participant_id == ativo
@@ -0,0 +1,123 @@
+"""Testes da cache de aventuras (QuestLoader): memória, manifesto e cache compilada."""
+
+import json
+import os
+import shutil
+
+import pytest
+
+import config
+from app.services.quest_loader import QuestLoader
+
+
+QUEST_ID = 'cripta-reis-esquecidos'
+
+
+@pytest.fixture
+def quests_folder(tmp_path):
+    folder = tmp_path / 'quests'
+    folder.mkdir()
+    shutil.copy(os.path.join(config.basedir, 'app', 'data', 'quests', f'{QUEST_ID}.json'), folder)
+    return folder
+
+
+@pytest.fixture
+def app(make_app, quests_folder):
+    return make_app(QUESTS_FOLDER=str(quests_folder))
+
+
+def _reescrever(path, titulo):
+    """Mudar o título da aventura (conteúdo, tamanho e mtime diferentes)."""
+    data = json.loads(path.read_text(encoding='utf-8'))
+    data['titulo'] = titulo
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_get_quest_usa_cache_em_memoria(app):
+    with app.app_context():
+        loader = QuestLoader()
+        primeira = loader.get_quest(QUEST_ID)
+        segunda = loader.get_quest(QUEST_ID)
+
+        assert primeira is segunda
+        assert loader.get_stats()['hits'] == 1
+        assert loader.get_stats()['misses'] == 1
+
+
+def test_ficheiro_alterado_e_relido(app, quests_folder):
+    with app.app_context():
+        loader = QuestLoader()
+        loader.get_quest(QUEST_ID)
+        _reescrever(quests_folder / f'{QUEST_ID}.json', 'Cripta Renovada')
+
+        assert loader.get_quest(QUEST_ID).titulo == 'Cripta Renovada'
+        assert loader.get_stats()['misses'] == 2
+
+
+def test_get_quest_nao_escreve_caches(app):
+    with app.app_context():
+        loader = QuestLoader()
+        loader.get_quest(QUEST_ID)
+        assert not os.path.exists(app.config['QUESTS_CACHE_FILE'])
+
+        loader.get_all_quests()
+        assert os.path.exists(app.config['QUESTS_CACHE_FILE'])
+        assert os.path.exists(app.config['QUESTS_MANIFEST'])
+
+
+def test_listagem_escreve_aventuras_lidas_por_get_quest(app):
+    with app.app_context():
+        loader = QuestLoader()
+        loader.get_quest(QUEST_ID)
+        loader.get_quest_summaries()
+        assert os.path.exists(app.config['QUESTS_CACHE_FILE'])
+
+        outro = QuestLoader()
+        outro.get_quest(QUEST_ID)
+        assert outro.get_stats()['compiled_hits'] == 1
+
+
+def test_listagem_sem_alteracoes_nao_reescreve_caches(app):
+    with app.app_context():
+        QuestLoader().get_all_quests()
+        mtime = os.stat(app.config['QUESTS_MANIFEST']).st_mtime_ns
+
+        loader = QuestLoader()
+        loader.get_quest_summaries()
+        loader.get_quest(QUEST_ID)  # Vem da cache compilada: nada a escrever
+        loader.get_quest_summaries()
+        assert os.stat(app.config['QUESTS_MANIFEST']).st_mtime_ns == mtime
+
+
+def test_cache_compilada_partilhada_entre_loaders(app):
+    with app.app_context():
+        titulo = QuestLoader().get_all_quests()[0].titulo
+
+        loader = QuestLoader()
+        assert loader.get_quest(QUEST_ID).titulo == titulo
+        assert loader.get_stats()['compiled_hits'] == 1
+
+
+def test_cache_compilada_invalidada_pelo_conteudo(app, quests_folder):
+    with app.app_context():
+        QuestLoader().get_all_quests()
+        _reescrever(quests_folder / f'{QUEST_ID}.json', 'Cripta Renovada')
+
+        loader = QuestLoader()
+        assert loader.get_quest(QUEST_ID).titulo == 'Cripta Renovada'
+        assert loader.get_stats()['compiled_hits'] == 0
+
+
+def test_manifesto_acompanha_ficheiros(app, quests_folder):
+    with app.app_context():
+        loader = QuestLoader()
+        assert [q.id for q in loader.get_quest_summaries()] == [QUEST_ID]
+
+        _reescrever(quests_folder / f'{QUEST_ID}.json', 'Cripta Renovada')
+        assert loader.get_quest_summary(QUEST_ID).titulo == 'Cripta Renovada'
+
+        os.remove(quests_folder / f'{QUEST_ID}.json')
+        assert loader.get_quest_summaries() == []
+        assert loader.get_quest(QUEST_ID) is None